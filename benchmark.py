@@ -0,0 +1,161 @@
+# Benchmark of the orchestration layer alone (game logic, prompt building, logging and
+# scheduling) using the offline mock backend, so no API latency or cost is involved.
+#
+#   python benchmark.py --games 20 --concurrency 10 --backend chat
+#
+# Reports games/hour, decisions/sec and CPU time and memory per game.
+
+# Imports
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows, memory is then not reported
+    resource = None
+
+import secret_hitler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Secret Hitler simulation with the mock backend")
+    parser.add_argument("--games", type=int, default=20,
+                        help="Number of games to play.")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="Number of games running at the same time on the event loop.")
+    parser.add_argument("--backend", type=str, default="chat",
+                        choices=["assistants", "chat"],
+                        help="Backend code path to exercise (both run against the mock).")
+    parser.add_argument("--run_mode", type=str, default="stream",
+                        choices=["stream", "poll"],
+                        help="How assistant runs are awaited (assistants backend only). poll includes the fixed polling sleeps.")
+    parser.add_argument("--player_type", type=int, default=1,
+                        choices=[1, 2, 3],
+                        help="Type of player setup to use for the agents.")
+    parser.add_argument("--log_format", type=str, default="jsonl",
+                        choices=["jsonl", "text"],
+                        help="Game log format to write during the benchmark.")
+    parser.add_argument("--mock_strategy", type=str, default="role",
+                        help="Mock strategy (see mock_backend.STRATEGIES).")
+    parser.add_argument("--mock_latency", type=str, default="none",
+                        help="Mock latency distribution. Keep none to measure the orchestration layer alone.")
+    parser.add_argument("--mock_failures", type=str, default="",
+                        help="Mock failure injection rates, e.g. rate_limit=0.02,failed=0.01.")
+    parser.add_argument("--mock_seed", type=int, default=0,
+                        help="Seed of the mock backend's replies.")
+    parser.add_argument("--keep_logs", action="store_true",
+                        help="Keep the game logs written during the benchmark (their folder is printed).")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Also write the results to this JSON file.")
+    return parser.parse_args()
+
+
+def peak_memory_mb():
+    """
+    Peak resident memory of this process in MB (None where the resource module is missing).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def play_games(game_ids, player_type, concurrency):
+    """
+    Plays the games with at most concurrency of them running at once and returns their final game states.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def play(game_id):
+        async with semaphore:
+            return await secret_hitler.run_game(game_id, "benchmark", player_type)
+
+    return await asyncio.gather(*(play(game_id) for game_id in game_ids))
+
+
+def main():
+    args = parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="secret_hitler_benchmark_")
+    os.makedirs(f"{log_dir}/game_logs_benchmark")
+
+    # secret_hitler reads its settings from the command line
+    sys.argv = [
+        "secret_hitler.py", "--mock",
+        "--backend", args.backend,
+        "--run_mode", args.run_mode,
+        "--log_format", args.log_format,
+        "--logdir", log_dir,
+        "--rate_limit_file", f"{log_dir}/rate_limit.json",
+        "--mock_strategy", args.mock_strategy,
+        "--mock_latency", args.mock_latency,
+        "--mock_failures", args.mock_failures,
+        "--mock_seed", str(args.mock_seed),
+    ]
+
+    game_ids = [f"game_{i}" for i in range(1, args.games + 1)]
+    concurrency = max(1, min(args.concurrency, args.games))
+
+    start_memory = peak_memory_mb()
+    start_cpu = time.process_time()
+    start_time = time.time()
+
+    game_states = asyncio.run(play_games(game_ids, args.player_type, concurrency))
+
+    wall_time = time.time() - start_time
+    cpu_time = time.process_time() - start_cpu
+    end_memory = peak_memory_mb()
+
+    finished = [game_state for game_state in game_states if game_state is not None]
+    decisions = sum(len(game_state.time_per_run) for game_state in finished)
+
+    results = {
+        "games": args.games,
+        "games_completed": len(finished),
+        "games_failed": args.games - len(finished),
+        "concurrency": concurrency,
+        "backend": args.backend,
+        "run_mode": args.run_mode,
+        "log_format": args.log_format,
+        "wall_time_seconds": round(wall_time, 3),
+        "games_per_hour": round(len(finished) / wall_time * 3600, 1),
+        "decisions": decisions,
+        "decisions_per_game": round(decisions / len(finished), 1) if finished else 0,
+        "decisions_per_second": round(decisions / wall_time, 1),
+        "cpu_seconds": round(cpu_time, 3),
+        "cpu_seconds_per_game": round(cpu_time / args.games, 4),
+        "cpu_ms_per_decision": round(cpu_time / decisions * 1000, 3) if decisions else None,
+        "peak_memory_mb": round(end_memory, 1) if end_memory is not None else None,
+        "memory_mb_per_concurrent_game": round((end_memory - start_memory) / concurrency, 2) if end_memory is not None else None,
+    }
+
+    print("=" * 60)
+    print(f"Games: {results['games_completed']} completed, {results['games_failed']} failed ({args.backend} backend, {concurrency} at a time)")
+    print(f"Wall time: {wall_time:.2f} seconds")
+    print(f"Games/hour: {results['games_per_hour']}")
+    print(f"Decisions: {decisions} ({results['decisions_per_game']} per game)")
+    print(f"Decisions/sec: {results['decisions_per_second']}")
+    print(f"CPU time: {cpu_time:.2f} seconds ({results['cpu_seconds_per_game']} per game, {results['cpu_ms_per_decision']} ms per decision)")
+    if end_memory is not None:
+        print(f"Peak memory: {results['peak_memory_mb']} MB (about {results['memory_mb_per_concurrent_game']} MB per concurrent game)")
+    print("=" * 60)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.keep_logs:
+        print(f"Game logs: {log_dir}/game_logs_benchmark")
+    else:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
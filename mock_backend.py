@@ -0,0 +1,491 @@
+# Offline stand-in for the OpenAI client used by secret_hitler.py (--mock).
+# It implements the calls send_to_api makes (Assistants threads, messages and runs,
+# including streamed runs, and chat completions) and answers with schema-valid JSON
+# chosen by a scripted strategy, with configurable latency and injected failures.
+
+# Imports
+import asyncio
+import ast
+import hashlib
+import itertools
+import json
+import math
+import random
+import re
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import APITimeoutError, InternalServerError, RateLimitError
+
+
+MOCK_REQUEST = httpx.Request("POST", "https://mock.local/v1")
+
+
+#region Configuration
+
+def parse_latency(spec):
+    """
+    Parses a latency distribution: "none", "fixed:SECONDS", "uniform:LOW,HIGH"
+    or "lognormal:MEDIAN,SIGMA". Returns a function that draws a delay from an rng.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+
+    if kind == "none":
+        return lambda rng: 0
+    elif kind == "fixed":
+        return lambda rng: values[0]
+    elif kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    elif kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_failures(spec):
+    """
+    Parses failure injection rates, e.g. "rate_limit=0.02,failed=0.01,expired=0.01,stalled=0.01".
+    Each rate is the chance that one request fails that way.
+    """
+    failures = {"rate_limit": 0.0, "failed": 0.0, "expired": 0.0, "stalled": 0.0}
+    if not spec:
+        return failures
+
+    for part in spec.split(","):
+        name, _, rate = part.partition("=")
+        name = name.strip()
+        if name not in failures:
+            raise ValueError(f"Unknown failure type: {name}. Choose from {list(failures)}")
+        failures[name] = float(rate)
+    return failures
+
+#endregion
+
+
+#region Strategies
+
+def parse_list(prompt, prefix):
+    """
+    Reads the Python list literal that follows prefix in the prompt, e.g. "Eligible players: ['Bob', 'Eve']".
+    """
+    match = re.search(re.escape(prefix) + r"\s*(\[[^\]]*\])", prompt)
+    return ast.literal_eval(match.group(1)) if match else []
+
+
+def parse_choices(prompt, phase, player_name):
+    """
+    Works out the valid decisions for the prompt of the given phase.
+    Returns ["na"] for phases that need no decision.
+    """
+    alive_others = [name for name in parse_list(prompt, "Players Alive:") if name != player_name]
+
+    if phase == "Nomination Phase":
+        return parse_list(prompt, "Players you can nominate:") or parse_list(prompt, "Eligible players:")
+
+    elif phase == "Discussion Post-Nomination Phase":
+        return ["Accept", "Reject"]
+
+    elif phase == "Voting Phase":
+        return ["Ja", "Nein"]
+
+    elif phase == "Policy Enactment":
+        match = re.search(r"drawn 3 policies: (\w+), (\w+), and (\w+)", prompt) or re.search(r"two policies: (\w+) and (\w+)", prompt)
+        return list(match.groups()) if match else ["Liberal", "Fascist"]
+
+    elif phase == "Policy Enactment with Veto":
+        policies = parse_list(prompt, "They are")
+        if policies:
+            return policies
+        match = re.search(r"to enact: (\w+) and (\w+)", prompt)
+        return (list(match.groups()) if match else ["Liberal", "Fascist"]) + ["Veto"]
+
+    elif phase == "Chancellor Vetod Policies":
+        return ["Agree", "Disagree"]
+
+    elif phase == "Chancellor Forced Policy Enactment":
+        match = re.search(r"handed a (\w+) and (\w+) policy", prompt)
+        return list(match.groups()) if match else ["Liberal", "Fascist"]
+
+    elif phase == "Discussion for Player Removal" and "For decision, write the name" in prompt:
+        return alive_others
+
+    elif phase == "Player Removal":
+        return alive_others
+
+    return ["na"]
+
+
+def random_strategy(request, rng):
+    """
+    Picks any valid decision.
+    """
+    return rng.choice(request.choices)
+
+
+def first_strategy(request, rng):
+    """
+    Always picks the first valid decision (accepts, votes Ja, discards the first policy).
+    """
+    return request.choices[0]
+
+
+def role_strategy(request, rng):
+    """
+    Plays for the player's team: Liberals discard Fascist policies and Fascists discard
+    Liberal ones, everyone else is decided at random.
+    """
+    liberal = request.role == "Liberal"
+    unwanted_policy = "Fascist" if liberal else "Liberal"
+
+    if request.phase in ("Policy Enactment", "Policy Enactment with Veto", "Chancellor Forced Policy Enactment"):
+        if unwanted_policy in request.choices:
+            if "Veto" in request.choices and {choice for choice in request.choices if choice != "Veto"} == {unwanted_policy}:
+                return "Veto"
+            return unwanted_policy
+        return request.choices[0]
+
+    if request.phase == "Voting Phase":
+        return "Ja" if rng.random() < (0.7 if liberal else 0.8) else "Nein"
+
+    return rng.choice(request.choices)
+
+
+STRATEGIES = {
+    "random": random_strategy,
+    "first": first_strategy,
+    "role": role_strategy,
+}
+
+
+def build_response(schema, decision, rng):
+    """
+    Builds a JSON object that is valid for the decision response schema.
+    The decision field gets the strategy's decision (or a value from its enum).
+    """
+    def fill(property_name, property_schema):
+        if "enum" in property_schema:
+            return decision if decision in property_schema["enum"] else property_schema["enum"][0]
+        if property_schema.get("type") == "object":
+            return {name: fill(name, sub_schema) for name, sub_schema in property_schema.get("properties", {}).items()}
+        if property_schema.get("type") in ("number", "integer"):
+            return round(rng.uniform(0, 5), 1)
+        if property_name == "decision":
+            return decision
+        return f"Mock {property_name.replace('_', ' ')}."
+
+    return fill("response", schema)
+
+#endregion
+
+
+#region Mock client
+
+class MockAsyncOpenAI:
+    """
+    Offline replacement for AsyncOpenAI with the client.beta.assistants / threads / messages / runs
+    and client.chat.completions calls secret_hitler.py makes.
+
+    Every reply is drawn from an rng seeded with the seed and the prompt (and how often that
+    prompt was seen), so results do not depend on how concurrent games interleave.
+    """
+    def __init__(self, strategy="role", latency="none", failures=None, seed=0, stall_seconds=5):
+        self.strategy = STRATEGIES[strategy]
+        self.latency = parse_latency(latency)
+        self.failures = parse_failures(failures)
+        self.seed = seed
+        self.stall_seconds = stall_seconds
+
+        self.assistants_by_id = {}
+        self.threads_by_id = {}
+        self.runs_by_id = {}
+        self.prompt_counts = {}
+        self.ids = itertools.count(1)
+        self.request_count = 0
+
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(create=self.create_assistant, delete=self.delete_assistant),
+            threads=SimpleNamespace(
+                create=self.create_thread,
+                delete=self.delete_thread,
+                messages=MockMessages(self),
+                runs=MockRuns(self),
+            ),
+        )
+        self.chat = SimpleNamespace(completions=MockCompletions(self))
+
+    def new_id(self, prefix):
+        return f"{prefix}_mock{next(self.ids)}"
+
+    def rng_for(self, prompt):
+        """
+        Returns a deterministic rng for this prompt. A repeated prompt (a retry) gets the next
+        rng in its sequence, so an injected failure is not repeated forever.
+        """
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        count = self.prompt_counts.get(digest, 0)
+        self.prompt_counts[digest] = count + 1
+        return random.Random(f"{self.seed}:{digest}:{count}")
+
+    def draw_failure(self, rng, allowed):
+        roll = rng.random()
+        for name in allowed:
+            if roll < self.failures[name]:
+                return name
+            roll -= self.failures[name]
+        return None
+
+    def reply(self, instructions, prompt, schema, rng):
+        """
+        Returns the JSON reply and the token usage for one decision.
+        """
+        player_match = re.search(r"You are (\w+)\.", prompt)
+        player_name = player_match.group(1) if player_match else ""
+        phase_match = re.search(r"- Phase: (.*?)- Liberal Policies", prompt)
+        phase = phase_match.group(1).strip() if phase_match else ""
+
+        if "You are Hitler" in prompt:
+            role = "Hitler"
+        elif "You are a Fascist" in prompt:
+            role = "Fascist"
+        else:
+            role = "Liberal"
+
+        # The schema's enum holds the legal decisions, older free text schemas leave them to the prompt
+        choices = schema.get("properties", {}).get("decision", {}).get("enum") or parse_choices(prompt, phase, player_name) or ["na"]
+        request = SimpleNamespace(player=player_name, role=role, phase=phase, choices=choices, prompt=prompt)
+        decision = self.strategy(request, rng)
+        content = json.dumps(build_response(schema, decision, rng))
+
+        prompt_tokens = (len(instructions) + len(prompt)) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0)
+        )
+        return content, usage
+
+    def rate_limit_error(self, rng):
+        retry_after = round(rng.uniform(0.5, 2), 2)
+        response = httpx.Response(429, request=MOCK_REQUEST, headers={"retry-after": str(retry_after)})
+        return RateLimitError(f"Error code: 429 - Rate limit reached (mock). Please try again in {retry_after}s.", response=response, body=None)
+
+    async def create_assistant(self, name=None, instructions="", model=None, **kwargs):
+        assistant = SimpleNamespace(id=self.new_id("asst"), name=name, instructions=instructions, model=model)
+        self.assistants_by_id[assistant.id] = assistant
+        return assistant
+
+    async def create_thread(self, **kwargs):
+        thread = SimpleNamespace(id=self.new_id("thread"), messages=[])
+        self.threads_by_id[thread.id] = thread
+        return thread
+
+    async def delete_assistant(self, assistant_id, **kwargs):
+        self.assistants_by_id.pop(assistant_id, None)
+        return SimpleNamespace(id=assistant_id, deleted=True)
+
+    async def delete_thread(self, thread_id, **kwargs):
+        self.threads_by_id.pop(thread_id, None)
+        return SimpleNamespace(id=thread_id, deleted=True)
+
+
+class MockPage:
+    """
+    A list response paginated like the SDK's: awaiting it gives the first page (.data holds at most
+    limit items and has_more tells whether more follow), async for iterates over the items of every page.
+    """
+    def __init__(self, items, limit=20):
+        self.items = items
+        self.data = items[:limit]
+        self.has_more = len(items) > limit
+
+    def __await__(self):
+        yield from []
+        return self
+
+    async def __aiter__(self):
+        for item in self.items:
+            yield item
+
+
+class MockMessages:
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, thread_id, content, role="user", **kwargs):
+        message = SimpleNamespace(
+            id=self.client.new_id("msg"),
+            role=role,
+            run_id=None,
+            content=[SimpleNamespace(type="text", text=SimpleNamespace(value=content))]
+        )
+        self.client.threads_by_id[thread_id].messages.append(message)
+        return message
+
+    def list(self, thread_id, run_id=None, order="desc", limit=20, after=None, **kwargs):
+        messages = list(self.client.threads_by_id[thread_id].messages)
+        if run_id is not None:
+            messages = [m for m in messages if m.run_id == run_id]
+        if order == "desc":
+            messages.reverse()
+        if after is not None:
+            ids = [m.id for m in messages]
+            messages = messages[ids.index(after) + 1:] if after in ids else []
+        return MockPage(messages, limit)
+
+    async def delete(self, message_id, thread_id, **kwargs):
+        thread = self.client.threads_by_id[thread_id]
+        thread.messages = [m for m in thread.messages if m.id != message_id]
+        return SimpleNamespace(id=message_id, deleted=True)
+
+
+class MockRuns:
+    def __init__(self, client):
+        self.client = client
+
+    def start(self, thread_id, assistant_id, response_format, truncation_strategy=None, additional_instructions=None, **kwargs):
+        """
+        Creates a run and schedules its outcome on the event loop.
+        """
+        client = self.client
+        client.request_count += 1
+        thread = client.threads_by_id[thread_id]
+        assistant = client.assistants_by_id[assistant_id]
+
+        messages = thread.messages
+        if truncation_strategy and truncation_strategy.get("type") == "last_messages":
+            messages = messages[-truncation_strategy["last_messages"]:]
+        prompt = messages[-1].content[0].text.value
+        context = "".join(m.content[0].text.value for m in messages[:-1])
+        instructions = assistant.instructions + (additional_instructions or "") + context
+
+        rng = client.rng_for(prompt)
+        failure = client.draw_failure(rng, ["rate_limit", "failed", "expired", "stalled"])
+        if failure == "rate_limit":
+            raise client.rate_limit_error(rng)
+
+        run = SimpleNamespace(
+            id=client.new_id("run"), thread_id=thread_id, status="queued",
+            usage=None, last_error=None, done=asyncio.Event()
+        )
+        client.runs_by_id[run.id] = run
+
+        async def complete():
+            await asyncio.sleep(client.latency(rng))
+            if run.status in ("cancelling", "cancelled"):
+                return
+            if failure == "stalled":
+                run.status = "in_progress"
+                return
+            if failure == "expired":
+                run.status = "expired"
+            elif failure == "failed":
+                run.status = "failed"
+                run.last_error = SimpleNamespace(code="server_error", message="Sorry, something went wrong.")
+            else:
+                content, run.usage = client.reply(instructions, prompt, response_format["json_schema"]["schema"], rng)
+                message = await client.beta.threads.messages.create(thread_id, content, role="assistant")
+                message.run_id = run.id
+                run.status = "completed"
+            run.done.set()
+
+        run.status = "in_progress"
+        run.task = asyncio.ensure_future(complete())
+        return run
+
+    def snapshot(self, run):
+        return SimpleNamespace(id=run.id, thread_id=run.thread_id, status=run.status, usage=run.usage, last_error=run.last_error)
+
+    async def create(self, thread_id, assistant_id, response_format=None, **kwargs):
+        return self.snapshot(self.start(thread_id, assistant_id, response_format, **kwargs))
+
+    async def retrieve(self, run_id, thread_id=None, **kwargs):
+        return self.snapshot(self.client.runs_by_id[run_id])
+
+    async def cancel(self, run_id, thread_id=None, **kwargs):
+        run = self.client.runs_by_id[run_id]
+        if run.status in ("queued", "in_progress"):
+            run.status = "cancelled"
+            run.done.set()
+        return self.snapshot(run)
+
+    def list(self, thread_id, limit=20, **kwargs):
+        runs = [run for run in self.client.runs_by_id.values() if run.thread_id == thread_id]
+        return MockPage([self.snapshot(run) for run in reversed(runs)], limit)
+
+    def stream(self, thread_id, assistant_id, response_format=None, timeout=None, **kwargs):
+        return MockRunStream(self, thread_id, assistant_id, response_format, timeout, kwargs)
+
+
+class MockRunStream:
+    """
+    Async context manager yielding the run's created event and its terminal event.
+    A stalled run raises APITimeoutError, like a read timeout on a real stream.
+    """
+    def __init__(self, runs, thread_id, assistant_id, response_format, timeout, kwargs):
+        self.runs = runs
+        self.run_args = (thread_id, assistant_id, response_format)
+        self.timeout = timeout
+        self.kwargs = kwargs
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        run = self.runs.start(*self.run_args, **self.kwargs)
+        yield SimpleNamespace(event="thread.run.created", data=self.runs.snapshot(run))
+
+        stall_timeout = min(self.timeout or self.runs.client.stall_seconds, self.runs.client.stall_seconds)
+        try:
+            await asyncio.wait_for(run.done.wait(), timeout=stall_timeout)
+        except asyncio.TimeoutError:
+            raise APITimeoutError(request=MOCK_REQUEST)
+
+        yield SimpleNamespace(event=f"thread.run.{run.status}", data=self.runs.snapshot(run))
+
+
+class MockCompletions:
+    def __init__(self, client):
+        self.client = client
+        self.with_raw_response = SimpleNamespace(create=self.create_raw)
+
+    async def create(self, model=None, messages=(), response_format=None, **kwargs):
+        client = self.client
+        client.request_count += 1
+
+        prompt = messages[-1]["content"]
+        instructions = "".join(m["content"] for m in messages[:-1])
+        rng = client.rng_for(prompt)
+        failure = client.draw_failure(rng, ["rate_limit", "failed", "expired", "stalled"])
+
+        if failure == "rate_limit":
+            raise client.rate_limit_error(rng)
+
+        await asyncio.sleep(client.latency(rng))
+
+        if failure == "failed":
+            response = httpx.Response(500, request=MOCK_REQUEST)
+            raise InternalServerError("Error code: 500 - The server had an error (mock).", response=response, body=None)
+        if failure in ("expired", "stalled"):
+            await asyncio.sleep(client.stall_seconds)
+            raise APITimeoutError(request=MOCK_REQUEST)
+
+        content, usage = client.reply(instructions, prompt, response_format["json_schema"]["schema"], rng)
+        return SimpleNamespace(
+            id=client.new_id("chatcmpl"),
+            created=int(time.time()),
+            model=model,
+            choices=[SimpleNamespace(finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+            usage=usage
+        )
+
+    async def create_raw(self, **kwargs):
+        completion = await self.create(**kwargs)
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+#endregion
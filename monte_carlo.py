@@ -0,0 +1,402 @@
+# Monte Carlo baselines for the LLM results: win rates, game lengths and executive power
+# timing under random or heuristic play, computed with NumPy on many games at once.
+#
+#   python monte_carlo.py --games 1000000 --agent random
+#   python monte_carlo.py --games 1000000 --agent heuristic --deck_liberal 6 --deck_fascist 11
+#
+# Every game is a row of arrays (roles, alive players, deck, policy counts, tracker, ...) and
+# all unfinished games advance one round at a time in lockstep. The rules are those of
+# rules_engine.py (and play_game), and the random agent makes the same choices as
+# rules_engine.RandomPolicy, so both give the same distributions.
+#
+# NumPy is an optional dependency, only needed for this script and not in requirements.txt:
+# pip install numpy
+
+# Imports
+import argparse
+import json
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+NUM_PLAYERS = 5
+LIBERAL, FASCIST, HITLER = 0, 1, 2
+ROLES = (LIBERAL, FASCIST, LIBERAL, HITLER, LIBERAL)
+
+# Win reasons, in the same words as check_win_conditions
+NO_WINNER, LIBERAL_POLICIES, FASCIST_POLICIES, HITLER_ELECTED, HITLER_REMOVED = range(5)
+WIN_REASONS = {
+    LIBERAL_POLICIES: "Liberals",
+    FASCIST_POLICIES: "Fascists",
+    HITLER_ELECTED: "Fascists (Hitler elected Chancellor)",
+    HITLER_REMOVED: "Liberals (Hitler removed)",
+}
+
+POWERS = ("peek", "remove_one", "remove_two")
+
+
+class Games:
+    """
+    The state of a batch of games, one row (or entry) per game. Policies are 1 for Fascist and
+    0 for Liberal, and the top of a deck is deck[game, deck_size[game] - 1].
+    """
+    def __init__(self, num_games, rng, deck_liberal=6, deck_fascist=11):
+        self.rng = rng
+        self.base_deck = np.array([0] * deck_liberal + [1] * deck_fascist, dtype=np.int8)
+        seats = np.arange(NUM_PLAYERS)
+
+        # Shuffled seats, like run_game shuffles the players
+        self.roles = np.array(ROLES, dtype=np.int8)[np.argsort(rng.random((num_games, NUM_PLAYERS)), axis=1)]
+        self.seats = np.broadcast_to(seats, (num_games, NUM_PLAYERS))
+        self.alive = np.ones((num_games, NUM_PLAYERS), dtype=bool)
+        self.deck = self.new_decks(num_games)
+        self.deck_size = np.full(num_games, len(self.base_deck), dtype=np.int16)
+
+        self.liberal_policies = np.zeros(num_games, dtype=np.int8)
+        self.fascist_policies = np.zeros(num_games, dtype=np.int8)
+        self.election_tracker = np.zeros(num_games, dtype=np.int8)
+        self.round_number = np.zeros(num_games, dtype=np.int16)
+        self.president = np.full(num_games, -1, dtype=np.int8)
+        self.last_chancellor = np.full(num_games, -1, dtype=np.int8)
+        self.power_round = {power: np.zeros(num_games, dtype=np.int16) for power in POWERS}  # 0 while unused
+        self.deck_refills = np.zeros(num_games, dtype=np.int16)
+        self.winner = np.zeros(num_games, dtype=np.int8)
+
+    def new_decks(self, count):
+        order = np.argsort(self.rng.random((count, len(self.base_deck))), axis=1)
+        return self.base_deck[order]
+
+    def ensure_deck(self, games):
+        """
+        Replaces the deck with a fresh shuffled one when fewer than 3 policies are left (see rules_engine.ensure_deck).
+        """
+        games = games[self.deck_size[games] < 3]
+        if len(games):
+            self.deck[games] = self.new_decks(len(games))
+            self.deck_size[games] = len(self.base_deck)
+            self.deck_refills[games] += 1
+
+    def draw(self, games, count):
+        """
+        Draws count policies from the top of the deck. Returns an array with one row per game.
+        """
+        self.ensure_deck(games)
+        positions = self.deck_size[games][:, None] - 1 - np.arange(count)
+        cards = self.deck[games[:, None], positions]
+        self.deck_size[games] -= count
+        return cards
+
+    def enact(self, games, policies):
+        self.fascist_policies[games[policies == 1]] += 1
+        self.liberal_policies[games[policies == 0]] += 1
+
+    def random_seat(self, games, allowed):
+        """
+        Picks one allowed seat per game uniformly at random.
+        """
+        keys = self.rng.random(allowed.shape)
+        keys[~allowed] = -1
+        return keys.argmax(axis=1)
+
+    def win(self, games, reason):
+        games = games[self.winner[games] == NO_WINNER]
+        self.winner[games] = reason
+
+
+#region Agents
+
+class RandomAgent:
+    """
+    Every player picks any valid choice, like rules_engine.RandomPolicy.
+    """
+    def nominate(self, games, g, eligible):
+        return games.random_seat(g, eligible)
+
+    def votes(self, games, g, president, chancellor):
+        return games.rng.random((len(g), NUM_PLAYERS)) < 0.5
+
+    def remove(self, games, g, removable):
+        return games.random_seat(g, removable)
+
+    def discard(self, games, g, hand, discarder, veto_allowed):
+        """
+        Returns the discarded policy per game (0 or 1), or 2 for a veto.
+        """
+        fascist_cards = hand.sum(axis=1)
+        choices = [np.where(fascist_cards > 0, 1, 0), np.where(fascist_cards < hand.shape[1], 0, 1)]
+        mixed = (fascist_cards > 0) & (fascist_cards < hand.shape[1])
+        choice_count = 1 + mixed + veto_allowed
+        pick = (games.rng.random(len(g)) * choice_count).astype(np.int8)
+        discarded = np.where(pick == 0, choices[0], choices[1])
+        return np.where(veto_allowed & (pick == choice_count - 1), 2, discarded)
+
+    def agree_to_veto(self, games, g, hand, president):
+        return games.rng.random(len(g)) < 0.5
+
+
+class HeuristicAgent(RandomAgent):
+    """
+    Players follow their team, like rules_engine.ScriptedPolicy: Liberals discard Fascist policies
+    and vote Ja with probability liberal_ja; Fascists discard Liberal policies, back governments with
+    a Fascist in them, nominate teammates and push Hitler once 3 Fascist policies are enacted.
+    Removals target the other team.
+    """
+    def __init__(self, liberal_ja=0.7):
+        self.liberal_ja = liberal_ja
+
+    def nominate(self, games, g, eligible):
+        president_fascist = games.roles[g, games.president[g]] != LIBERAL
+        teammates = eligible & (games.roles[g] != LIBERAL)
+        hitler = eligible & (games.roles[g] == HITLER) & (games.fascist_policies[g] >= 3)[:, None]
+        allowed = np.where((president_fascist & hitler.any(axis=1))[:, None], hitler,
+                           np.where((president_fascist & teammates.any(axis=1))[:, None], teammates, eligible))
+        return games.random_seat(g, allowed)
+
+    def votes(self, games, g, president, chancellor):
+        rows = np.arange(len(g))
+        roles = games.roles[g]
+        government_fascist = (roles[rows, president] != LIBERAL) | (roles[rows, chancellor] != LIBERAL)
+        draws = games.rng.random((len(g), NUM_PLAYERS))
+        fascist_votes = government_fascist[:, None] | (draws < 0.5)
+        return np.where(roles == LIBERAL, draws < self.liberal_ja, fascist_votes)
+
+    def remove(self, games, g, removable):
+        president_liberal = games.roles[g, games.president[g]] == LIBERAL
+        other_team = removable & ((games.roles[g] != LIBERAL) == president_liberal[:, None])
+        return games.random_seat(g, np.where(other_team.any(axis=1)[:, None], other_team, removable))
+
+    def discard(self, games, g, hand, discarder, veto_allowed):
+        unwanted = (games.roles[g, discarder] == LIBERAL).astype(np.int8)  # Liberals discard Fascist policies
+        unwanted_cards = (hand == unwanted[:, None]).sum(axis=1)
+        discarded = np.where(unwanted_cards > 0, unwanted, 1 - unwanted)
+        return np.where(veto_allowed & (unwanted_cards == hand.shape[1]), 2, discarded)
+
+    def agree_to_veto(self, games, g, hand, president):
+        unwanted = (games.roles[g, president] == LIBERAL).astype(np.int8)
+        return (hand == unwanted[:, None]).any(axis=1)
+
+
+AGENTS = {
+    "random": RandomAgent,
+    "heuristic": HeuristicAgent,
+}
+
+#endregion
+
+
+#region Simulation
+
+def use_powers(games, g, agent):
+    """
+    The last president uses the executive power of the enacted Fascist policies (peek at 3,
+    remove a player at 4 and at 5) at the start of the next round, as in play_game.
+    """
+    fascist_policies = games.fascist_policies[g]
+
+    # Powers are recorded with the round they are used in
+    peek = g[(fascist_policies == 3) & (games.power_round["peek"][g] == 0)]
+    games.power_round["peek"][peek] = games.round_number[peek] + 1
+    games.ensure_deck(peek)
+
+    for power, count in (("remove_one", 4), ("remove_two", 5)):
+        remove = g[(fascist_policies == count) & (games.power_round[power][g] == 0)]
+        if not len(remove):
+            continue
+        removable = games.alive[remove] & (games.seats[:len(remove)] != games.president[remove][:, None])
+        removed = agent.remove(games, remove, removable)
+        games.alive[remove, removed] = False
+        games.power_round[power][remove] = games.round_number[remove] + 1
+        games.win(remove[games.roles[remove, removed] == HITLER], HITLER_REMOVED)
+
+
+def play_round(games, g, agent):
+    """
+    Plays one round of every game in g (the indices of the unfinished games).
+    """
+    use_powers(games, g, agent)
+    g = g[games.winner[g] == NO_WINNER]
+    seats = games.seats[:len(g)]
+
+    # The president is alive_players[round_number % len(alive_players)]
+    games.round_number[g] += 1
+    alive = games.alive[g]
+    rank = games.round_number[g] % alive.sum(axis=1)
+    president = (alive & (alive.cumsum(axis=1) == (rank + 1)[:, None])).argmax(axis=1)
+    games.president[g] = president
+
+    eligible = alive & (seats != president[:, None]) & (seats != games.last_chancellor[g][:, None])
+    chancellor = agent.nominate(games, g, eligible)
+
+    ja_votes = (agent.votes(games, g, president, chancellor) & alive).sum(axis=1)
+    passed = ja_votes >= alive.sum(axis=1) // 2 + 1
+
+    # Failed elections move the tracker on, 3 in a row enact the top policy
+    failed = g[~passed]
+    games.election_tracker[failed] += 1
+    chaos = failed[games.election_tracker[failed] >= 3]
+    if len(chaos):
+        games.enact(chaos, games.draw(chaos, 1)[:, 0])
+        games.election_tracker[chaos] = 0
+
+    # Passed elections set the term limit and may elect Hitler
+    elected = g[passed]
+    chancellor = chancellor[passed]
+    games.election_tracker[elected] = 0
+    games.last_chancellor[elected] = chancellor
+    hitler_elected = (games.roles[elected, chancellor] == HITLER) & (games.fascist_policies[elected] >= 3)
+    games.win(elected[hitler_elected], HITLER_ELECTED)
+    session, chancellor = elected[~hitler_elected], chancellor[~hitler_elected]
+
+    legislative_session(games, session, chancellor, agent)
+
+    games.win(g[games.liberal_policies[g] >= 5], LIBERAL_POLICIES)
+    games.win(g[games.fascist_policies[g] >= 6], FASCIST_POLICIES)
+
+
+def discard_from(hand, discarded):
+    """
+    Removes one copy of the discarded policy from each hand.
+    """
+    position = (hand == discarded[:, None]).argmax(axis=1)
+    keep = np.ones(hand.shape, dtype=bool)
+    keep[np.arange(len(hand)), position] = False
+    return hand[keep].reshape(len(hand), hand.shape[1] - 1)
+
+
+def legislative_session(games, g, chancellor, agent):
+    if not len(g):
+        return
+    president = games.president[g]
+    no_veto = np.zeros(len(g), dtype=bool)
+
+    hand = games.draw(g, 3)
+    hand = discard_from(hand, agent.discard(games, g, hand, president, no_veto))
+
+    veto_allowed = games.fascist_policies[g] >= 5
+    discarded = agent.discard(games, g, hand, chancellor, veto_allowed)
+    vetoed = discarded == 2
+    if vetoed.any():
+        agreed = np.zeros(len(g), dtype=bool)
+        agreed[vetoed] = agent.agree_to_veto(games, g[vetoed], hand[vetoed], president[vetoed])
+        games.election_tracker[g[agreed]] += 1
+        refused = vetoed & ~agreed
+        discarded[refused] = agent.discard(games, g[refused], hand[refused], chancellor[refused], no_veto[refused])
+        g, hand, discarded = g[~agreed], hand[~agreed], discarded[~agreed]
+
+    games.enact(g, discard_from(hand, discarded)[:, 0])
+
+
+def simulate(num_games, agent, seed=0, deck_liberal=6, deck_fascist=11, max_rounds=1000):
+    """
+    Plays num_games games in lockstep and returns the final Games.
+    """
+    games = Games(num_games, np.random.default_rng(seed), deck_liberal, deck_fascist)
+    unfinished = np.arange(num_games)
+    while len(unfinished):
+        if games.round_number[unfinished[0]] >= max_rounds:
+            raise RuntimeError(f"{len(unfinished)} games did not finish within {max_rounds} rounds")
+        play_round(games, unfinished, agent)
+        unfinished = unfinished[games.winner[unfinished] == NO_WINNER]
+    return games
+
+
+def summarize(batches):
+    """
+    Returns win rates by reason, the distribution of game lengths in rounds and when the executive
+    powers were used, over the finished Games of every batch.
+    """
+    winner = np.concatenate([games.winner for games in batches])
+    rounds = np.concatenate([games.round_number for games in batches])
+    deck_refills = np.concatenate([games.deck_refills for games in batches])
+    num_games = len(winner)
+    liberal_wins = np.isin(winner, (LIBERAL_POLICIES, HITLER_REMOVED)).sum()
+    summary = {
+        "games": num_games,
+        "liberal_win_rate": float(liberal_wins / num_games),
+        "fascist_win_rate": float(1 - liberal_wins / num_games),
+        "win_reasons": {WIN_REASONS[reason]: float((winner == reason).mean()) for reason in WIN_REASONS},
+        "rounds": {
+            "mean": float(rounds.mean()),
+            "percentiles": {str(p): float(np.percentile(rounds, p)) for p in (5, 25, 50, 75, 95)},
+            "histogram": {int(value): int(count) for value, count in zip(*np.unique(rounds, return_counts=True))},
+        },
+        "powers": {},
+        "deck_refills_mean": float(deck_refills.mean()),
+    }
+    for power in POWERS:
+        power_round = np.concatenate([games.power_round[power] for games in batches])
+        used = power_round[power_round > 0]
+        summary["powers"][power] = {
+            "used_rate": float(len(used) / num_games),
+            "mean_round": float(used.mean()) if len(used) else None,
+            "median_round": float(np.median(used)) if len(used) else None,
+        }
+    return summary
+
+#endregion
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo baselines for Secret Hitler under random or heuristic play. "
+                                                 "Needs NumPy, an optional dependency that is not in requirements.txt: pip install numpy")
+    parser.add_argument("--games", type=int, default=1000000,
+                        help="Number of games to simulate.")
+    parser.add_argument("--agent", type=str, default="random",
+                        choices=sorted(AGENTS),
+                        help="Agent every player follows.")
+    parser.add_argument("--liberal_ja", type=float, default=0.7,
+                        help="Probability of a Liberal voting Ja (heuristic agent).")
+    parser.add_argument("--deck_liberal", type=int, default=6,
+                        help="Number of Liberal policies in the deck.")
+    parser.add_argument("--deck_fascist", type=int, default=11,
+                        help="Number of Fascist policies in the deck.")
+    parser.add_argument("--batch_size", type=int, default=1000000,
+                        help="Games simulated at once (bounds memory use).")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed.")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Also write the summary to this JSON file.")
+    args = parser.parse_args()
+
+    if np is None:
+        raise SystemExit("monte_carlo.py needs NumPy: pip install numpy")
+    if args.deck_liberal + args.deck_fascist < 3:
+        raise SystemExit("The deck needs at least 3 policies")
+
+    agent = HeuristicAgent(args.liberal_ja) if args.agent == "heuristic" else RandomAgent()
+
+    start_time = time.time()
+    batches = []
+    for batch, start in enumerate(range(0, args.games, args.batch_size)):
+        batch_games = min(args.batch_size, args.games - start)
+        batches.append(simulate(batch_games, agent, args.seed + batch, args.deck_liberal, args.deck_fascist))
+    time_taken = time.time() - start_time
+
+    summary = summarize(batches)
+
+    print("=" * 60)
+    print(f"Simulated {args.games} games ({args.agent} agent, deck {args.deck_liberal} Liberal / {args.deck_fascist} Fascist) in {time_taken:.2f} seconds")
+    print(f"Liberal win rate: {summary['liberal_win_rate']:.1%}, Fascist win rate: {summary['fascist_win_rate']:.1%}")
+    for reason, rate in summary["win_reasons"].items():
+        print(f"  - {reason}: {rate:.1%}")
+    percentiles = summary["rounds"]["percentiles"]
+    print(f"Rounds: mean {summary['rounds']['mean']:.1f}, median {percentiles['50']:.0f}, 5-95% {percentiles['5']:.0f}-{percentiles['95']:.0f}")
+    for power, stats in summary["powers"].items():
+        if stats["used_rate"]:
+            print(f"Power {power}: used in {stats['used_rate']:.1%} of games, median round {stats['median_round']:.0f}")
+        else:
+            print(f"Power {power}: never used")
+    print(f"Deck refills per game: {summary['deck_refills_mean']:.2f}")
+    print("=" * 60)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
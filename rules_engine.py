@@ -0,0 +1,476 @@
+# Side-effect-free rules engine for the 5 player game played by secret_hitler.py.
+#
+# States are immutable (named tuples) and every transition returns a new
+# state, so games can be simulated, branched and tested without any LLM calls or I/O.
+# Decisions come from a policy object (random, scripted, or an LLM wrapped in one), see
+# RandomPolicy, ScriptedPolicy and game_steps.
+#
+#   python rules_engine.py --games 10000 --policy scripted
+#
+# play_game in secret_hitler.py applies the same transitions to its GameState (see rules_state
+# and apply_rules_state there), so the live game and the simulations share these rules:
+# - The president is alive_players[round_number % len(alive_players)].
+# - Only the last elected chancellor (and the president) cannot be nominated.
+# - An election passes with a majority of the living players voting Ja.
+# - After 3 failed elections in a row the top policy is enacted and the tracker resets.
+# - With fewer than 3 policies in the deck, a fresh 6 Liberal / 11 Fascist deck is shuffled.
+# - Executive powers are used by the last president at the start of the next round:
+#   peek at 3 Fascist policies, remove a player at 4 and at 5.
+# - With 5 Fascist policies the government may veto. A successful veto moves the tracker on.
+# - Liberals win with 5 Liberal policies or by removing Hitler, Fascists with 6 Fascist
+#   policies or by electing Hitler chancellor after 3 Fascist policies.
+
+# Imports
+import argparse
+import random
+import time
+from typing import NamedTuple
+
+
+LIBERAL_POLICIES_TO_WIN = 5
+FASCIST_POLICIES_TO_WIN = 6
+HITLER_ZONE = 3  # Fascist policies after which electing Hitler chancellor wins
+VETO_ZONE = 5
+FAILED_ELECTIONS_LIMIT = 3
+
+DEFAULT_PLAYERS = (
+    ("Alice", "Liberal"),
+    ("Bob", "Fascist"),
+    ("Carol", "Liberal"),
+    ("Dave", "Hitler"),
+    ("Eve", "Liberal"),
+)
+
+
+class RuleError(Exception):
+    """
+    Raised when a decision breaks the rules (for example nominating an ineligible player).
+    """
+
+
+#region State
+
+class PlayerState(NamedTuple):
+    name: str
+    role: str  # 'Liberal', 'Fascist', or 'Hitler'
+    is_alive: bool = True
+    last_president: bool = False
+    last_chancellor: bool = False
+
+
+class RulesState(NamedTuple):
+    players: tuple
+    policy_deck: tuple  # The top of the deck is the last policy, like GameState.policy_deck
+    discard_pile: tuple = ()
+    enacted_policies: tuple = ()
+    liberal_policies: int = 0
+    fascist_policies: int = 0
+    election_tracker: int = 0
+    round_number: int = 0
+    president: str = None
+    chancellor: str = None
+    peek_power_used: bool = False
+    remove_power_one_used: bool = False
+    remove_power_two_used: bool = False
+    winner: str = None  # 'Liberals' or 'Fascists'
+    win_reason: str = None
+
+
+def new_deck(rng):
+    deck = ['Liberal'] * 6 + ['Fascist'] * 11
+    rng.shuffle(deck)
+    return tuple(deck)
+
+
+def new_game(rng, players=DEFAULT_PLAYERS, shuffle_seats=True):
+    """
+    Returns the state of a new game for (name, role) pairs, with a shuffled deck
+    and (by default) shuffled seats, like run_game does.
+    """
+    players = list(players)
+    if shuffle_seats:
+        rng.shuffle(players)
+    return RulesState(
+        players=tuple(PlayerState(name, role) for name, role in players),
+        policy_deck=new_deck(rng)
+    )
+
+
+def get_player(state, name):
+    for player in state.players:
+        if player.name == name:
+            return player
+    raise RuleError(f"Unknown player: {name}")
+
+
+def alive_players(state):
+    return [player.name for player in state.players if player.is_alive]
+
+
+def update_players(state, **changes_by_name):
+    """
+    Returns the players tuple with the given changes applied, e.g. update_players(state, Bob={"is_alive": False}).
+    """
+    return tuple(
+        player._replace(**changes_by_name[player.name]) if player.name in changes_by_name else player
+        for player in state.players
+    )
+
+#endregion
+
+
+#region Transitions
+
+def winner_for(liberal_policies, fascist_policies, hitler_elected=False, hitler_removed=False):
+    """
+    Returns the winning side ('Liberals (Hitler removed)', 'Fascists', ...) or None,
+    the form check_win_conditions in secret_hitler.py reports.
+    """
+    if liberal_policies >= LIBERAL_POLICIES_TO_WIN:
+        return "Liberals"
+    if fascist_policies >= FASCIST_POLICIES_TO_WIN:
+        return "Fascists"
+    if fascist_policies >= HITLER_ZONE and hitler_elected:
+        return "Fascists (Hitler elected Chancellor)"
+    if hitler_removed:
+        return "Liberals (Hitler removed)"
+    return None
+
+
+def with_winner(state, hitler_elected=False, hitler_removed=False):
+    result = winner_for(state.liberal_policies, state.fascist_policies, hitler_elected, hitler_removed)
+    if result is None:
+        return state
+    return state._replace(winner=result.split(" ")[0], win_reason=result)
+
+
+def start_round(state):
+    """
+    Starts the next round and seats its president.
+    """
+    round_number = state.round_number + 1
+    alive = alive_players(state)
+    return state._replace(round_number=round_number, president=alive[round_number % len(alive)], chancellor=None)
+
+
+def eligible_chancellors(state):
+    return [
+        player.name for player in state.players
+        if player.is_alive and player.name != state.president and not player.last_chancellor
+    ]
+
+
+def nominate(state, chancellor):
+    if chancellor not in eligible_chancellors(state):
+        raise RuleError(f"{chancellor} cannot be nominated as chancellor")
+    return state._replace(chancellor=chancellor)
+
+
+def enact(state, policy):
+    if policy == 'Liberal':
+        return state._replace(enacted_policies=state.enacted_policies + (policy,), liberal_policies=state.liberal_policies + 1)
+    return state._replace(enacted_policies=state.enacted_policies + (policy,), fascist_policies=state.fascist_policies + 1)
+
+
+def ensure_deck(state, rng):
+    """
+    Replaces the deck with a fresh shuffled one when fewer than 3 policies are left.
+    """
+    if len(state.policy_deck) < 3:
+        return state._replace(policy_deck=new_deck(rng), discard_pile=())
+    return state
+
+
+def enact_top_policy(state, rng):
+    state = ensure_deck(state, rng)
+    state = enact(state._replace(policy_deck=state.policy_deck[:-1]), state.policy_deck[-1])
+    return state._replace(election_tracker=0)
+
+
+def resolve_election(state, votes, rng):
+    """
+    Applies the votes ({name: True for Ja}). A passed election sets the term limits and resets the
+    tracker (and wins for the Fascists if Hitler is elected in the Hitler zone). A failed election
+    moves the tracker on, enacting the top policy after 3 failures.
+
+    Returns (state, election_passed).
+    """
+    alive = alive_players(state)
+    ja_votes = sum(1 for name in alive if votes.get(name))
+
+    if ja_votes >= len(alive) // 2 + 1:
+        players = tuple(
+            player._replace(last_president=player.name == state.president, last_chancellor=player.name == state.chancellor)
+            for player in state.players
+        )
+        state = state._replace(players=players, election_tracker=0)
+        hitler_elected = get_player(state, state.chancellor).role == 'Hitler'
+        return with_winner(state, hitler_elected=hitler_elected), True
+
+    state = state._replace(election_tracker=state.election_tracker + 1)
+    if state.election_tracker >= FAILED_ELECTIONS_LIMIT:
+        state = enact_top_policy(state, rng)
+    return state, False
+
+
+def draw_policies(state, rng):
+    """
+    Draws the president's three policies. Returns (state, hand).
+    """
+    state = ensure_deck(state, rng)
+    hand = state.policy_deck[-1:-4:-1]
+    return state._replace(policy_deck=state.policy_deck[:-3]), hand
+
+
+def discard(state, hand, policy):
+    """
+    Discards one policy from the hand. Returns (state, remaining hand).
+    """
+    if policy not in hand:
+        raise RuleError(f"{policy} is not in the hand {hand}")
+    remaining = list(hand)
+    remaining.remove(policy)
+    return state._replace(discard_pile=state.discard_pile + (policy,)), tuple(remaining)
+
+
+def veto_allowed(state):
+    return state.fascist_policies >= VETO_ZONE
+
+
+def apply_veto(state, hand):
+    """
+    Both policies of a vetoed hand are discarded and the tracker moves on.
+    """
+    return state._replace(discard_pile=state.discard_pile + tuple(hand), election_tracker=state.election_tracker + 1)
+
+
+def pending_power(state):
+    """
+    Returns the executive power the last president uses at the start of the next round, if any.
+    """
+    if state.fascist_policies == 3 and not state.peek_power_used:
+        return 'peek'
+    if state.fascist_policies == 4 and not state.remove_power_one_used:
+        return 'remove_one'
+    if state.fascist_policies == 5 and not state.remove_power_two_used:
+        return 'remove_two'
+    return None
+
+
+def peek(state, rng):
+    """
+    Returns (state, top three policies). The deck is refreshed first if it is too small.
+    """
+    state = ensure_deck(state, rng)
+    return state._replace(peek_power_used=True), state.policy_deck[-1:-4:-1]
+
+
+def removable_players(state):
+    return [name for name in alive_players(state) if name != state.president]
+
+
+def remove_player(state, name, power):
+    if name not in removable_players(state):
+        raise RuleError(f"{name} cannot be removed")
+    used = {'remove_one': {"remove_power_one_used": True}, 'remove_two': {"remove_power_two_used": True}}[power]
+    state = state._replace(players=update_players(state, **{name: {"is_alive": False}}), **used)
+    return with_winner(state, hitler_removed=get_player(state, name).role == 'Hitler')
+
+#endregion
+
+
+#region Game loop
+
+class Decision(NamedTuple):
+    """
+    A decision the engine needs: kind is one of 'nominate', 'vote', 'president_discard',
+    'chancellor_discard', 'veto_response' or 'remove_player'. The answer must be one of choices
+    ('Ja'/'Nein' for votes, 'Agree'/'Disagree' for veto responses, 'Veto' where allowed).
+    """
+    kind: str
+    player: str
+    choices: tuple
+    state: RulesState
+    hand: tuple = ()
+
+
+def game_steps(state, rng):
+    """
+    Plays a game as a generator: it yields a Decision whenever a player has to decide,
+    expects the answer to be sent back, and returns the final state.
+    Drive it with play (sync policies) or play_async (async policies, e.g. an LLM).
+    """
+    while state.winner is None:
+
+        power = pending_power(state)
+        if power == 'peek':
+            state, _ = peek(state, rng)
+        elif power in ('remove_one', 'remove_two'):
+            removed = yield Decision('remove_player', state.president, tuple(removable_players(state)), state)
+            state = remove_player(state, removed, power)
+            if state.winner:
+                break
+
+        state = start_round(state)
+
+        chancellor = yield Decision('nominate', state.president, tuple(eligible_chancellors(state)), state)
+        state = nominate(state, chancellor)
+
+        votes = {}
+        for name in alive_players(state):
+            votes[name] = (yield Decision('vote', name, ('Ja', 'Nein'), state)) == 'Ja'
+        state, election_passed = resolve_election(state, votes, rng)
+
+        if election_passed and state.winner is None:
+            state, hand = draw_policies(state, rng)
+            discarded = yield Decision('president_discard', state.president, tuple(sorted(set(hand))), state, hand)
+            state, hand = discard(state, hand, discarded)
+
+            choices = tuple(sorted(set(hand))) + (('Veto',) if veto_allowed(state) else ())
+            discarded = yield Decision('chancellor_discard', state.chancellor, choices, state, hand)
+
+            if discarded == 'Veto':
+                response = yield Decision('veto_response', state.president, ('Agree', 'Disagree'), state, hand)
+                if response == 'Agree':
+                    state = apply_veto(state, hand)
+                    hand = ()
+                else:
+                    discarded = yield Decision('chancellor_discard', state.chancellor, tuple(sorted(set(hand))), state, hand)
+
+            if hand:
+                state, hand = discard(state, hand, discarded)
+                state = enact(state, hand[0])
+
+        state = with_winner(state)
+
+    return state
+
+
+def play(state, policy, rng):
+    """
+    Plays a game to the end with a synchronous policy and returns the final state.
+    """
+    steps = game_steps(state, rng)
+    try:
+        decision = next(steps)
+        while True:
+            decision = steps.send(policy.decide(decision, rng))
+    except StopIteration as finished:
+        return finished.value
+
+
+async def play_async(state, policy, rng):
+    """
+    Plays a game to the end with a policy whose decide method is a coroutine.
+    """
+    steps = game_steps(state, rng)
+    try:
+        decision = next(steps)
+        while True:
+            decision = steps.send(await policy.decide(decision, rng))
+    except StopIteration as finished:
+        return finished.value
+
+#endregion
+
+
+#region Policies
+
+class RandomPolicy:
+    """
+    Every player picks any valid choice.
+    """
+    def decide(self, decision, rng):
+        return rng.choice(decision.choices)
+
+
+class ScriptedPolicy:
+    """
+    Every player follows a simple team strategy: Liberals discard Fascist policies, vote Ja
+    with probability liberal_ja and never nominate or keep players they have seen as Fascist
+    presidents; Fascists discard Liberal policies, always vote for governments with a Fascist
+    in them and push Hitler once the Hitler zone is reached.
+    """
+    def __init__(self, liberal_ja=0.7):
+        self.liberal_ja = liberal_ja
+
+    def decide(self, decision, rng):
+        state = decision.state
+        role = get_player(state, decision.player).role
+        fascists = [player.name for player in state.players if player.role != 'Liberal']
+        liberal = role == 'Liberal'
+
+        if decision.kind == 'nominate':
+            if not liberal:
+                hitler = next(player.name for player in state.players if player.role == 'Hitler')
+                if state.fascist_policies >= HITLER_ZONE and hitler in decision.choices:
+                    return hitler
+                teammates = [name for name in decision.choices if name in fascists]
+                if teammates:
+                    return rng.choice(teammates)
+            return rng.choice(decision.choices)
+
+        if decision.kind == 'vote':
+            if not liberal:
+                return 'Ja' if state.president in fascists or state.chancellor in fascists else rng.choice(('Ja', 'Nein'))
+            return 'Ja' if rng.random() < self.liberal_ja else 'Nein'
+
+        if decision.kind in ('president_discard', 'chancellor_discard'):
+            unwanted = 'Fascist' if liberal else 'Liberal'
+            if 'Veto' in decision.choices and decision.hand.count(unwanted) == len(decision.hand):
+                return 'Veto'
+            return unwanted if unwanted in decision.choices else decision.choices[0]
+
+        if decision.kind == 'veto_response':
+            unwanted = 'Fascist' if liberal else 'Liberal'
+            return 'Agree' if unwanted in decision.hand else 'Disagree'
+
+        if decision.kind == 'remove_player':
+            targets = [name for name in decision.choices if (name in fascists) != (not liberal)]
+            return rng.choice(targets or list(decision.choices))
+
+        raise RuleError(f"Unknown decision: {decision.kind}")
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "scripted": ScriptedPolicy,
+}
+
+#endregion
+
+
+def simulate(games, policy, seed=0):
+    """
+    Plays games with the given policy and returns how often each side won and why.
+    """
+    rng = random.Random(seed)
+    results = {}
+    for _ in range(games):
+        final_state = play(new_game(rng), policy, rng)
+        results[final_state.win_reason] = results.get(final_state.win_reason, 0) + 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Secret Hitler games with the rules engine and non-LLM policies")
+    parser.add_argument("--games", type=int, default=10000,
+                        help="Number of games to simulate.")
+    parser.add_argument("--policy", type=str, default="random",
+                        choices=sorted(POLICIES),
+                        help="Policy every player follows.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed.")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    results = simulate(args.games, POLICIES[args.policy](), args.seed)
+    time_taken = time.time() - start_time
+
+    print(f"Simulated {args.games} games with the {args.policy} policy in {time_taken:.2f} seconds ({args.games / time_taken:.0f} games/second)")
+    for reason, count in sorted(results.items(), key=lambda item: -item[1]):
+        print(f"  - {reason}: {count} ({count / args.games:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,39 @@
 # Imports
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+import asyncio
+import contextvars
 import logging
 import time
+import hashlib
 import json
 import os
 import sys
 import traceback
 from concurrent.futures import ProcessPoolExecutor
-import concurrent.futures
+import multiprocessing
+import queue
 import json
+import pickle
 from functools import partial
 import random
+import re
+from contextlib import contextmanager, redirect_stdout
+from types import SimpleNamespace
 import argparse
+from collections import deque
 from dotenv import load_dotenv
+import mock_backend
+import rules_engine
+
+try:
+    import tiktoken
+except ImportError:  # optional, tokens are then estimated from the text length
+    tiktoken = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, the rate limiter then only covers this process
+    fcntl = None
 
 
 #region Arguments
@@ -22,7 +43,43 @@ def parse_args():
                         choices=["gpt-4o", "gpt-4o-mini"],
                         help="Model to use for the agents.")
     parser.add_argument("--games", type=int, default=1,
-                        help="Number of games to run in parallel.")
+                        help="Number of games to run. They wait in a shared queue and run on the worker pool (see --workers and --games_per_process).")
+    parser.add_argument("--games_per_process", type=int, default=1,
+                        help="Number of games each worker process runs concurrently on one event loop.")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Number of worker processes. Games wait in a shared queue until a worker is free. 0 = one per CPU, or fewer if that is enough to start every game at once.")
+    parser.add_argument("--campaign", type=str, default=None,
+                        help="JSON file listing game groups to run, e.g. [{\"games\": 500, \"model\": \"gpt-4o\", \"player_type\": 2}]. Missing keys use the command line values. Overrides --games.")
+    parser.add_argument("--status_interval", type=int, default=30,
+                        help="Seconds between queue status updates printed while games are running.")
+    parser.add_argument("--log_format", type=str, default="jsonl",
+                        choices=["jsonl", "text"],
+                        help="Game log format. jsonl = one JSON event per line (phases, vote tallies, token usage, timing and printed output) written through a buffered writer, text = the pretty text log printed while the game runs.")
+    parser.add_argument("--text_log", action="store_true",
+                        help="With --log_format jsonl, also render the text view of each game log from its events once the game ends.")
+    parser.add_argument("--mock", action="store_true",
+                        help="Use the offline mock backend (mock_backend.py) instead of the OpenAI API. No API key is needed and nothing is billed.")
+    parser.add_argument("--mock_strategy", type=str, default="role",
+                        choices=sorted(mock_backend.STRATEGIES),
+                        help="How the mock agents decide. role = play for their team, random = any valid choice, first = always the first valid choice.")
+    parser.add_argument("--mock_latency", type=str, default="none",
+                        help="Mock response latency: none, fixed:SECONDS, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA.")
+    parser.add_argument("--mock_failures", type=str, default="",
+                        help="Mock failure injection rates, e.g. rate_limit=0.02,failed=0.01,expired=0.01,stalled=0.01.")
+    parser.add_argument("--mock_seed", type=int, default=0,
+                        help="Seed of the mock backend's replies.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for the game's random choices (seats, deck, discussion order and fallbacks for invalid responses). Each game gets its own generator seeded from this and its game id.")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Folder to record every agent response to (one GAME_ID.jsonl response cache per game), so the games can be replayed offline with --replay.")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Folder of recorded response caches (see --record). Agent responses are read from the cache instead of the API, so no API key is needed.")
+    parser.add_argument("--resume", type=str, nargs="+", default=None,
+                        help="Continue one or more games from their checkpoint files (game_N.checkpoint.pkl in the run's log folder) instead of starting new games.")
+    parser.add_argument("--sweep", type=str, nargs="+", default=None,
+                        help="Delete the leftover assistants and threads of one or more run log folders (e.g. after killed workers) and exit. Threads of games that can be resumed are kept.")
+    parser.add_argument("--render_log", type=str, default=None,
+                        help="Render the text view of an existing JSONL game log (written next to it as .txt) and exit.")
     parser.add_argument("--logdir", type=str, default="logs",
                         help="Directory to save game logs. If you keep it as logs, it will save to the logs folder in the current directory.")
     parser.add_argument("--player_type", type=int, default=1,
@@ -30,6 +87,52 @@ def parse_args():
                         help="Type of player setup to use for the agents. 1 = default, 2 = personalities, 3 = relationships.")
     parser.add_argument("--run_number", type=int, default=1,
                         help="The run number of the game. If you use this, the log directory will be game_logs_run_number_game_id. Change so old logs are not overwritten.")
+    parser.add_argument("--run_mode", type=str, default="stream",
+                        choices=["stream", "poll"],
+                        help="How to wait for each assistant run. stream = return as soon as the run's completion event arrives, poll = check the run status once a second.")
+    parser.add_argument("--backend", type=str, default="assistants",
+                        choices=["assistants", "chat"],
+                        help="API used for agent decisions. assistants = one Assistants API thread per player, chat = one chat completion per decision with each player's conversation kept locally.")
+    parser.add_argument("--discussion_mode", type=str, default="sequential",
+                        choices=["sequential", "concurrent"],
+                        help="How discussions run. sequential = one speaker at a time, each seeing everything said before, concurrent = all speakers answer at once in rounds of opening statements, each round seeing the previous rounds.")
+    parser.add_argument("--discussion_rounds", type=int, default=1,
+                        help="Rounds of opening statements per discussion in concurrent discussion mode.")
+    parser.add_argument("--fused_reflection", action="store_true",
+                        help="Fold each reflection phase into the player's next decision (one call with an extra reflection field) instead of a separate call per player. The post game reflection stays a separate call.")
+    parser.add_argument("--batch_reflections", type=str, default="off",
+                        choices=["off", "openai", "local"],
+                        help="Send the reflection phases as batch jobs at the lower batch price while the game goes on. Each player's reflections are merged before its next decision once their job has ended, the game only waits for jobs still running at its end. openai = the Batch API, local = a file based stand-in that answers through the regular API (always used with --mock). Ignored with --fused_reflection.")
+    parser.add_argument("--context_rounds", type=int, default=0,
+                        help="Number of most recent rounds each agent sees verbatim. Older rounds are replaced by a compact summary built from the player's memory and the game log. 0 = keep the full history.")
+    parser.add_argument("--context_token_budget", type=int, default=0,
+                        help="Estimated prompt token budget per decision. When exceeded, more rounds are moved into the summary until the prompt fits. 0 = no budget.")
+    parser.add_argument("--context_limit", type=float, default=0.9,
+                        help="Fraction of the model's context window (see MODEL_CONTEXT_WINDOWS) the estimated prompt of a decision may fill. Above it the oldest rounds are compacted into a summary before the request is sent. 0 = off.")
+    parser.add_argument("--rpm_limit", type=int, default=0,
+                        help="Requests per minute shared by all game processes. 0 = no limit.")
+    parser.add_argument("--tpm_limit", type=int, default=0,
+                        help="Estimated tokens per minute shared by all game processes. 0 = no limit.")
+    parser.add_argument("--max_cost_per_game", type=float, default=0,
+                        help="Cost budget of each game in USD (see MODEL_PRICES). 0 = no budget.")
+    parser.add_argument("--max_tokens_per_game", type=int, default=0,
+                        help="Token budget of each game. 0 = no budget.")
+    parser.add_argument("--max_cost_per_run", type=float, default=0,
+                        help="Cost budget in USD of all games in the run's log folder together. 0 = no budget.")
+    parser.add_argument("--budget_degrade_at", type=float, default=0.8,
+                        help="Fraction of a budget at which a game switches to a cheaper model and a tighter context window. At the full budget the game stops with a checkpoint. 1 = never degrade.")
+    parser.add_argument("--hedge_percentile", type=float, default=0,
+                        help="Latency percentile of recent calls of the same action type (e.g. 95) after which a decision sends a duplicate request and takes whichever answers first. 0 = no hedged requests.")
+    parser.add_argument("--hedge_min_samples", type=int, default=20,
+                        help="Calls of an action type needed before its decisions are hedged.")
+    parser.add_argument("--hedge_min_delay", type=float, default=2.0,
+                        help="Seconds a decision always waits before it is hedged, however fast recent calls were.")
+    parser.add_argument("--retry_base_delay", type=float, default=1.0,
+                        help="Backoff in seconds before the first retry of a failed request. It doubles with every retry (with random jitter) unless the server says how long to wait.")
+    parser.add_argument("--retry_max_delay", type=float, default=60.0,
+                        help="Longest backoff in seconds between two retries of a failed request.")
+    parser.add_argument("--rate_limit_file", type=str, default=None,
+                        help="State file of the shared rate limiter (with --rpm_limit or --tpm_limit). Defaults to rate_limit.json in the run's log folder, so only the run's own workers share it. Runs given the same file (and API key) share one budget.")
     return parser.parse_args()
 
 #endregion
@@ -43,8 +146,104 @@ load_dotenv()
 
 api_key = os.getenv("OPENAI_API_KEY")
 
-# Alias the client for convenience
-client = OpenAI(api_key=api_key)
+# Alias the client for convenience (async, so many agents and games can share one event loop)
+# Without an API key the client is created later, see setup_client
+client = AsyncOpenAI(api_key=api_key) if api_key else None
+
+
+def setup_client(args):
+    """
+    Switches this process to the offline mock backend when --mock (or --replay) is given.
+    """
+    global client
+    if args.mock or args.replay:
+        # A replayed game takes its decisions from the response cache, the mock handles the assistants and threads
+        if not isinstance(client, mock_backend.MockAsyncOpenAI):
+            client = mock_backend.MockAsyncOpenAI(args.mock_strategy, args.mock_latency, args.mock_failures, args.mock_seed)
+    elif client is None:
+        raise Exception("OPENAI_API_KEY is not set. Add it to your .env file or run with --mock.")
+#endregion
+
+
+#region Per-game output
+
+# Log file of the game running in the current asyncio task (see GameOutputRouter)
+current_game_log = contextvars.ContextVar("current_game_log", default=None)
+
+
+class GameOutputRouter:
+    """
+    Stand-in for sys.stdout that writes each print to the log file of the game
+    running in the current asyncio task, so several games can share one process.
+    Prints made outside of a game go to the original stdout.
+    """
+    def __init__(self, original_stdout):
+        self.original_stdout = original_stdout
+    
+    def write(self, text):
+        log_file = current_game_log.get()
+        return (log_file or self.original_stdout).write(text)
+    
+    def flush(self):
+        log_file = current_game_log.get()
+        (log_file or self.original_stdout).flush()
+
+#endregion
+
+
+#region Event Log
+
+class EventLog:
+    """
+    Buffered writer for a game's structured log, one JSON event per line.
+    
+    It also accepts plain text through write/flush, so it can stand in for the game's
+    stdout (see GameOutputRouter): every printed line becomes an "output" event.
+    """
+    def __init__(self, path, buffer_size=100, mode="w"):
+        self.file = open(path, mode)
+        self.buffer = []
+        self.buffer_size = buffer_size
+        self.partial_line = ""
+    
+    def emit(self, event_type, **fields):
+        event = {"event": event_type, "time": round(time.time(), 3)}
+        event.update(fields)
+        self.buffer.append(json.dumps(event, default=str))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush_events()
+    
+    def write(self, text):
+        lines = (self.partial_line + text).split("\n")
+        self.partial_line = lines.pop()
+        for line in lines:
+            self.emit("output", text=line)
+        return len(text)
+    
+    def flush(self):
+        # Events are written in batches of buffer_size and on close
+        pass
+    
+    def flush_events(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+    
+    def close(self):
+        if self.partial_line:
+            self.emit("output", text=self.partial_line)
+            self.partial_line = ""
+        self.flush_events()
+        self.file.close()
+
+
+def log_event(game_state, event_type, **fields):
+    """
+    Adds an event for the current round to the game's event log (no-op for text logs).
+    """
+    if game_state.event_log is not None:
+        game_state.event_log.emit(event_type, round=game_state.round_number, **fields)
+
 #endregion
 
 
@@ -60,6 +259,12 @@ class Player:
         self.assistant_id = None
         self.thread_id = None
         self.instructions = None
+        # Local copy of the player's conversation (the chat backend sends it, the assistants backend mirrors its thread)
+        self.conversation = []
+        self.round_start_index = {}  # round number -> index of the round's first message in conversation
+        self.conversation_tokens = [0]  # estimated tokens of conversation[:i], see conversation_tokens
+        self.context_trim_index = 0  # furthest first verbatim message of a context window so far, see check_context_size
+        self.last_message_id = None  # newest thread message the local state knows about, see rollback_to_checkpoint
         
         # for memory
 
@@ -75,8 +280,9 @@ class Player:
 
 class GameState:
     
-    def __init__(self, players):
+    def __init__(self, players, rng=None):
         self.players = players
+        self.rng = rng if rng is not None else random.Random()  # all of the game's random choices, see --seed
         self.liberal_policies = 0
         self.fascist_policies = 0
         self.enacted_policies = []
@@ -84,7 +290,7 @@ class GameState:
         self.previous_government = {'president': None, 'chancellor': None}
         self.election_tracker = 0
         self.policy_deck = ['Liberal'] * 6 + ['Fascist'] * 11
-        random.shuffle(self.policy_deck)
+        self.rng.shuffle(self.policy_deck)
         self.discard_pile = []
         self.logs = []
         self.president_discarded_policy = None
@@ -100,7 +306,40 @@ class GameState:
         self.total_input_tokens_used = 0
         self.total_output_tokens_used = 0
         self.total_tokens_used = 0
+        self.total_cached_input_tokens_used = 0  # input tokens served from the provider's prompt cache
         self.time_per_run = []
+        self.call_metrics = []  # one entry per agent decision, see record_call_metrics
+        self.total_cost = 0.0  # USD, see enforce_budgets
+        self.reserved_cost = 0.0  # expected cost of the calls in flight, see reserve_budget
+        self.reserved_tokens = 0
+        self.cost_ledger_path = None  # costs of every game of the run, see add_run_cost
+        self.max_cost_per_game = 0
+        self.max_tokens_per_game = 0
+        self.max_cost_per_run = 0
+        self.budget_degrade_at = 0.8
+        self.budget_degraded = False
+        self.run_mode = "stream"  # 'stream' or 'poll', see send_to_api
+        self.backend = "assistants"  # 'assistants' or 'chat', see send_to_api
+        self.model = "gpt-4o-mini"
+        self.context_rounds = 0  # see build_context_window
+        self.discussion_mode = "sequential"  # 'sequential' or 'concurrent', see run_discussion
+        self.discussion_rounds = 1
+        self.fused_reflection = False  # see parallel_reflection
+        self.pending_reflections = {}  # player name -> reflections folded into the player's next decision
+        self.reflection_batch_mode = "off"  # 'off', 'openai' or 'local', see ReflectionBatch
+        self.reflection_batches = []  # submitted reflection batches not fully merged yet, see merge_reflection_batches
+        self.batch_folder_path = None  # input and output files of local batches
+        self.batch_savings = 0.0  # USD saved by sending reflections as batch jobs
+        self.hedge_waste_estimate = 0.0  # estimated USD of hedge losers cancelled in flight, not in total_cost
+        self.context_token_budget = 0
+        self.context_limit = 0.9  # fraction of the model's context window, see context_token_limit
+        self.event_log = None  # EventLog when the game logs JSONL events, None for text logs
+        self.response_cache = None  # ResponseCache when recording or replaying the agents' responses
+        self.game_id = None
+        self.game_log_run_number = None
+        self.player_type = None
+        self.checkpoint_path = None  # see save_checkpoint
+        self.checkpoint_phase = None  # 'round' or 'post_game', where the last checkpoint was taken
         self.peek_power_used = False
         self.remove_power_one_used = False
         self.remove_power_two_used = False
@@ -115,14 +354,12 @@ class GameState:
         # we need to save the order of discussion. We may need to log this for each round but we might be able to just overwrite it each round. For now, we'll just overwrite it each round. 
         self.discussion_order = []
         
-    def reshuffle_policies(self):
-        
-        self.discard_pile = []
-        self.discard_pile = ["Liberal"] * 6 + ["Fascist"] * 11
-        self.policy_deck = []
-        self.policy_deck.extend(self.discard_pile)
-        random.shuffle(self.policy_deck)
-        self.discard_pile = []
+    def __getstate__(self):
+        # The event log and response cache are open files, a resumed game attaches new ones
+        state = self.__dict__.copy()
+        state["event_log"] = None
+        state["response_cache"] = None
+        return state
 
 
 #region Game Log
@@ -160,6 +397,18 @@ def initialize_round_log(game_state, round_number):
         "discussion_post_game": [],
         "reflection_post_game": [],
     })
+    log_event(game_state, "round_start")
+
+
+def find_round_log(game_log, round_number):
+    """
+    Returns the log of the given round (the latest round if none has that number). Reflections
+    folded into a later decision (--fused_reflection) are logged under the round they reflect on.
+    """
+    for round_log in reversed(game_log["rounds"]):
+        if round_log["round_number"] == round_number:
+            return round_log
+    return game_log["rounds"][-1]
 
 # ---------------------------------------------------------------------
 # 2) Custom Logging Functions
@@ -175,13 +424,15 @@ def add_current_game_state_log(game_state):
     players_alive = [p.name for p in game_state.players if p.is_alive]
     election_tracker_number = game_state.election_tracker
     
-    game_state.game_log["rounds"][-1]["current_game_state"].append({
+    entry = {
         "liberal_policies": lib_policies,
         "fascist_policies": fac_policies,
         "round_number": round_number,
         "players_alive": players_alive,
         "election_tracker_number": election_tracker_number
-    })
+    }
+    game_state.game_log["rounds"][-1]["current_game_state"].append(entry)
+    log_event(game_state, "game_state", entry=entry)
 
 
 def add_final_voting_tally_log(game_state, election_passed, ja_votes, nein_votes):
@@ -223,6 +474,9 @@ def add_final_voting_tally_log(game_state, election_passed, ja_votes, nein_votes
         game_state.game_log["rounds"][-1]["final_voting_tally"].append({"result": passed_msg})
     else:
         game_state.game_log["rounds"][-1]["final_voting_tally"].append({"result": failed_msg})
+    
+    log_event(game_state, "vote_tally", passed=election_passed, ja_votes=num_ja, nein_votes=num_nein,
+              result=passed_msg if election_passed else failed_msg)
 
 # ---------------------------------------------------------------------
 # 3) Generic Logging Function for Everything Else
@@ -272,7 +526,8 @@ def add_phase_log(game_state, player, phase_key):
         
         # Append to the correct phase in game_state.game_log
         # (e.g., "discussion_post_nomination", "voting_phase", "policy_phase", etc.)
-        game_state.game_log["rounds"][-1][phase_key].append(entry)
+        find_round_log(game_state.game_log, game_state.round_number)[phase_key].append(entry)
+        log_event(game_state, "phase", phase=phase_key, entry=entry)
         
     
     else:
@@ -301,7 +556,8 @@ def add_phase_log(game_state, player, phase_key):
         
         # Append to the correct phase in game_state.game_log
         # (e.g., "discussion_post_nomination", "voting_phase", "policy_phase", etc.)
-        game_state.game_log["rounds"][-1][phase_key].append(entry)
+        find_round_log(game_state.game_log, game_state.round_number)[phase_key].append(entry)
+        log_event(game_state, "phase", phase=phase_key, entry=entry)
         
 
 
@@ -315,6 +571,8 @@ def print_round_header(round_number, game_state):
     """
     Print the header for a round.
     """
+    if game_state.event_log is not None:
+        return  # JSONL logs render the text view from their events afterwards (see render_text_log)
     print(f"\n{'='*50}")
     print(f"ROUND {round_number}")
     print(f"{'='*50}\n")
@@ -405,6 +663,10 @@ def print_game_log(game_state, round_selection='all', phase_selection='all'):
     Otherwise, prints only a specific round (int).
     phase_selection can be 'all' or a single phase name.
     """
+    if game_state.event_log is not None:
+        # Mark where the text view shows this part of the log (see render_text_log)
+        log_event(game_state, "print_game_log", round_selection=round_selection, phase_selection=phase_selection)
+        return
     
     
     phase_print_functions = {
@@ -463,6 +725,11 @@ def print_game_log(game_state, round_selection='all', phase_selection='all'):
 
 
 def print_log_messages(log_messages_by_player, game_state):
+    if game_state.event_log is not None:
+        # The messages are already in the event log, mark where the text view shows them
+        log_event(game_state, "print_log_messages")
+        return
+    
     print("=" * 80)
     print("Log Messages by Player")
     print("=" * 80)
@@ -476,6 +743,94 @@ def print_log_messages(log_messages_by_player, game_state):
         print("\n")  
 
 
+def format_log_messages(player_name, role, user_text, discussion_dict):
+    """
+    Formats one decision (the user message and the agent's parsed reply) as the
+    entries print_log_messages shows for the player.
+    """
+    user_message = [
+        50*'=',
+        f'User thread content to player {player_name}:\n',
+        user_text
+    ]
+    
+    if role == 'Liberal':
+        assistant_message = [
+        50 * '=',
+        f'Assistant thread content from player {player_name}:\n',
+        f"{player_name}'s internal dialogue:\n{discussion_dict.get('internal_dialogue', '')}\n",
+        f"{player_name}'s external dialogue:\n{discussion_dict.get('external_dialogue', '')}\n",
+        f"{player_name}'s decision:\n{discussion_dict.get('decision', '')}\n",
+        "Trust Levels:\n"
+        ]
+        
+        # Add trust levels
+        trust_dict = discussion_dict.get('trust', {})
+        if trust_dict:
+            for trust_player, trust_details in trust_dict.items():
+                trust_reasoning = trust_details.get('trust_reasoning', 'No reasoning provided.')
+                trust_score = trust_details.get('trust_score', 'No score provided.')
+                assistant_message.append(
+                    f" - {trust_player}:\n"
+                    f"   Trust Reasoning: {trust_reasoning}\n"
+                    f"   Trust Score: {trust_score}\n"
+            )
+        else:
+            assistant_message.append("No trust levels provided.\n")
+        
+    else:
+        assistant_message = [
+        50 * '=',
+        f'Assistant thread content from player {player_name}:\n',
+        f"{player_name}'s internal dialogue:\n{discussion_dict.get('internal_dialogue', '')}\n",
+        f"{player_name}'s external dialogue:\n{discussion_dict.get('external_dialogue', '')}\n",
+        f"{player_name}'s decision:\n{discussion_dict.get('decision', '')}\n",
+        ]
+    
+    return user_message + assistant_message
+
+
+def render_text_log(events_path, text_path=None):
+    """
+    Renders the human-readable text view of a JSONL game log. The game log is rebuilt from
+    the events and printed with the same functions, at the same points, as a text log.
+    Writes next to the event log (as .txt) unless text_path is given.
+    """
+    if text_path is None:
+        text_path = os.path.splitext(events_path)[0] + ".txt"
+    
+    view_state = SimpleNamespace(game_log={"rounds": []}, event_log=None)
+    log_messages_by_player = {}
+    
+    with open(events_path) as events_file, open(text_path, "w") as text_file, redirect_stdout(text_file):
+        for line in events_file:
+            event = json.loads(line)
+            
+            if event["event"] == "round_start":
+                initialize_round_log(view_state, event["round"])
+                print_round_header(event["round"], view_state)
+            elif event["event"] == "game_state":
+                view_state.game_log["rounds"][-1]["current_game_state"].append(event["entry"])
+            elif event["event"] == "phase":
+                find_round_log(view_state.game_log, event["round"])[event["phase"]].append(event["entry"])
+            elif event["event"] == "vote_tally":
+                view_state.game_log["rounds"][-1]["final_voting_tally"].append({"result": event["result"]})
+            elif event["event"] == "print_game_log":
+                print_game_log(view_state, event["round_selection"], event["phase_selection"])
+            elif event["event"] == "print_log_messages":
+                print_log_messages(log_messages_by_player, view_state)
+            elif event["event"] == "output":
+                print(event["text"])
+            elif event["event"] == "instructions":
+                log_messages_by_player.setdefault(event["player"], []).append(event["text"])
+            elif event["event"] == "exchange":
+                log_messages_by_player.setdefault(event["player"], []).extend(
+                    format_log_messages(event["player"], event["role"], event["user_message"], event["response"])
+                )
+    
+    return text_path
+
+
 def initialize_round_memory(player, round_number):
     if player.role == "Liberal":
         if round_number not in player.memory["rounds"]:
@@ -500,19 +855,13 @@ def get_player_list(player_name):
     return ', '.join(other_players)
 
 
-def create_assistant_for_player(player, team = None):
-    
-    args = parse_args()
-    
-    other_notes = f"""Other Notes:
-- Whenever "you" is used, it is referring to you. For example, "You said..." refers to your statement, "You nominated..." refers to your nomination, "You voted..." refers to your vote, etc.
-- Your name is unique. If your name is used, it is referring to you. For example, "{player.name} said..." refers to your statement, "{player.name} nominated..." refers to your nomination, "{player.name} voted..." refers to your vote, etc. 
-- Discussion pools refer to the current group discussion being had about the current event of the current round. For example, if the current event is the president nominating a chancellor, the discussion pool is the current group discussion about the president nominating a chancellor. If the current involves a policy that was enacted, the discussion pool is the current group discussion about the policy that was enacted.
-- external dialogues are what you say to other players and will be seen by other players.
-- internal dialogues are what you think to yourself and will not be seen by other players.
-- decisions are what you decide to do and will be seen by other players.
-- Everyone may lie and manipulate other players in this game. It is often necessary to do so to win, especially if you are a fascist.
+def build_instructions(player, team = None):
     """
+    Builds the player's instructions as a stable prefix for prompt caching.
+    The game rules and general notes come first and are byte-identical for every player
+    and every game, followed by the player's name, role and personality.
+    """
+    
     game_rules =f"""### **Rules for 5-Player Secret Hitler**
 
 #### **Game Overview**
@@ -556,11 +905,30 @@ def create_assistant_for_player(player, team = None):
 - **Veto Power**: Activated after 5 Fascist Policies. Both the Chancellor and President must agree to veto the remaining policies.
 - **Tiebreakers**: In case of a tied vote, the election fails, and the Election Tracker advances."""
 
+    general_notes = """Other Notes:
+- Whenever "you" is used, it is referring to you. For example, "You said..." refers to your statement, "You nominated..." refers to your nomination, "You voted..." refers to your vote, etc.
+- Discussion pools refer to the current group discussion being had about the current event of the current round. For example, if the current event is the president nominating a chancellor, the discussion pool is the current group discussion about the president nominating a chancellor. If the current involves a policy that was enacted, the discussion pool is the current group discussion about the policy that was enacted.
+- external dialogues are what you say to other players and will be seen by other players.
+- internal dialogues are what you think to yourself and will not be seen by other players.
+- decisions are what you decide to do and will be seen by other players.
+- Everyone may lie and manipulate other players in this game. It is often necessary to do so to win, especially if you are a fascist.
+    """
+    
+    shared_prefix = f"""
+You are playing a game of 5 player Secret Hitler.
+
+The Game Rules are:
+{game_rules}
+
+{general_notes}
+"""
+    
+    name_note = f"""- Your name is unique. If your name is used, it is referring to you. For example, "{player.name} said..." refers to your statement, "{player.name} nominated..." refers to your nomination, "{player.name} voted..." refers to your vote, etc. """
 
     if player.role == 'Hitler':
-        instructions = f"""
-You are playing a game of 5 player Secret Hitler.
+        player_block = f"""
 Your name is {player.name}. This name is unique. Whenever this name is used, it is referring to you.
+{name_note}
 You are playing with {get_player_list(player.name)}.
 You are {player.personality}.
 Your role is {player.role}.
@@ -571,17 +939,12 @@ Make decisions based on your personality and role.
 Notes on Hitler role:
 - If 3 or more Fascist policies have been enacted, and you are elected chancellor, you will win the game.
 - If you are removed from the game, the liberals win and you lose.
-
-The Game Rules are:
-{game_rules}
-
-{other_notes}
 """
    
     if player.role == 'Fascist':
-        instructions = f"""
-You are playing a game of 5 player Secret Hitler.
+        player_block = f"""
 Your name is {player.name}. This name is unique. Whenever this name is used, it is referring to you.
+{name_note}
 You are playing with {get_player_list(player.name)}.
 You are {player.personality}.
 Your role is {player.role}.
@@ -593,17 +956,12 @@ Make decisions based on your personality and role.
 Notes on Fascist role: 
 - If 3 or more Fascist policies have been enacted, and your teammate {team.name} is elected chancellor, you will win the game.
 - If Hitler (i.e your teammate {team.name}) is removed from the game, the liberals win and you lose.
-
-The Game Rules are:
-{game_rules}
-
-{other_notes}
 """
 
     if player.role == 'Liberal':
-        instructions = f"""
-You are playing a game of 5 player Secret Hitler.
+        player_block = f"""
 Your name is {player.name}. This name is unique. Whenever this name is used, it is referring to you.
+{name_note}
 You are playing with {get_player_list(player.name)}.
 You are {player.personality}.
 Your role is {player.role}, meaning you are on the {player.role} team.
@@ -612,29 +970,332 @@ Notes on Liberal role:
 - You are player against Hitler and the Fascist. You do not know the role or party alignment of any other player, but Hitler and the Fascist know the role and party alignment of all other players. Use this information wisely.  
 - If Hitler is removed from the game, you will win the game.
 - If 3 or more Fascist policies have been enacted and Hitler is elected chancellor, you lose and the Fascist team wins.
+"""
 
-The Game Rules are:
-{game_rules}
+    return shared_prefix + player_block
 
-{other_notes}
-"""
 
-    player.instructions = instructions
+#region Assistant Lifecycle
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # The process exists but belongs to someone else
+        return True
+    return True
+
+
+class AssistantRegistry:
+    """
+    The assistants and threads of a run, kept in assistants.json in the run's log folder and
+    shared by every game process of the run (locked like the rate limiter's state file).
+    
+    Assistants are keyed by (model, instructions hash) and reused by every game that needs an
+    identical one. Threads belong to one game and are deleted when it ends, unless it left a
+    checkpoint to resume from. Without a file (mock backend) the registry is local to the process.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.local_state = None
+        self.pending = {}  # assistants being created by this process, by key
+    
+    def new_state(self):
+        return {"assistants": {}, "threads": {}}
+    
+    def read_state(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return self.new_state()
+    
+    def write_state(self, state):
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, self.path)
+    
+    @contextmanager
+    def locked_state(self):
+        """
+        Yields the registry and writes it back while holding the file lock. Nothing inside the block may await.
+        """
+        if self.path is None or fcntl is None:
+            if self.local_state is None:
+                self.local_state = self.read_state() if self.path else self.new_state()
+            yield self.local_state
+            if self.path:
+                self.write_state(self.local_state)
+            return
+        
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self.read_state()
+                yield state
+                self.write_state(state)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    async def get_assistant(self, name, instructions, model):
+        """
+        Returns the ID of an assistant with these instructions and model, creating it only if
+        no game of the run has one yet. Concurrent requests for the same assistant share one creation.
+        """
+        key = f"{model}:{hash_text(instructions)}"
+        with self.locked_state() as state:
+            entry = state["assistants"].get(key)
+        if entry is not None:
+            return entry["id"]
+        
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.create_assistant(key, name, instructions, model))
+        return await asyncio.shield(self.pending[key])
+    
+    async def create_assistant(self, key, name, instructions, model):
+        try:
+            assistant = await client.beta.assistants.create(
+                name=name,
+                instructions=instructions,
+                model=model,
+                temperature=0.7,
+                top_p=1
+            )
+            with self.locked_state() as state:
+                entry = state["assistants"].setdefault(key, {"id": assistant.id, "model": model, "name": name, "created": time.time()})
+            if entry["id"] != assistant.id:
+                # Another process created the same assistant in the meantime
+                await client.beta.assistants.delete(assistant.id)
+            return entry["id"]
+        finally:
+            self.pending.pop(key, None)
+    
+    async def create_thread(self, game_id):
+        thread = await client.beta.threads.create()
+        with self.locked_state() as state:
+            state["threads"][thread.id] = {"game_id": game_id, "pid": os.getpid(), "checkpoint": None, "created": time.time()}
+        return thread.id
+    
+    def claim_threads(self, thread_ids):
+        """
+        Marks the threads as used by this process (a resumed game).
+        """
+        with self.locked_state() as state:
+            for thread_id in thread_ids:
+                if thread_id in state["threads"]:
+                    state["threads"][thread_id]["pid"] = os.getpid()
+    
+    def keep_threads(self, thread_ids, checkpoint_path):
+        """
+        Keeps the threads of a game that stopped with a checkpoint, for --resume.
+        """
+        with self.locked_state() as state:
+            for thread_id in thread_ids:
+                if thread_id in state["threads"]:
+                    state["threads"][thread_id]["checkpoint"] = checkpoint_path
+    
+    async def delete_threads(self, thread_ids):
+        for thread_id in thread_ids:
+            try:
+                await client.beta.threads.delete(thread_id)
+            except Exception as e:
+                print(f"Could not delete thread {thread_id}: {e}")
+        with self.locked_state() as state:
+            for thread_id in thread_ids:
+                state["threads"].pop(thread_id, None)
+    
+    async def sweep(self):
+        """
+        Deletes orphans: threads whose process is gone without a checkpoint to resume from
+        (killed workers), then every assistant no remaining thread uses. Run it once the
+        run's workers are done, since a game may be about to use an idle assistant.
+        """
+        with self.locked_state() as state:
+            orphan_threads = [
+                thread_id for thread_id, thread in state["threads"].items()
+                if not process_alive(thread["pid"]) and not (thread["checkpoint"] and os.path.exists(thread["checkpoint"]))
+            ]
+        await self.delete_threads(orphan_threads)
+        
+        with self.locked_state() as state:
+            # Which assistants the remaining threads (kept for --resume) use is only known to their checkpoints, so all are kept
+            idle_assistants = [] if state["threads"] else list(state["assistants"].items())
+        
+        for key, assistant in idle_assistants:
+            try:
+                await client.beta.assistants.delete(assistant["id"])
+            except Exception as e:
+                print(f"Could not delete assistant {assistant['id']}: {e}")
+            with self.locked_state() as state:
+                state["assistants"].pop(key, None)
+        
+        print(f"Sweep of {self.path or 'this process'}: deleted {len(orphan_threads)} orphaned threads and {len(idle_assistants)} assistants.")
+
+
+assistant_registries = {}
+
+
+def get_assistant_registry(log_folder_path):
+    """
+    Returns this process's handle on the assistant registry of the run in log_folder_path.
+    The mock backend's objects only exist in this process, so it gets a registry without a file.
+    """
+    args = parse_args()
+    path = None if args.mock or args.replay or log_folder_path is None else f"{log_folder_path}/assistants.json"
+    if path not in assistant_registries:
+        assistant_registries[path] = AssistantRegistry(path)
+    return assistant_registries[path]
+
+
+async def release_game_threads(game_state, registry):
+    """
+    Deletes the game's threads when it ends, or keeps them if it left a checkpoint to resume from.
+    """
+    thread_ids = [player.thread_id for player in game_state.players if player.thread_id]
+    if not thread_ids:
+        return
+    await wait_for_thread_syncs(game_state.players)
+    if game_state.checkpoint_path and os.path.exists(game_state.checkpoint_path):
+        registry.keep_threads(thread_ids, game_state.checkpoint_path)
+    else:
+        await registry.delete_threads(thread_ids)
+
+
+async def sweep_assistants(log_folder_paths):
+    """
+    Sweeps the assistant registries of the given run folders (see AssistantRegistry.sweep).
+    """
+    for log_folder_path in log_folder_paths:
+        if os.path.exists(f"{log_folder_path}/assistants.json"):
+            await get_assistant_registry(log_folder_path).sweep()
+
 
-    assistant = client.beta.assistants.create(
-        name=f"{player.name}'s Assistant",
-        instructions=instructions,
-        model=args.model,  
-        temperature=0.7,
-        top_p=1
+async def create_assistant_for_player(player, team = None, model = None, game_id = None, registry = None):
+    """
+    Builds the player's instructions and, for the assistants backend, gets a (possibly shared)
+    assistant from the registry and creates the player's thread for this game.
+    """
+    
+    args = parse_args()
+    model = model or args.model
+    
+    instructions = build_instructions(player, team)
+
+    player.instructions = instructions
+    
+    if args.backend == 'chat':
+        # The chat backend keeps the conversation locally, so no assistant or thread is needed
+        return
+    
+    if registry is None:
+        registry = get_assistant_registry(None)
+    
+    player.assistant_id, player.thread_id = await asyncio.gather(
+        registry.get_assistant(f"{player.name}'s Assistant", instructions, model),
+        registry.create_thread(game_id)
     )
-    player.assistant_id = assistant.id
-    # Create a thread for this assistant
-    thread = client.beta.threads.create()
-    player.thread_id = thread.id
+
+#endregion
+
+
+#region Decisions
+
+# Decision choices of the action types whose options do not depend on the game (see decision_choices)
+DECISION_CHOICES = {
+    'discussion_post_nomination': ["Accept", "Reject"],
+    'vote': ["Ja", "Nein"],
+    'chancellor_veto': ["Agree", "Disagree"],
+}
+
+# Decision of the action types that only talk or reflect
+NO_DECISION = ["na"]
+
+# Response schemas keyed by (role, other alive players, decision choices, reflection), see get_decision_schema
+decision_schemas = {}
+
+
+class AgentDecision:
+    """
+    An agent's reply to one action, parsed by parse_decision and returned by agent_decision. choice is
+    always one of the legal choices of the action (see decision_choices). Actions that only talk or
+    reflect keep the reply's decision field as it is.
+    """
+    def __init__(self, action_type, choice, response, valid=True):
+        self.action_type = action_type
+        self.choice = choice
+        self.response = response
+        self.internal_dialogue = response.get('internal_dialogue', '')
+        self.external_dialogue = response.get('external_dialogue', '')
+        self.valid = valid  # False when the reply had no legal choice and one was picked at random
+
+
+def decision_choices(player, game_state, action_type):
+    """
+    Returns the legal values of the decision field for the player's next action,
+    in the order the prompt offers them.
+    """
+    if action_type in DECISION_CHOICES:
+        return DECISION_CHOICES[action_type]
+    
+    if action_type == 'nominate':
+        return rules_engine.eligible_chancellors(rules_state(game_state))
+    
+    if action_type in ('policy', 'policy_with_veto', 'chancellor_forced_policy'):
+        # Each policy type once, a hand of three Fascist policies has a single choice
+        choices = list(dict.fromkeys(game_state.current_policies))
+        if action_type == 'policy_with_veto' and player.name == game_state.current_chancellor.name:
+            choices.append("Veto")
+        return choices
+    
+    if action_type in ('discuss_remove_a_player_one', 'remove_a_player_one', 'remove_a_player_two'):
+        return rules_engine.removable_players(rules_state(game_state))
+    
+    return NO_DECISION
+
+
+def get_decision_schema(player, alive_players, choices, reflection=False):
+    """
+    Returns the response schema of a decision, built once per role, set of other alive players,
+    decision choices and reflection field and shared afterwards. The schema must not be changed.
+    """
+    key = (player.role, tuple(p.name for p in alive_players), tuple(choices), reflection)
+    if key not in decision_schemas:
+        decision_schemas[key] = generate_schema_for_alive_players(alive_players, player, reflection, choices)
+    return decision_schemas[key]
+
+
+def parse_decision(player, game_state, action_type, response):
+    """
+    Parses the agent's reply (the JSON text of its exchange) into an AgentDecision.
+    The decision field is constrained to the legal choices, so it is matched exactly. Replies from
+    before the constraint (e.g. replayed recordings) are matched ignoring case and quotes, and a reply
+    with no legal choice at all gets a random one, which is printed and logged as invalid_decision.
+    """
+    response_dict = json.loads(response)
+    decision = response_dict.get('decision', '')
+    choices = decision_choices(player, game_state, action_type)
+    
+    if choices is NO_DECISION:
+        return AgentDecision(action_type, decision, response_dict)
     
+    if decision in choices:
+        return AgentDecision(action_type, decision, response_dict)
     
-def generate_schema_for_alive_players(alive_players, player):
+    normalized = str(decision).strip().strip("'\".").lower()
+    for choice in choices:
+        if choice.lower() == normalized:
+            return AgentDecision(action_type, choice, response_dict)
+    
+    choice = game_state.rng.choice(choices)
+    print(f"Invalid response for {action_type} by {player.name}: {decision}\nRandomly selecting {choice} from {choices}")
+    log_event(game_state, "invalid_decision", player=player.name, action_type=action_type, decision=decision, choice=choice)
+    return AgentDecision(action_type, choice, response_dict, valid=False)
+
+
+def generate_schema_for_alive_players(alive_players, player, reflection=False, choices=None):
     trust_properties = {}
     player_names = []  # To collect the names of the players for the `required` array
 
@@ -656,6 +1317,13 @@ def generate_schema_for_alive_players(alive_players, player):
         }
         player_names.append(p.name)  # Add the player's name to the required array
 
+    decision_property = {
+        "type": "string",
+        "description": "The specific action or decision you make with no additional text."
+    }
+    if choices:
+        decision_property["enum"] = list(choices)
+
     if player.role == 'Liberal':
         schema = {
             "type": "object",
@@ -668,10 +1336,7 @@ def generate_schema_for_alive_players(alive_players, player):
                     "type": "string",
                     "description": "Your communication shared with other players, explaining what you are doing and why. Use external dialogue strategically to win the game. You can lie and manipulate if it aids the goal of winning."
                 },
-                "decision": {
-                    "type": "string",
-                    "description": "The specific action or decision you make with no additional text."
-                },
+                "decision": decision_property,
                 "trust": {
                     "type": "object",
                     "description": "A dynamic structure representing trust information about other players.",
@@ -696,328 +1361,1913 @@ def generate_schema_for_alive_players(alive_players, player):
                     "type": "string",
                     "description": "Your communication shared with other players, explaining what you are doing and why. Use external dialogue strategically to win the game. You can lie and manipulate if it aids the goal of winning."
                 },
-                "decision": {
-                    "type": "string",
-                    "description": "The specific action or decision you make with no additional text."
-                },
+                "decision": decision_property,
             },
             "required": ["internal_dialogue", "external_dialogue", "decision"],
             "additionalProperties": False
         }
+    
+    # Reflections folded into this decision (--fused_reflection)
+    if reflection:
+        schema["properties"]["reflection"] = {
+            "type": "string",
+            "description": "Your reflection on what happened since your last decision, not visible by any other player."
+        }
+        schema["required"].append("reflection")
         
     return schema
 
+#endregion
+
    
-def send_to_api(game_state, content, player, max_retries=100):
-    
-    def start_new_run(player, game_state):
-        alive_players = [p for p in game_state.players if p.is_alive]
-        alive_players_not_current_player = [p for p in alive_players if p.name != player.name]
-        dynamic_schema = generate_schema_for_alive_players(alive_players_not_current_player, player)
-        response_format = {
-                "type": "json_schema",
-                "json_schema": {
-                    "name": "decision_response",
-                    "strict": True,
-                    "schema": dynamic_schema
-                }
-            }
-        return client.beta.threads.runs.create(
-            thread_id=player.thread_id,
-            assistant_id=player.assistant_id,
-            response_format=response_format
-        )
+#region Context Management
 
-    # Create a message in the thread
-    client.beta.threads.messages.create(
-        thread_id=player.thread_id,
-        content=content,
-        role="user"
-    )
+# Context window of each model in tokens (see context_token_limit)
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
 
-    retry_count = 0
-    while retry_count < max_retries:
-        try:
-            while True:
-                try:
-                    # Start a run with the assistant
-                    time.sleep(1)
-                    run = start_new_run(player, game_state)
-                    break
-                except Exception as e:
-                    # Handle rate limit exceeded error (HTTP 429)
-                    if '429' in str(e):
-                        print("Rate limit exceeded. Retrying after a delay.")
-                        print("Error:", e)
-                        time.sleep(60)  # Wait before retrying
-                        continue
-                    # Handle bad request error (HTTP 400)
-                    elif '400' in str(e):
-                        print(e)
-                        continue
-                    else:
-                        raise e  # Raise other exceptions
-            
-            # Wait for the run to complete
-            counter = 0
-            time.sleep(2)
-            start_time = time.time()
-            while True:
-                counter += 1
-                run_status = client.beta.threads.runs.retrieve(thread_id=player.thread_id, run_id=run.id)
-                
-                if run_status.status == "completed":
-                    
-                    end_time = time.time()
-                    time_taken = end_time - start_time
-                    game_state.time_per_run.append(time_taken)
-                    
-                    game_state.total_input_tokens_used += run_status.usage.prompt_tokens
-                    
-                    game_state.total_output_tokens_used += run_status.usage.completion_tokens
-                    
-                    game_state.total_tokens_used += run_status.usage.total_tokens
-                    
-                    return client.beta.threads.messages.list(thread_id=player.thread_id)               
-                
-                elif run_status.status == "expired" or (counter > 100 and run_status.status == "in_progress"):
-                    
-                    print(f"Run {run.id} {'expired' if run_status.status == 'expired' else 'stalled'}. Attempt {retry_count + 1} of {max_retries}")
-                    # Cancel the current run before starting a new one
-                    try:
-                        
-                        time.sleep(5)
-                        # start a timer 
-                        start_cancel_time = time.time()
-                        print(f"Cancelling run {run.id}")
-                        client.beta.threads.runs.cancel(thread_id=player.thread_id, run_id=run.id)
-                        print(f"Run {run.id} cancelling in progress")
-                        time.sleep(5)
-                        
-                        while True: 
-                            run_status = client.beta.threads.runs.retrieve(thread_id=player.thread_id, run_id=run.id)
-                            if run_status.status == "cancelled" or run_status.status == "expired":
-                                print(f"Run {run.id} officially cancelled or expired")
-                                cancel_time = time.time() - start_cancel_time
-                                print(f"Time taken to cancel or expire run: {cancel_time} seconds")
-                                break
-                            time.sleep(5)
-                            print(f"Run {run.id} status: {run_status.status}")
-                            
-                        
-                        
-                    except Exception as e:
-                        print(f"Failed to cancel run: {e}")
-                    break  # Break the inner while loop to start a new run
-                
-                elif run_status.status == "expired" or (counter > 50 and run_status.status == "in_progress"):
-                    print(f"Run {run.id} stuck.")
-                    print(f"Run {run.id} status: {run_status.status}")
-                
-                elif run_status.status == "expired" or (counter > 10 and run_status.status == "in_progress"):
-                    print(f"Run {run.id} probably stuck.")
-                    print(f"Run {run.id} status: {run_status.status}")
-                
-                elif run_status.status == "failed":
-                    if run_status.last_error.code == 'rate_limit_exceeded':
-                        print("Rate limit exceeded within the run. Retrying after a delay.")
-                        print("Error:", run_status.last_error)
-                        time.sleep(60)  # Wait before retrying
-                        break
-                    elif 'Sorry, something went wrong' in str(run_status.last_error):
-                        print("Assistant run failed. Retrying after a delay.")
-                        print("Error:", run_status.last_error)
-                        time.sleep(5)  # Wait before retrying
-                        break
-                    else:
-                        print(run_status.error)
-                        break
-                
-                time.sleep(1)  # Wait before checking again
-            
-            
-            retry_count += 1
-            
-        except Exception as e:
-            print(f"Error during run: {e}")
-            retry_count += 1
-            time.sleep(1)  # Wait before retrying
+token_encoding = None
+
+
+def get_token_encoding():
+    """
+    Returns the tiktoken encoding of the gpt-4o models, or None when tiktoken is not installed
+    or its encoding cannot be loaded.
+    """
+    global token_encoding
+    if token_encoding is None:
+        token_encoding = False
+        if tiktoken is not None:
+            try:
+                token_encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"Could not load the tiktoken encoding, estimating tokens from the text length: {e}")
+    return token_encoding or None
+
+
+def estimate_tokens(text):
+    """
+    Token estimate of the text: counted with tiktoken when it is installed,
+    otherwise about 4 characters per token for English text.
+    """
+    encoding = get_token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def estimate_messages_tokens(messages):
+    """
+    Rough token estimate for a list of chat messages, including per-message overhead.
+    """
+    return sum(estimate_tokens(message["content"]) + 4 for message in messages)
+
+
+def record_exchange(player, game_state, exchange, round_number=None):
+    """
+    Adds a completed user/assistant exchange to the player's local conversation,
+    remembering where each round starts so old rounds can be compacted.
+    The exchange belongs to round_number, the current round by default. An exchange of an
+    earlier round that arrives late (a batched reflection) only starts its round when no
+    later round has started yet, so the rounds' start indices keep their order.
+    """
+    if round_number is None:
+        round_number = game_state.round_number
+    if all(started < round_number for started in player.round_start_index):
+        player.round_start_index[round_number] = len(player.conversation)
     
-    raise Exception(f"Assistant run failed after {max_retries} attempts")
+    player.conversation.append({"role": "user", "content": exchange["user_message"]})
+    player.conversation.append({"role": "assistant", "content": exchange["assistant_message"]})
+    conversation_tokens(player)
 
 
-def agent_decision(player, game_state, action_type, discussion_pool = None):
+def conversation_tokens(player, first_index=0):
+    """
+    Estimated tokens of the player's conversation from first_index on, including per-message overhead.
+    Running totals are kept in player.conversation_tokens and extended as messages are recorded,
+    so only new messages are ever estimated.
+    """
+    if not hasattr(player, "conversation_tokens"):
+        # Player from a checkpoint written before the totals were tracked
+        player.conversation_tokens = [0]
     
+    totals = player.conversation_tokens
+    del totals[len(player.conversation) + 1:]
+    for message in player.conversation[len(totals) - 1:]:
+        totals.append(totals[-1] + estimate_tokens(message["content"]) + 4)
     
-    #region Build the content for the user message
+    return totals[-1] - totals[first_index]
+
+
+def context_token_limit(game_state):
+    """
+    Returns the prompt token limit of a decision: the smaller of --context_token_budget and
+    the --context_limit share of the model's context window (less the reply allowance), 0 for no limit.
+    """
+    limits = [game_state.context_token_budget]
     
-    # Map action types to formatted phase names
-    phase_names = {
-        "nominate": "Nomination Phase",
-        "discussion_post_nomination": "Discussion Post-Nomination Phase",
-        "vote": "Voting Phase",
-        "reflection_post_voting_phase_passed": "Reflection After Voting Phase (Passed)",
-        "reflection_post_voting_phase_failed": "Reflection After Voting Phase (Failed)",
-        "policy": "Policy Enactment",
-        "policy_with_veto": "Policy Enactment with Veto",
-        "chancellor_veto": "Chancellor Vetod Policies",
-        "discussion_post_veto_successful": "Discussion Post-Veto Success",
-        "reflection_post_veto_successful": "Reflection Post-Veto Success",
-        "chancellor_forced_policy": "Chancellor Forced Policy Enactment",
-        "discussion_post_policy_enactment_with_veto": "Discussion Post-Policy Enactment with Veto",
-        "reflection_post_policy_enactment_with_veto": "Reflection Post-Policy Enactment with Veto",
-        "discussion_post_policy_enactment": "Discussion Post-Policy Enactment",
-        "reflection_post_policy_enactment": "Reflection Post-Policy Enactment",
-        "peek_top_3_policies": "Peek at Top 3 Policies",
-        "reflection_post_peek_top_3_policies": "Reflection Post-Peek at Top 3 Policies",
-        "discuss_remove_a_player_one": "Discussion for Player Removal",
-        "remove_a_player_one": "Player Removal",
-        "discuss_remove_a_player_two": "Discussion for Player Removal",
-        "remove_a_player_two": "Player Removal",
-        "reflection_post_remove_a_player": "Reflection Post Player Removal",
-        "discussion_post_game": "Discussion Post-Game",
-        "reflection_post_game": "Reflection Post-Game"
-    }
+    window = MODEL_CONTEXT_WINDOWS.get(game_state.model)
+    context_limit = getattr(game_state, "context_limit", 0)
+    if window and context_limit:
+        limits.append(int(window * context_limit) - RESPONSE_TOKEN_ALLOWANCE)
+    
+    limits = [limit for limit in limits if limit > 0]
+    return min(limits) if limits else 0
 
-    # Default phase name if action_type is not in the map
-    phase_name = phase_names.get(action_type, "")
+
+class ContextWindow:
+    """
+    The part of the player's conversation one decision sends (see build_context_window): the summary
+    of compacted rounds (None when nothing was compacted), the first conversation message sent verbatim,
+    and the estimated prompt tokens of the decision with this window and with the full conversation.
+    Built once per decision and shared by the request, the rate limiter, the budgets and the metrics.
+    """
+    def __init__(self, summary, first_index, prompt_tokens, full_tokens):
+        self.summary = summary
+        self.first_index = first_index
+        self.prompt_tokens = prompt_tokens
+        self.full_tokens = full_tokens
+
+
+def summarize_rounds(player, game_state, round_numbers):
+    """
+    Builds a compact, structured summary of the given rounds from the public game log
+    and the player's own memory. Private information of other players is never included.
+    """
+    if not round_numbers:
+        return None
     
-    alive = f"Players Alive: {[p.name for p in game_state.players if p.is_alive]}\n"
-    fascist_policies_needed_for_win = 6 - game_state.fascist_policies
-    liberal_policies_needed_for_win = 5 - game_state.liberal_policies
+    rounds_by_number = {r["round_number"]: r for r in game_state.game_log["rounds"]}
     
+    summary = "Summary of earlier rounds (the full messages of these rounds were removed to save space):\n"
     
-    content = f"Secret Hitler Game State:\n"
-    content += f"- Round: {game_state.round_number}\n"
-    content += f" - Phase: {phase_name}"
-    content += f"- Liberal Policies Enacted: {game_state.liberal_policies}\n"
-    content += f"- Fascist Policies Enacted: {game_state.fascist_policies}\n"
-    content += f"- Number of Fascist Policies Needed for Fascist Win: {fascist_policies_needed_for_win}\n"
-    content += f"- Number of Liberal Policies Needed for Liberal Win: {liberal_policies_needed_for_win}\n"
-    content += f"- Number of Failed Elections in a Row: {game_state.election_tracker}\n  - Note that after 3 failed elections, a random policy will be enacted. You do not know if it will be fascist or liberal."
-    if game_state.fascist_policies == 5:
-        content += f"If one more Fascist policy is enacted, the Fascists will win the game.\n"
-    if game_state.liberal_policies == 5:
-        content += f"If one more Liberal policy is enacted, the Liberals will win the game.\n"
-    content += f"\n- Players Alive: {[p.name for p in game_state.players if p.is_alive]}\n"
-    content += f"\n"
+    for round_number in round_numbers:
+        summary += f"\nRound {round_number}:\n"
+        
+        round_log = rounds_by_number.get(round_number)
+        if round_log:
+            for state in round_log["current_game_state"]:
+                summary += f"- At the start of the round: {state['liberal_policies']} Liberal and {state['fascist_policies']} Fascist policies enacted, failed elections in a row: {state['election_tracker_number']}, players alive: {state['players_alive']}\n"
+            for tally in round_log["final_voting_tally"]:
+                summary += f"- Vote: {tally['result']}\n"
+        
+        memory = player.memory["rounds"].get(round_number)
+        if not memory:
+            continue
+        
+        for decision in memory["decisions"]:
+            summary += f"- {decision}\n"
+        
+        if memory["internal_dialogues"]:
+            last_thought = memory["internal_dialogues"][-1]
+            if len(last_thought) > 400:
+                last_thought = last_thought[:400] + "..."
+            summary += f"- Your last thought this round: {last_thought}\n"
+        
+        if memory.get("trust"):
+            scores = ", ".join(f"{name}: {details.get('trust_score')}" for name, details in memory["trust"].items())
+            summary += f"- Your trust scores at the end of the round: {scores}\n"
     
-    if game_state.fascist_policies >= 3:
-        content += f"NOTE: Three or more Fascist policies have been enacted. This means if Hitler is elected chancellor, the Fascists will win the game.\n\n"
+    return summary
+
+
+def build_context_window(player, game_state, content):
+    """
+    Picks which part of the player's conversation is sent verbatim for the next decision.
     
+    The last game_state.context_rounds rounds are kept verbatim and older rounds are
+    replaced by a summary (see summarize_rounds). When the estimated prompt is over the
+    token limit (see context_token_limit), further rounds are moved into the summary until it fits.
+    If even the current round alone does not fit, the oldest rounds are dropped from the summary
+    and then the oldest exchanges of the current round are dropped as well.
     
-    content += f"You are {player.name}. Remember, this name is unique to you. When others player use this name in discussions, they are referring to you."
+    Returns the ContextWindow. Prompt tokens are estimated as build_chat_messages sends them:
+    instructions, the summary (if any), the conversation from first_index on and the new user message.
+    """
+    token_limit = context_token_limit(game_state)
+    fixed_tokens = estimate_tokens(player.instructions or "") + 4 + estimate_tokens(content) + 4
+    full_tokens = fixed_tokens + conversation_tokens(player)
     
+    def prompt_tokens(summary, first_index):
+        return fixed_tokens + (estimate_tokens(summary) + 4 if summary else 0) + conversation_tokens(player, first_index)
     
-    if player.role == 'Hitler':
-        for p in game_state.players:
-            if p.role == 'Fascist':
-                teammate = p.name
-        content += f"\nYou are Hitler. You are the leader of the Fascist party. Your teammate is {teammate}.\n\n" 
+    if not game_state.context_rounds:
+        if not token_limit or full_tokens <= token_limit:
+            return ContextWindow(None, 0, full_tokens, full_tokens)
+    
+    rounds_with_messages = sorted(player.round_start_index)
+    if not rounds_with_messages:
+        return ContextWindow(None, 0, full_tokens, full_tokens)
+    
+    if game_state.context_rounds:
+        first_round = game_state.round_number - game_state.context_rounds + 1
+    else:
+        first_round = rounds_with_messages[0]
+    summary_start = 0
+    
+    while True:
+        kept_rounds = [r for r in rounds_with_messages if r >= first_round]
+        older_rounds = [r for r in rounds_with_messages if r < first_round]
+        first_index = player.round_start_index[kept_rounds[0]] if kept_rounds else len(player.conversation)
+        summary = summarize_rounds(player, game_state, older_rounds[summary_start:])
+        predicted_tokens = prompt_tokens(summary, first_index)
         
-    if player.role == 'Fascist':
-        for p in game_state.players:
-            if p.role == 'Hitler':
-                teammate = p.name
-        content += f"\nYou are a Fascist. Your teammate, {teammate}, is Hitler.\n\n"
+        if not token_limit or predicted_tokens <= token_limit:
+            break
+        
+        if first_round < game_state.round_number:
+            first_round += 1
+        elif summary_start < len(older_rounds):
+            summary_start += 1
+        else:
+            break
     
-    if player.role == 'Liberal':
-        content += f"\nYou are a Liberal.\n\n"
+    if older_rounds and summary is None:
+        # Every older round was dropped, but the verbatim window still starts after them
+        summary = "Earlier rounds were removed to save space.\n"
+        predicted_tokens = prompt_tokens(summary, first_index)
     
-    #endregion
+    if token_limit and predicted_tokens > token_limit and first_index < len(player.conversation):
+        summary = (summary or "") + "The earliest messages of this round were removed to save space.\n"
+        while first_index < len(player.conversation):
+            # One exchange (user and assistant message) at a time
+            first_index = min(first_index + 2, len(player.conversation))
+            predicted_tokens = prompt_tokens(summary, first_index)
+            if predicted_tokens <= token_limit:
+                break
+    
+    return ContextWindow(summary, first_index, predicted_tokens, full_tokens)
 
 
-    # Action-specific content
-    if action_type == 'nominate':
-        eligible = [p.name for p in game_state.players if p != player and p.is_alive and not p.last_chancellor]
-        
-        if game_state.round_number == 1:
-            content += f"\nIt is the first round. You are the president. Nominate a chancellor. Players you can nominate: {eligible}\n"
-        else:
-            content += f"\nIt is a new round and you are president. Nominate a Chancellor from eligible players. The last elected chancellor is not eligible.\n\nEligible players: {eligible}\n"
-        content += f"For internal dialogue, write what you are thinking about doing. "
-        content += f"For external dialogue, write who you would like to nominate as chancellor along with your reasoning for why you would like to nominate them. "
-        content += f"For decision, write the name of the player you nominate as chancellor with no additional text. "
-        
-        election_tracker = game_state.election_tracker
-        if election_tracker == 2:
-            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
-            
-    elif action_type == 'discussion_post_nomination' and player.name != game_state.current_chancellor.name:
-        content += f"{game_state.current_chancellor.name} has been nominated as chancellor by {game_state.current_president.name}. Before voting, you will discuss with other players about whether you should accept this nomination. You will be given the context of what other players are saying. For internal dialogue, write what you are thinking about doing. For external dialogue, write what you want to say to everyone. You can lie and manipulate. For decision, write either 'Reject' or 'Accept' with no additional text.\n\n"
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-        
-        election_tracker = game_state.election_tracker
-        if election_tracker == 2:
-            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
-        
-        if game_state.round_number == 1: 
-            content += f"This is the first round, and no policies have been enacted yet. Rejecting the Chancellor at this stage doesn't provide any new information about the players. It's advisable to accept the Chancellor and vote 'Ja' to start gathering insights based on the actions and decisions of others.\n"
-        
-    elif action_type == 'discussion_post_nomination' and player.name == game_state.current_chancellor.name:
-        content += f"You are in a round of discussions about your nomination as chancellor. For internal dialogue, write your thoughts about being nominated. For external dialogue, justify why (or why not) you should be chancellor. You can lie and manipulate. For decision, write either 'Reject' or 'Accept' with no additional text.\n\n"
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-        
-        if game_state.round_number == 1: 
-            content += f"\nThis is the first round, and no policies have been enacted yet. Rejecting the Chancellor at this stage doesn't provide any new information about the players. It's advisable to accept the Chancellor and vote 'Ja' to start gathering insights based on the actions and decisions of others.\n\n"
-        
-        election_tracker = game_state.election_tracker
-        if election_tracker == 2:
-            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
+def build_chat_messages(player, game_state, content, window=None):
+    """
+    Builds the chat completion messages for the next decision: instructions, the summary of
+    compacted rounds (if any), the recent conversation and the new user message.
+    The context window is built here unless the decision already has one.
+    """
+    if window is None:
+        window = build_context_window(player, game_state, content)
     
-    elif action_type == 'vote':
-        
-        president = game_state.current_president.name
-        chancellor = game_state.current_chancellor.name
-        content += f"We are in the voting phase. President {president} has nominated {chancellor} to be Chancellor. "
-        content += f"You must decide if you would like to vote Ja (Yes) or Nein (No) for {chancellor} as chancellor. "
-        content += f"You will be given what was discussed before voting. Based on your roll and previous discussions, decide what to do.\n"    
-        content += f"\nDiscussions: \n\n{discussion_pool}\n\n"    
-        content += f"For internal dialogue, write what you are thinking about doing."
-        content += f"For external dialogue, write what you want to say to everyone."
-        content += f"For decision, write either 'Ja' (Yes) or 'Nein' (No) with no additional text. Again, for decision, write 'Ja' or 'Nein' with no additional text." 
-        
-        election_tracker = game_state.election_tracker
-        if election_tracker == 2:
-            content += f"\n\nNOTE: The election tracker is at two. If this election fails, a random policy from the policy deck will be enacted automatically and we will move on to the next round with a new president."
+    messages = [{"role": "system", "content": player.instructions}]
+    if window.summary:
+        messages.append({"role": "system", "content": window.summary})
+    messages.extend(player.conversation[window.first_index:])
+    messages.append({"role": "user", "content": content})
+    return messages
+
+
+def build_run_context_params(player, game_state, window):
+    """
+    Builds the extra run parameters that apply the decision's context window to an Assistants thread:
+    only the recent messages are read from the thread and the summary of compacted rounds
+    is added to the run's instructions. A game degraded by its budget also overrides the model.
+    """
+    params = {}
+    if game_state.budget_degraded:
+        # The assistant was created with the game's original model
+        params["model"] = game_state.model
     
-    elif action_type == 'reflection_post_voting_phase_passed':
-        
-        votes = game_state.votes
-        formatted_votes = "\n".join([f"- {player}: {vote}" for player, vote in votes.items()])
+    if window.summary is None:
+        return params
+    
+    # Recent messages plus the new user message, which is already in the thread
+    last_messages = len(player.conversation) - window.first_index + 1
+    params.update({
+        "truncation_strategy": {"type": "last_messages", "last_messages": last_messages},
+        "additional_instructions": window.summary
+    })
+    return params
 
-        content += f"The vote passed. The new government is {game_state.current_president.name} as president and {game_state.current_chancellor.name} as chancellor. You will be given who each player voted for and what they said, and will reflect on what happened during the voting phase. For internal dialogue, write what you think happened during the voting phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-        content += f"\n\nThe votes are:\n{formatted_votes}"
-        content += f"\n\nThe discussion pool is:\n\n{discussion_pool}"
+#endregion
+
+
+#region Rate Limiting
+
+# Output tokens reserved for each decision when acquiring from the token bucket
+RESPONSE_TOKEN_ALLOWANCE = 300
+
+
+def parse_duration(value):
+    """
+    Parses the provider's duration strings ("20ms", "1.5s", "6m0s" or plain seconds) into seconds.
+    Returns None when the value cannot be parsed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def get_retry_delay(error):
+    """
+    Works out how long to wait after a rate limit error, from the Retry-After and
+    x-ratelimit-reset-* response headers or, for failed runs, from the
+    "Please try again in 1.5s" hint in the error message. Returns None if there is no hint.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    
+    if headers.get('retry-after-ms') is not None:
+        delay = parse_duration(headers.get('retry-after-ms'))
+        if delay is not None:
+            return delay / 1000
+    
+    delay = parse_duration(headers.get('retry-after'))
+    if delay is not None:
+        return delay
+    
+    resets = [parse_duration(headers.get(name)) for name in ('x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')]
+    resets = [reset for reset in resets if reset is not None]
+    if resets:
+        return max(resets)
+    
+    message = getattr(error, 'message', None) or str(error)
+    match = re.search(r"try again in ([\d.]+(?:ms|s|m)?)", message)
+    if match:
+        return parse_duration(match.group(1))
+    
+    return None
+
+
+class RateLimiter:
+    """
+    Token bucket for requests per minute and tokens per minute, shared by every game process.
+    
+    The bucket lives in a small JSON file guarded by an exclusive file lock, so all worker
+    processes of a run draw from one budget. When a rate limit error comes back, the pause
+    is written to the same file and every game waits it out together (with a little jitter)
+    instead of each process sleeping on its own.
+    """
+    def __init__(self, rpm_limit=0, tpm_limit=0, state_file=None):
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.state_file = state_file
+        self.local_state = None  # Used when the state cannot be shared through a file
+    
+    def new_state(self):
+        return {
+            "requests": self.rpm_limit,
+            "tokens": self.tpm_limit,
+            "updated": time.time(),
+            "blocked_until": 0,
+            "consecutive_rate_limits": 0
+        }
+    
+    def read_state(self):
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            if set(state) == set(self.new_state()):
+                return state
+        except (OSError, ValueError):
+            pass
+        return self.new_state()
+    
+    def write_state(self, state):
+        temp_path = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_file)
+    
+    @contextmanager
+    def locked_state(self):
+        """
+        Yields the shared bucket state and writes it back while holding the file lock.
+        Nothing inside the block may await, so tasks in this process cannot interleave either.
+        """
+        if self.state_file is None or fcntl is None:
+            if self.local_state is None:
+                self.local_state = self.new_state()
+            yield self.local_state
+            return
         
-    elif action_type == 'reflection_post_voting_phase_failed':
+        with open(f"{self.state_file}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = self.read_state()
+                yield state
+                self.write_state(state)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def refill(self, state, now):
+        elapsed = max(0, now - state["updated"])
+        if self.rpm_limit:
+            state["requests"] = min(self.rpm_limit, state["requests"] + elapsed * self.rpm_limit / 60)
+        if self.tpm_limit:
+            state["tokens"] = min(self.tpm_limit, state["tokens"] + elapsed * self.tpm_limit / 60)
+        state["updated"] = now
+    
+    async def acquire(self, tokens=0):
+        """
+        Waits until one request and the given number of tokens are available, then takes them.
+        Returns the number of seconds waited.
+        """
+        start_time = time.time()
+        if self.tpm_limit:
+            # A request larger than the whole bucket would otherwise never fit
+            tokens = min(tokens, self.tpm_limit)
         
-        votes = game_state.votes
-        formatted_votes = "\n".join([f"- {player}: {vote}" for player, vote in votes.items()])
+        while True:
+            with self.locked_state() as state:
+                now = time.time()
+                self.refill(state, now)
+                
+                wait = state["blocked_until"] - now
+                if wait <= 0:
+                    wait = 0
+                    if self.rpm_limit and state["requests"] < 1:
+                        wait = (1 - state["requests"]) * 60 / self.rpm_limit
+                    if self.tpm_limit and state["tokens"] < tokens:
+                        wait = max(wait, (tokens - state["tokens"]) * 60 / self.tpm_limit)
+                    
+                    if wait == 0:
+                        if self.rpm_limit:
+                            state["requests"] -= 1
+                        if self.tpm_limit:
+                            state["tokens"] -= tokens
+                        return time.time() - start_time
+            
+            await asyncio.sleep(wait + random.uniform(0, 0.1 * wait + 0.05))
+    
+    def reconcile(self, estimated_tokens, used_tokens):
+        """
+        Corrects the token bucket once the real usage of a request is known.
+        A successful request also ends any run of rate limit errors.
+        """
+        with self.locked_state() as state:
+            if self.tpm_limit:
+                state["tokens"] -= used_tokens - estimated_tokens
+            state["consecutive_rate_limits"] = 0
+    
+    def update_from_headers(self, headers):
+        """
+        Lowers the bucket to the provider's x-ratelimit-remaining-* values and pauses
+        everyone until the reset time when the provider reports nothing left.
+        """
+        remaining_requests = headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
         
-        content += f"The vote failed. The presidency will pass to the next player and a new chancellor will be nominated. You are reflecting on the recent voting phase. You will be given what other players said, as well as there votes, and will reflect on what happened during the voting phase. For internal dialogue, write what you think happened during the voting phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-        content += f"\n\nThe votes are: {formatted_votes}"
-        content += f"\n\nThe discussion pool is:\n\n{discussion_pool}"
+        with self.locked_state() as state:
+            now = time.time()
+            if remaining_requests is not None and remaining_requests.isdigit():
+                if self.rpm_limit:
+                    state["requests"] = min(state["requests"], int(remaining_requests))
+                if int(remaining_requests) == 0:
+                    reset = parse_duration(headers.get('x-ratelimit-reset-requests')) or 1
+                    state["blocked_until"] = max(state["blocked_until"], now + reset)
+            if remaining_tokens is not None and remaining_tokens.isdigit():
+                if self.tpm_limit:
+                    state["tokens"] = min(state["tokens"], int(remaining_tokens))
+                if int(remaining_tokens) == 0:
+                    reset = parse_duration(headers.get('x-ratelimit-reset-tokens')) or 1
+                    state["blocked_until"] = max(state["blocked_until"], now + reset)
     
-    elif action_type == 'policy':
+    async def backoff(self, error):
+        """
+        Pauses every game sharing this limiter after a rate limit error. The pause comes from
+        the error's headers or message when available, otherwise it doubles with each
+        consecutive rate limit error (up to 60 seconds). Returns the number of seconds waited.
+        """
+        start_time = time.time()
+        delay = get_retry_delay(error)
         
-        # if the player is the president: 
-        if player.name == game_state.current_president.name:
-            policies = game_state.current_policies
-            policy_one = policies[0]
-            policy_two = policies[1]
-            policy_three = policies[2]
-            content += f"You have randomly drawn 3 policies: {policy_one}, {policy_two}, and {policy_three}. You will discard one and hand the other two to Chancellor {game_state.current_chancellor.name}. The chancellor will discard one and enact the other. The other player will not be able to see the policies you have drawn."
-            content += f" For internal dialogue, write what you are thinking about doing. "
-            content += f"During the policy phase, speaking is not allowed. Write 'na' for your external dialogue."
-            content += f"For decision, write the policy you choose to discard with no additional text. The choices are {policy_one}, {policy_two}, and {policy_three}. Again, the choices are {policy_one}, {policy_two}, and {policy_three}. Choose one to discard with no additional text."
-        # if the player is the chancellor: 
-        elif player.name == game_state.current_chancellor.name:
-            policies = game_state.current_policies
-            policy_one = policies[0]
-            policy_two = policies[1]
-            content += f"President {game_state.current_president.name} has discarded one policy and handed you two policies: {policy_one} and {policy_two}.\nWhich policy do you choose to discard? The other policy will be enacted. "
-            content += f"For internal dialogue, write what you are thinking about doing. "
+        with self.locked_state() as state:
+            state["consecutive_rate_limits"] += 1
+            if delay is None:
+                delay = min(60, 2 ** state["consecutive_rate_limits"])
+            now = time.time()
+            state["blocked_until"] = max(state["blocked_until"], now + delay)
+            wait = state["blocked_until"] - now
+        
+        print(f"Rate limit exceeded. All games pausing for {wait:.1f} seconds.")
+        print("Error:", error)
+        await asyncio.sleep(wait + random.uniform(0, 1))
+        return time.time() - start_time
+
+
+rate_limiter = None  # False once the command line turned out to set no limit
+
+
+def get_rate_limiter(log_folder_path=None):
+    """
+    Returns this process's handle on the shared rate limiter, creating it from the command line arguments,
+    or None when neither --rpm_limit nor --tpm_limit is set, so requests skip it. Without --rate_limit_file
+    its state file is rate_limit.json in log_folder_path, the run's log folder (see run_game).
+    """
+    global rate_limiter
+    if rate_limiter is None:
+        args = parse_args()
+        if not (args.rpm_limit or args.tpm_limit):
+            rate_limiter = False
+        else:
+            state_file = args.rate_limit_file
+            if state_file is None and log_folder_path is not None:
+                state_file = f"{log_folder_path}/rate_limit.json"
+            rate_limiter = RateLimiter(args.rpm_limit, args.tpm_limit, state_file)
+    return rate_limiter or None
+
+
+#endregion
+
+
+#region Retry Policy
+
+class NonRetryableError(Exception):
+    """
+    Raised for a failed request or run that would fail the same way if it were sent again.
+    """
+
+
+class RetryPolicy:
+    """
+    Classifies failed requests by exception type and status code and waits before the next attempt.
+
+    - rate_limit: 429s (and runs failed with rate_limit_exceeded) pause every game through the
+      shared rate limiter, see RateLimiter.backoff. Without a rate limiter they are retried like
+      retryable errors.
+    - retryable: timeouts, connection errors, 408, 409 and 5xx (and errors raised by this script,
+      such as a missing reply) wait for the Retry-After header if the server sent one, otherwise
+      for a capped exponential backoff with full jitter.
+    - fatal: any other 4xx (bad request, authentication, permission, not found, ...) and
+      NonRetryableError. These are raised instead of retried.
+    """
+    def __init__(self, base_delay, max_delay):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def classify(self, error):
+        if isinstance(error, NonRetryableError):
+            return "fatal"
+        if isinstance(error, RateLimitError):
+            return "rate_limit"
+        if isinstance(error, APIConnectionError):  # includes APITimeoutError
+            return "retryable"
+        if isinstance(error, APIStatusError):
+            if error.status_code == 429:
+                return "rate_limit"
+            if error.status_code in (408, 409) or error.status_code >= 500:
+                return "retryable"
+            # A run is refused while the thread's previous (cancelled) run is still winding down
+            if is_active_run_error(error):
+                return "retryable"
+            return "fatal"
+        return "retryable"
+
+    def backoff_delay(self, attempt, error=None):
+        """
+        Seconds to wait before retry number attempt + 1: the server's Retry-After hint when
+        there is one, otherwise a random delay up to base_delay * 2 ** attempt (at most max_delay).
+        """
+        hint = get_retry_delay(error) if isinstance(error, APIStatusError) else None
+        if hint is not None:
+            return min(hint, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def wait(self, error, attempt, metrics):
+        """
+        Waits before retrying after the error, adding the time to the call's metrics (rate limit
+        pauses to queue_wait, other backoff to backoff). Raises the error if it is not retryable.
+        """
+        kind = self.classify(error)
+        if kind == "fatal":
+            print(f"Not retrying: {error}")
+            raise error
+        rate_limiter = get_rate_limiter()
+        if kind == "rate_limit" and rate_limiter is not None:
+            metrics["queue_wait"] += await rate_limiter.backoff(error)
+            return
+
+        delay = self.backoff_delay(attempt, error)
+        print(f"Retrying in {delay:.1f} seconds after error: {error}")
+        await asyncio.sleep(delay)
+        metrics["backoff"] += delay
+
+
+retry_policy = None
+
+
+def get_retry_policy():
+    """
+    Returns this process's retry policy, creating it from the command line arguments.
+    """
+    global retry_policy
+    if retry_policy is None:
+        args = parse_args()
+        retry_policy = RetryPolicy(args.retry_base_delay, args.retry_max_delay)
+    return retry_policy
+
+#endregion
+
+
+#region Response Cache
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Agent responses of one game keyed by (player, prompt hash, schema hash), one JSON entry per line.
+
+    When recording, every response is appended as soon as it arrives. When replaying, responses are
+    handed out in the order they were recorded for each key, so repeated prompts replay in order too.
+    The first line holds the game's seed, which a replay uses unless --seed is given.
+    """
+    def __init__(self, path, mode, seed=None):
+        self.path = path
+        self.mode = mode  # 'record' or 'replay'
+        self.seed = seed
+        self.responses = {}
+
+        if mode == "replay":
+            with open(path) as f:
+                header = json.loads(f.readline())
+                self.seed = header["seed"] if seed is None else seed
+                for line in f:
+                    entry = json.loads(line)
+                    self.responses.setdefault(entry["key"], []).append(entry)
+            for entries in self.responses.values():
+                entries.reverse()  # pop() hands them out in recorded order
+            self.file = None
+        else:
+            # A resumed game keeps recording to its cache
+            resumed = os.path.exists(path) and os.path.getsize(path) > 0
+            if resumed:
+                with open(path) as f:
+                    self.seed = json.loads(f.readline())["seed"]
+            self.file = open(path, "a", buffering=1)
+            if not resumed:
+                self.file.write(json.dumps({"seed": self.seed}) + "\n")
+
+    @staticmethod
+    def key(player, content, response_format):
+        return f"{player.name}:{hash_text(content)}:{hash_text(json.dumps(response_format, sort_keys=True))}"
+
+    def record(self, player, content, response_format, exchange):
+        entry = {"key": self.key(player, content, response_format), "player": player.name}
+        entry.update(exchange)
+        self.file.write(json.dumps(entry) + "\n")
+
+    def replay(self, player, content, response_format):
+        entries = self.responses.get(self.key(player, content, response_format))
+        if not entries:
+            raise Exception(f"No recorded response for {player.name} in {self.path}. The game has diverged from the recording.")
+        entry = entries.pop()
+        return {name: entry[name] for name in ("user_message", "assistant_message", "response", "usage")}
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def open_response_cache(args, game_id):
+    """
+    Opens the game's response cache for --record or --replay (None when neither is given).
+    """
+    if args.replay:
+        return ResponseCache(f"{args.replay}/{game_id}.jsonl", "replay", args.seed)
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+        seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+        return ResponseCache(f"{args.record}/{game_id}.jsonl", "record", seed)
+    return None
+
+#endregion
+
+
+#region Metrics
+
+# Upper bounds of the histogram buckets
+SECONDS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKENS_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+# Histograms exported per call: (metric name, call field, buckets, help text)
+CALL_HISTOGRAMS = (
+    ("call_seconds", "wall_time", SECONDS_BUCKETS, "Wall time of one agent decision, from sending the prompt to the parsed reply."),
+    ("queue_wait_seconds", "queue_wait", SECONDS_BUCKETS, "Time a decision waited on the shared rate limiter."),
+    ("run_creation_seconds", "run_creation", SECONDS_BUCKETS, "Time until the assistant run was created (assistants backend)."),
+    ("model_latency_seconds", "model_latency", SECONDS_BUCKETS, "Time from starting the successful run or completion to its result."),
+    ("prompt_tokens", "prompt_tokens", TOKENS_BUCKETS, "Prompt tokens of one agent decision."),
+)
+
+# Counters exported per call: (metric name, call field, help text)
+CALL_COUNTERS = (
+    ("prompt_tokens_total", "prompt_tokens", "Prompt tokens used."),
+    ("cached_tokens_total", "cached_tokens", "Prompt tokens served from the provider's prompt cache."),
+    ("completion_tokens_total", "completion_tokens", "Completion tokens used."),
+    ("retries_total", "retries", "Retried runs or completions."),
+    ("polls_total", "polls", "Run status polls (poll run mode)."),
+    ("backoff_seconds_total", "backoff", "Seconds spent backing off before retries (rate limit pauses are in queue wait)."),
+    ("hedges_total", "hedged", "Decisions that sent a hedged duplicate request (see --hedge_percentile)."),
+    ("hedge_wins_total", "hedge_won", "Hedged decisions answered by the duplicate request."),
+    ("context_trims_total", "context_trims", "Decisions that compacted more of the player's context to stay under the prompt token limit (see --context_limit)."),
+    ("predicted_prompt_tokens_total", "predicted_prompt_tokens", "Prompt tokens estimated before sending (compare with prompt_tokens_total)."),
+    ("cost_dollars_total", "cost", "Cost in USD (see MODEL_PRICES)."),
+    ("hedge_waste_estimate_dollars_total", "hedge_waste_estimate", "Estimated USD of hedge losers cancelled in flight, whose usage the API never reported (not in cost_dollars_total)."),
+)
+
+
+def new_call_metrics():
+    """
+    Returns the timings and counts one agent decision collects while it is sent
+    (see send_to_api). Times are in seconds.
+    """
+    return {"queue_wait": 0.0, "run_creation": 0.0, "model_latency": 0.0, "polls": 0, "retries": 0, "backoff": 0.0, "hedged": 0, "hedge_won": 0,
+            "predicted_prompt_tokens": 0, "context_trims": 0, "requests_sent": 0, "hedge_waste_estimate": 0.0}
+
+
+def record_call_metrics(game_state, player, action_type, metrics, usage, cost, wall_time):
+    """
+    Stores the metrics of one agent decision, tagged with the game, round, action type, player and role.
+    """
+    call = {
+        "game_id": game_state.game_id,
+        "round": game_state.round_number,
+        "action_type": action_type,
+        "player": player.name,
+        "role": player.role,
+        "wall_time": round(wall_time, 4),
+        "queue_wait": round(metrics["queue_wait"], 4),
+        "run_creation": round(metrics["run_creation"], 4),
+        "model_latency": round(metrics["model_latency"], 4),
+        "polls": metrics["polls"],
+        "retries": metrics["retries"],
+        "backoff": round(metrics["backoff"], 4),
+        "hedged": metrics["hedged"],
+        "hedge_won": metrics["hedge_won"],
+        "context_trims": metrics["context_trims"],
+        "predicted_prompt_tokens": metrics["predicted_prompt_tokens"],
+        "prompt_tokens": usage["prompt_tokens"],
+        "cached_tokens": usage["cached_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "cost": cost,
+        "hedge_waste_estimate": metrics["hedge_waste_estimate"],
+    }
+    game_state.call_metrics.append(call)
+    log_event(game_state, "call", **{name: value for name, value in call.items() if name not in ("game_id", "round")})
+    
+    print(f"{action_type} by {player.name}: {wall_time:.2f}s ({call['queue_wait']:.2f}s queued, {call['retries']} retries), "
+          f"{call['prompt_tokens']} prompt ({call['cached_tokens']} cached) and {call['completion_tokens']} completion tokens, ${cost:.4f}. "
+          f"Game total: {game_state.total_tokens_used} tokens, ${game_state.total_cost:.4f}")
+
+
+def build_histogram(values, buckets):
+    """
+    Returns the cumulative bucket counts (Prometheus style, with +Inf), sum and count of the values.
+    """
+    counts = {str(bucket): sum(1 for value in values if value <= bucket) for bucket in buckets}
+    counts["+Inf"] = len(values)
+    return {"buckets": counts, "sum": round(sum(values), 4), "count": len(values)}
+
+
+def summarize_call_metrics(calls):
+    """
+    Aggregates calls by action type: number of calls, totals of every field and histograms.
+    """
+    summary = {}
+    for action_type in sorted({call["action_type"] for call in calls}):
+        action_calls = [call for call in calls if call["action_type"] == action_type]
+        summary[action_type] = {
+            "calls": len(action_calls),
+            "totals": {field: round(sum(call[field] for call in action_calls), 4)
+                       for field in ("wall_time", "queue_wait", "run_creation", "model_latency", "polls", "retries",
+                                     "backoff", "hedged", "hedge_won", "context_trims", "predicted_prompt_tokens", "prompt_tokens",
+                                     "cached_tokens", "completion_tokens", "cost", "hedge_waste_estimate")},
+            "histograms": {name: build_histogram([call[field] for call in action_calls], buckets)
+                           for name, field, buckets, _ in CALL_HISTOGRAMS},
+        }
+    return summary
+
+
+def format_prometheus_metrics(calls):
+    """
+    Returns the calls as Prometheus text exposition format, labelled by game id, action type and role.
+    """
+    groups = {}
+    for call in calls:
+        groups.setdefault((call["game_id"], call["action_type"], call["role"]), []).append(call)
+    
+    lines = []
+    for name, field, buckets, help_text in CALL_HISTOGRAMS:
+        lines.append(f"# HELP secret_hitler_{name} {help_text}")
+        lines.append(f"# TYPE secret_hitler_{name} histogram")
+        for (game_id, action_type, role), group in sorted(groups.items()):
+            labels = f'game_id="{game_id}",action_type="{action_type}",role="{role}"'
+            histogram = build_histogram([call[field] for call in group], buckets)
+            for bucket, count in histogram["buckets"].items():
+                lines.append(f'secret_hitler_{name}_bucket{{{labels},le="{bucket}"}} {count}')
+            lines.append(f"secret_hitler_{name}_sum{{{labels}}} {histogram['sum']}")
+            lines.append(f"secret_hitler_{name}_count{{{labels}}} {histogram['count']}")
+    
+    for name, field, help_text in CALL_COUNTERS:
+        lines.append(f"# HELP secret_hitler_{name} {help_text}")
+        lines.append(f"# TYPE secret_hitler_{name} counter")
+        for (game_id, action_type, role), group in sorted(groups.items()):
+            labels = f'game_id="{game_id}",action_type="{action_type}",role="{role}"'
+            lines.append(f"secret_hitler_{name}{{{labels}}} {sum(call[field] for call in group)}")
+    
+    return "\n".join(lines) + "\n"
+
+
+def write_call_metrics(game_state, log_folder_path):
+    """
+    Writes the game's per-call metrics at game end: a JSON summary by action type (with every call)
+    to GAME_ID.metrics.json and a Prometheus text file to GAME_ID.prom.
+    """
+    calls = game_state.call_metrics
+    summary = {
+        "game_id": game_state.game_id,
+        "calls": len(calls),
+        "by_action_type": summarize_call_metrics(calls),
+        "call_list": calls,
+    }
+    with open(f"{log_folder_path}/{game_state.game_id}.metrics.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    with open(f"{log_folder_path}/{game_state.game_id}.prom", "w") as f:
+        f.write(format_prometheus_metrics(calls))
+
+#endregion
+
+
+#region Cost Accounting
+
+# USD per 1M tokens
+MODEL_PRICES = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+}
+
+# Model a game switches to when it degrades near its budget
+CHEAPER_MODELS = {
+    "gpt-4o": "gpt-4o-mini",
+}
+
+# Context limits of a degraded game (see build_context_window)
+DEGRADED_CONTEXT_ROUNDS = 2
+DEGRADED_CONTEXT_TOKEN_BUDGET = 16000
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by send_to_api when a game or its run goes over a cost or token budget,
+    or before a call that would (see reserve_budget).
+    The game stops and can continue from its last checkpoint with --resume.
+    """
+
+
+def call_cost(model, usage):
+    """
+    Returns the cost in USD of one call's usage (see build_exchange), 0 for models without a price.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    uncached_tokens = usage["prompt_tokens"] - usage["cached_tokens"]
+    return (uncached_tokens * prices["input"]
+            + usage["cached_tokens"] * prices["cached_input"]
+            + usage["completion_tokens"] * prices["output"]) / 1_000_000
+
+
+def add_run_cost(ledger_path, game_id, cost):
+    """
+    Adds a call's cost to the game's entry in the run folder's cost ledger (shared by every
+    game process of the run) and returns the run's total cost so far. Costs are only ever
+    added, so calls replayed after --resume still count.
+    """
+    if ledger_path is None:
+        return 0.0
+    
+    with open(f"{ledger_path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            try:
+                with open(ledger_path) as f:
+                    ledger = json.load(f)
+            except (OSError, ValueError):
+                ledger = {}
+            ledger[game_id] = ledger.get(game_id, 0.0) + cost
+            temp_path = f"{ledger_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(ledger, f, indent=2)
+            os.replace(temp_path, ledger_path)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    return sum(ledger.values())
+
+
+def read_run_cost(ledger_path):
+    """
+    Returns the run's total cost so far from the cost ledger (see add_run_cost) without adding to it.
+    """
+    if ledger_path is None:
+        return 0.0
+    try:
+        with open(ledger_path) as f:
+            return sum(json.load(f).values())
+    except (OSError, ValueError):
+        return 0.0
+
+
+def apply_budget_args(game_state, args):
+    """
+    Sets the game's budgets from the command line (also on --resume, so they can be raised).
+    """
+    game_state.max_cost_per_game = args.max_cost_per_game
+    game_state.max_tokens_per_game = args.max_tokens_per_game
+    game_state.max_cost_per_run = args.max_cost_per_run
+    game_state.budget_degrade_at = args.budget_degrade_at
+
+
+def degrade_game(game_state, reason):
+    """
+    Makes the rest of the game cheaper: a cheaper model (if there is one) and a tighter context window.
+    """
+    game_state.budget_degraded = True
+    game_state.model = CHEAPER_MODELS.get(game_state.model, game_state.model)
+    game_state.context_rounds = min(game_state.context_rounds or DEGRADED_CONTEXT_ROUNDS, DEGRADED_CONTEXT_ROUNDS)
+    game_state.context_token_budget = min(game_state.context_token_budget or DEGRADED_CONTEXT_TOKEN_BUDGET, DEGRADED_CONTEXT_TOKEN_BUDGET)
+    
+    print(f"Budget: {reason}. Continuing with {game_state.model}, the last {game_state.context_rounds} rounds "
+          f"and at most {game_state.context_token_budget} prompt tokens of context.")
+    log_event(game_state, "budget_degrade", reason=reason, model=game_state.model,
+              context_rounds=game_state.context_rounds, context_token_budget=game_state.context_token_budget)
+
+
+def enforce_budgets(game_state, cost):
+    """
+    Accounts for one call's cost and checks the game's budgets: past budget_degrade_at of any
+    budget the game degrades (see degrade_game), past a budget it stops with BudgetExceeded.
+    """
+    game_state.total_cost += cost
+    run_cost = add_run_cost(game_state.cost_ledger_path, game_state.game_id, cost)
+    
+    budgets = [
+        ("game cost", game_state.total_cost, game_state.max_cost_per_game, "$"),
+        ("game tokens", game_state.total_tokens_used, game_state.max_tokens_per_game, ""),
+        ("run cost", run_cost, game_state.max_cost_per_run, "$"),
+    ]
+    for name, used, limit, unit in budgets:
+        if limit and used >= limit:
+            raise BudgetExceeded(f"The {name} of {unit}{used:,.2f} reached its budget of {unit}{limit:,.2f}")
+    
+    if not game_state.budget_degraded:
+        for name, used, limit, unit in budgets:
+            if limit and used >= limit * game_state.budget_degrade_at:
+                degrade_game(game_state, f"the {name} of {unit}{used:,.2f} passed {game_state.budget_degrade_at:.0%} of its budget")
+                break
+
+def reserve_budget(game_state, predicted_prompt_tokens):
+    """
+    Checks before a call that its expected cost and tokens (the predicted prompt with no cached
+    tokens plus the reply allowance) still fit the budgets, together with the game's calls already
+    in flight, so a phase of concurrent calls cannot overshoot a budget. Raises BudgetExceeded when
+    they do not fit, otherwise reserves them until release_budget and returns the reservation.
+    """
+    expected_tokens = predicted_prompt_tokens + RESPONSE_TOKEN_ALLOWANCE
+    expected_cost = call_cost(game_state.model, {"prompt_tokens": predicted_prompt_tokens, "cached_tokens": 0,
+                                                 "completion_tokens": RESPONSE_TOKEN_ALLOWANCE})
+    reserved_cost = getattr(game_state, "reserved_cost", 0.0) + expected_cost
+    reserved_tokens = getattr(game_state, "reserved_tokens", 0) + expected_tokens
+    run_cost = read_run_cost(game_state.cost_ledger_path) if game_state.max_cost_per_run else 0.0
+    
+    budgets = [
+        ("game cost", game_state.total_cost + reserved_cost, game_state.max_cost_per_game, "$"),
+        ("game tokens", game_state.total_tokens_used + reserved_tokens, game_state.max_tokens_per_game, ""),
+        ("run cost", run_cost + reserved_cost, game_state.max_cost_per_run, "$"),
+    ]
+    for name, expected, limit, unit in budgets:
+        if limit and expected > limit:
+            raise BudgetExceeded(f"The {name} would reach {unit}{expected:,.2f} with the next call and the calls in flight, "
+                                 f"over its budget of {unit}{limit:,.2f}")
+    
+    game_state.reserved_cost = reserved_cost
+    game_state.reserved_tokens = reserved_tokens
+    return expected_cost, expected_tokens
+
+
+def release_budget(game_state, reservation):
+    """
+    Gives back a reservation of reserve_budget once the call has ended (its real cost is accounted by enforce_budgets).
+    """
+    expected_cost, expected_tokens = reservation
+    game_state.reserved_cost -= expected_cost
+    game_state.reserved_tokens -= expected_tokens
+
+#endregion
+
+
+#region Hedged Requests
+
+# Number of recent call latencies kept per action type
+HEDGE_HISTORY = 200
+
+
+class LatencyTracker:
+    """
+    Keeps the latencies of recent calls per action type and tells how long a new call of
+    that action type may take before a duplicate request is sent (see send_hedged).
+    """
+    def __init__(self, percentile, min_samples, min_delay):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latencies = {}
+
+    def record(self, action_type, seconds):
+        self.latencies.setdefault(action_type, deque(maxlen=HEDGE_HISTORY)).append(seconds)
+
+    def hedge_delay(self, action_type):
+        """
+        Returns the percentile of the recent latencies of the action type (at least min_delay),
+        or None when hedging is off or too few calls were seen to tell what is slow.
+        """
+        latencies = self.latencies.get(action_type, ())
+        if not self.percentile or len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+
+latency_tracker = None
+
+
+def get_latency_tracker():
+    """
+    Returns this process's latency tracker, creating it from the command line arguments.
+    """
+    global latency_tracker
+    if latency_tracker is None:
+        args = parse_args()
+        latency_tracker = LatencyTracker(args.hedge_percentile, args.hedge_min_samples, args.hedge_min_delay)
+    return latency_tracker
+
+
+# Background tasks bringing a thread in line with a hedged reply, by thread id (see sync_hedged_thread)
+thread_syncs = {}
+
+
+def is_active_run_error(error):
+    """
+    Returns whether the API refused a request because a run is still active on the thread.
+    """
+    return isinstance(error, APIStatusError) and error.status_code == 400 and "active run" in error.message
+
+
+async def cancel_active_runs(player):
+    """
+    Cancels the runs still active on the player's thread until the API lists none, so a run
+    created while the earlier ones were being cancelled is caught as well.
+    """
+    while True:
+        runs = await client.beta.threads.runs.list(thread_id=player.thread_id, limit=5)
+        active_runs = [run for run in runs.data if run.status in ("queued", "in_progress", "requires_action", "cancelling")]
+        if not active_runs:
+            return
+        for run in active_runs:
+            await cancel_run(player, run.id)
+
+
+async def add_thread_message(player, content, role):
+    """
+    Adds a message to the player's thread, retried under the retry policy. A run still active on
+    the thread (one a cancelled request created late) is cancelled before the next attempt.
+    """
+    retry_policy = get_retry_policy()
+    metrics = new_call_metrics()
+    attempt = 0
+    while True:
+        try:
+            return await client.beta.threads.messages.create(thread_id=player.thread_id, content=content, role=role)
+        except Exception as e:
+            if is_active_run_error(e):
+                await cancel_active_runs(player)
+            await retry_policy.wait(e, attempt, metrics)
+            attempt += 1
+
+
+async def sync_hedged_thread(player, exchange, loser):
+    """
+    Brings the player's thread in line with a decision its hedge answered: once the losing
+    request has unwound, its runs are cancelled, a reply it still managed to write is deleted
+    and the hedge's reply is added, so the thread matches the player's local conversation again.
+    """
+    try:
+        await asyncio.wait({loser})
+        await cancel_active_runs(player)
+
+        list_params = {"after": player.last_message_id} if player.last_message_id else {}
+        new_messages = [message async for message in client.beta.threads.messages.list(thread_id=player.thread_id, order="asc", **list_params)]
+        for message in new_messages:
+            if message.role == "assistant":
+                await client.beta.threads.messages.delete(message.id, thread_id=player.thread_id)
+        # The losing run may have been cancelled before it added the user message
+        if not any(message.role == "user" for message in new_messages):
+            await add_thread_message(player, exchange["user_message"], "user")
+
+        message = await add_thread_message(player, exchange["assistant_message"], "assistant")
+        player.last_message_id = message.id
+    except Exception as e:
+        print(f"Failed to sync {player.name}'s thread with the hedged reply: {e}")
+
+
+async def wait_for_thread_syncs(players):
+    """
+    Waits until the threads of the players are in sync with their hedged replies.
+    """
+    for player in players:
+        sync = thread_syncs.pop(player.thread_id, None)
+        if sync is not None:
+            await sync
+
+
+def first_successful(tasks):
+    """
+    Returns the first of the finished tasks that did not raise, or None.
+    """
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is None:
+            return task
+    return None
+
+
+async def send_hedged(game_state, content, player, action_type, metrics, window, max_retries=100):
+    """
+    Sends the decision with the game's backend. When it takes longer than the hedge delay of its
+    action type (see LatencyTracker), the same decision is also sent as a chat completion and the
+    first reply wins. A thread takes only one run at a time, so the duplicate of an assistants run
+    is a chat completion of the player's mirrored conversation.
+
+    The losing request is cancelled in the background. When it was an assistants run, the player's
+    thread is then synced with the winning reply (see sync_hedged_thread) before its next run.
+    The provider bills the loser as well: when it finished too, its reported usage is stored in
+    metrics["hedge_loser_usage"] for send_to_api. A loser cancelled after its request had gone out
+    reports no usage, so only an estimate (the winner's cost) is kept in metrics["hedge_waste_estimate"],
+    apart from the game's cost and budgets.
+    """
+    tracker = get_latency_tracker()
+    start_time = time.time()
+    if game_state.backend == 'chat':
+        primary = asyncio.ensure_future(send_to_chat_api(game_state, content, player, action_type, metrics, window, max_retries))
+    else:
+        primary = asyncio.ensure_future(send_to_assistants_api(game_state, content, player, action_type, metrics, window, max_retries))
+    hedge = None
+
+    try:
+        delay = tracker.hedge_delay(action_type)
+        await asyncio.wait({primary}, timeout=delay)
+        if primary.done():
+            exchange = primary.result()
+            tracker.record(action_type, time.time() - start_time)
+            return exchange
+
+        print(f"{action_type} by {player.name} is slower than p{tracker.percentile:g} of recent calls ({delay:.2f}s). Sending a hedged request.")
+        hedge_metrics = new_call_metrics()
+        hedge = asyncio.ensure_future(send_to_chat_api(game_state, content, player, action_type, hedge_metrics, window, max_retries))
+
+        pending = {primary, hedge}
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = first_successful(done)
+        if winner is None:
+            return primary.result()  # both failed
+
+        exchange = winner.result()
+        tracker.record(action_type, time.time() - start_time)
+        loser, loser_metrics = (hedge, hedge_metrics) if winner is primary else (primary, metrics)
+        if first_successful([loser]) is not None:
+            loser_usage, waste_estimate = loser.result()["usage"], 0.0
+        elif loser_metrics["requests_sent"]:
+            loser_usage, waste_estimate = None, call_cost(game_state.model, exchange["usage"])  # same prompt, cancelled in flight
+        else:
+            loser_usage, waste_estimate = None, 0.0
+        if winner is hedge:
+            metrics.update(hedge_metrics, queue_wait=metrics["queue_wait"] + hedge_metrics["queue_wait"], hedge_won=1)
+            if game_state.backend != 'chat':
+                thread_syncs[player.thread_id] = asyncio.ensure_future(sync_hedged_thread(player, exchange, primary))
+        metrics["hedge_loser_usage"] = loser_usage
+        metrics["hedge_waste_estimate"] = waste_estimate
+        metrics["hedged"] = 1
+        print(f"{action_type} by {player.name} answered by the {'hedged' if winner is hedge else 'original'} request.")
+        return exchange
+    finally:
+        # Cancelling only schedules the loser's unwinding, the decision does not wait for it
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+#endregion
+
+
+
+def get_cached_tokens(usage):
+    """
+    Returns the number of prompt tokens served from the provider's prompt cache,
+    or 0 when the usage object does not report it.
+    """
+    prompt_tokens_details = getattr(usage, 'prompt_tokens_details', None)
+    if isinstance(prompt_tokens_details, dict):
+        return prompt_tokens_details.get('cached_tokens') or 0
+    return getattr(prompt_tokens_details, 'cached_tokens', None) or 0
+
+
+def record_run_usage(game_state, usage, time_taken=None):
+    """
+    Stores the token usage of a run (or chat completion), given as the usage dictionary of its
+    exchange (see build_exchange), on the game state. time_taken is the model latency of the
+    decision it answered; the losing request of a hedge answered none and is billed without it.
+    """
+    if time_taken is not None:
+        game_state.time_per_run.append(time_taken)
+    
+    game_state.total_input_tokens_used += usage["prompt_tokens"]
+    
+    game_state.total_output_tokens_used += usage["completion_tokens"]
+    
+    game_state.total_tokens_used += usage["total_tokens"]
+    
+    game_state.total_cached_input_tokens_used += usage["cached_tokens"]
+    
+    log_event(game_state, "usage", input_tokens=usage["prompt_tokens"], cached_input_tokens=usage["cached_tokens"],
+              output_tokens=usage["completion_tokens"], time_taken=time_taken)
+
+
+async def cancel_run(player, run_id):
+    """
+    Cancels a run and waits until the API reports it as cancelled, expired (or finished anyway),
+    checking its status once a second.
+    """
+    try:
+        # start a timer 
+        start_cancel_time = time.time()
+        print(f"Cancelling run {run_id}")
+        await client.beta.threads.runs.cancel(thread_id=player.thread_id, run_id=run_id)
+        print(f"Run {run_id} cancelling in progress")
+        
+        while True: 
+            run_status = await client.beta.threads.runs.retrieve(thread_id=player.thread_id, run_id=run_id)
+            if run_status.status in ("cancelled", "expired", "completed", "failed", "incomplete"):
+                print(f"Run {run_id} officially {run_status.status}")
+                cancel_time = time.time() - start_cancel_time
+                print(f"Time taken to cancel or expire run: {cancel_time} seconds")
+                break
+            await asyncio.sleep(1)
+            print(f"Run {run_id} status: {run_status.status}")
+            
+    except Exception as e:
+        print(f"Failed to cancel run: {e}")
+
+
+async def handle_failed_run(run_status, attempt, metrics):
+    """
+    Prints the error of a failed run and waits before the run is retried (see RetryPolicy).
+    Runs that failed on their prompt are not retried and raise NonRetryableError.
+    """
+    last_error = run_status.last_error
+    rate_limiter = get_rate_limiter()
+    if last_error.code == 'rate_limit_exceeded' and rate_limiter is not None:
+        print("Rate limit exceeded within the run. Retrying after a delay.")
+        metrics["queue_wait"] += await rate_limiter.backoff(last_error)
+    elif last_error.code == 'invalid_prompt':
+        raise NonRetryableError(f"Run {run_status.id} failed: {last_error.message}")
+    else:
+        delay = get_retry_policy().backoff_delay(attempt)
+        print(f"Assistant run failed ({last_error.code}: {last_error.message}). Retrying in {delay:.1f} seconds.")
+        await asyncio.sleep(delay)
+        metrics["backoff"] += delay
+
+
+async def stream_run(player, response_format, run_params, metrics, stall_timeout=100):
+    """
+    Starts a run in streaming mode and returns the run as soon as the API sends
+    a terminal event for it (completed, failed, expired, cancelled or incomplete).
+    
+    If no event arrives for stall_timeout seconds, the run is treated as stalled
+    and its latest status is returned so it can be cancelled and retried.
+    The time until the run is created is added to metrics (see new_call_metrics).
+    """
+    terminal_events = {
+        "thread.run.completed",
+        "thread.run.failed",
+        "thread.run.expired",
+        "thread.run.cancelled",
+        "thread.run.incomplete",
+    }
+    
+    run_id = None
+    start_time = time.time()
+    try:
+        async with client.beta.threads.runs.stream(
+            thread_id=player.thread_id,
+            assistant_id=player.assistant_id,
+            response_format=response_format,
+            timeout=stall_timeout,
+            **run_params
+        ) as stream:
+            async for event in stream:
+                if event.event == "thread.run.created":
+                    run_id = event.data.id
+                    metrics["run_creation"] += time.time() - start_time
+                elif event.event in terminal_events:
+                    return event.data
+    except APITimeoutError:
+        if run_id is None:
+            raise
+        print(f"Run {run_id} sent no events for {stall_timeout} seconds.")
+    
+    if run_id is None:
+        raise Exception("Run stream ended before the run was created")
+    
+    # The stream stalled or closed early, so fall back to the current run status
+    return await client.beta.threads.runs.retrieve(thread_id=player.thread_id, run_id=run_id)
+
+
+def build_response_format(player, game_state, action_type):
+    """
+    Builds the structured output response format for the player's next decision,
+    with the decision constrained to the legal choices of the action (see decision_choices).
+    """
+    alive_players = [p for p in game_state.players if p.is_alive]
+    alive_players_not_current_player = [p for p in alive_players if p.name != player.name]
+    dynamic_schema = get_decision_schema(player, alive_players_not_current_player,
+                                         decision_choices(player, game_state, action_type),
+                                         reflection=bool(game_state.pending_reflections.get(player.name)))
+    return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "decision_response",
+                "strict": True,
+                "schema": dynamic_schema
+            }
+        }
+
+
+def build_exchange(user_text, assistant_text, usage):
+    """
+    Packs one decision's user message, the agent's reply (raw and parsed) and its token usage
+    into the dictionary send_to_api hands back to agent_decision.
+    """
+    return {
+        "user_message": user_text,
+        "assistant_message": assistant_text,
+        "response": json.loads(assistant_text),
+        "usage": {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "cached_tokens": get_cached_tokens(usage)
+        }
+    }
+
+
+async def fetch_run_reply(player, run_id):
+    """
+    Fetches only the assistant message produced by the given run (newest first, one message),
+    so the response size does not grow with the length of the thread.
+    """
+    messages = await client.beta.threads.messages.list(
+        thread_id=player.thread_id,
+        run_id=run_id,
+        order="desc",
+        limit=1
+    )
+    
+    for message in messages.data:
+        if message.role == 'assistant':
+            for content_block in message.content:
+                if content_block.type == 'text':
+                    player.last_message_id = message.id
+                    return content_block.text.value
+    
+    raise Exception(f"No assistant reply found for run {run_id}.")
+
+
+async def send_to_chat_api(game_state, content, player, action_type, metrics, window, max_retries=100):
+    """
+    Chat backend for send_to_api. Sends the player's locally kept conversation (within the
+    decision's context window) plus the new user message as a single structured output chat completion.
+    """
+    
+    rate_limiter = get_rate_limiter()
+    messages = build_chat_messages(player, game_state, content, window)
+    estimated_tokens = window.prompt_tokens + RESPONSE_TOKEN_ALLOWANCE
+    
+    retry_count = 0
+    while retry_count < max_retries:
+        try:
+            if rate_limiter is not None:
+                metrics["queue_wait"] += await rate_limiter.acquire(estimated_tokens)
+            start_time = time.time()
+            metrics["requests_sent"] += 1
+            raw_response = await client.chat.completions.with_raw_response.create(
+                model=game_state.model,
+                messages=messages,
+                response_format=build_response_format(player, game_state, action_type),
+                temperature=0.7,
+                top_p=1
+            )
+            if rate_limiter is not None:
+                rate_limiter.update_from_headers(raw_response.headers)
+            completion = raw_response.parse()
+        except Exception as e:
+            print(f"Error during completion for {player.name}. Attempt {retry_count + 1} of {max_retries}")
+            await get_retry_policy().wait(e, retry_count, metrics)
+            retry_count += 1
+            continue
+        
+        choice = completion.choices[0]
+        if choice.finish_reason != "stop" or not choice.message.content:
+            print(f"Completion for {player.name} ended with finish reason: {choice.finish_reason}. Attempt {retry_count + 1} of {max_retries}")
+            retry_count += 1
+            continue
+        
+        metrics["model_latency"] = time.time() - start_time
+        metrics["retries"] = retry_count
+        if rate_limiter is not None:
+            rate_limiter.reconcile(estimated_tokens, completion.usage.total_tokens)
+        
+        return build_exchange(content, choice.message.content, completion.usage)
+    
+    raise Exception(f"Chat completion failed after {max_retries} attempts")
+
+
+def check_context_size(player, game_state, content, metrics):
+    """
+    Pre-flight check of a decision: builds its context window (see build_context_window), stores the
+    predicted prompt tokens in the call's metrics and reports when the player's context is compacted
+    to stay under the prompt token limit. A prompt still over the limit with the whole conversation
+    compacted (the instructions and the new message alone) is sent only if it fits the model's context
+    window, otherwise a NonRetryableError is raised, as the API would reject it every time.
+    When the window starts later than any window before, by --context_rounds or to fit, the new start is
+    kept in player.context_trim_index (see DiscussionPool.for_player).
+    Returns the window, which the decision is sent with.
+    """
+    window = build_context_window(player, game_state, content)
+    predicted_tokens = window.prompt_tokens
+    first_index = window.first_index
+    full_tokens = window.full_tokens
+    metrics["predicted_prompt_tokens"] = predicted_tokens
+    
+    trimmed = first_index > getattr(player, "context_trim_index", 0)
+    if trimmed:
+        player.context_trim_index = first_index
+    
+    token_limit = context_token_limit(game_state)
+    if not token_limit:
+        return window
+    
+    if predicted_tokens > token_limit:
+        model_window = MODEL_CONTEXT_WINDOWS.get(game_state.model)
+        if model_window and predicted_tokens + RESPONSE_TOKEN_ALLOWANCE > model_window:
+            raise NonRetryableError(f"{player.name}'s prompt is about {predicted_tokens} tokens with the whole conversation compacted, "
+                                    f"more than the {model_window} token context window of {game_state.model} allows")
+        print(f"{player.name}'s prompt is about {predicted_tokens} tokens with the whole conversation compacted, over the limit of {token_limit}. "
+              f"Sending it anyway, it fits the context window of {game_state.model}.")
+    
+    if trimmed and full_tokens > token_limit:
+        metrics["context_trims"] = 1
+        print(f"{player.name}'s context would be about {full_tokens} tokens, over the limit of {token_limit}. "
+              f"Compacted it to about {predicted_tokens} tokens ({len(player.conversation) - first_index} recent messages kept verbatim).")
+        log_event(game_state, "context_trim", player=player.name, full_tokens=full_tokens,
+                  predicted_tokens=predicted_tokens, token_limit=token_limit, first_index=first_index)
+    return window
+
+
+async def send_to_api(game_state, content, player, action_type, max_retries=100, round_number=None):
+    """
+    Sends the user message to the player's agent using the game's backend and returns
+    the exchange (user message, raw reply and parsed reply), see build_exchange.
+    With --record the exchange is also saved to the game's response cache, with --replay
+    it is read from the cache instead of the API.
+    The prompt size is predicted before sending (see check_context_size), the call's timings
+    and tokens are recorded under action_type (see record_call_metrics)
+    and its cost, including the losing request of a hedge, is checked against the game's budgets
+    (see enforce_budgets). The exchange is recorded under round_number, the current round by default.
+    """
+    metrics = new_call_metrics()
+    start_time = time.time()
+    response_cache = game_state.response_cache
+    if response_cache is not None:
+        response_format = build_response_format(player, game_state, action_type)
+    
+    # Also when replaying, so the discussion pool texts of later prompts match the recording
+    window = check_context_size(player, game_state, content, metrics)
+    if response_cache is not None and response_cache.mode == "replay":
+        exchange = response_cache.replay(player, content, response_format)
+        record_run_usage(game_state, exchange["usage"], 0.0)
+    else:
+        reservation = reserve_budget(game_state, window.prompt_tokens)
+        try:
+            exchange = await send_hedged(game_state, content, player, action_type, metrics, window, max_retries)
+        finally:
+            release_budget(game_state, reservation)
+        record_run_usage(game_state, exchange["usage"], metrics["model_latency"])
+    loser_usage = metrics.pop("hedge_loser_usage", None)
+    
+    if response_cache is not None and response_cache.mode == "record":
+        response_cache.record(player, content, response_format, exchange)
+    
+    record_exchange(player, game_state, exchange, round_number)
+    cost = call_cost(game_state.model, exchange["usage"])
+    if loser_usage is not None:
+        # The losing request of a hedge is billed too
+        record_run_usage(game_state, loser_usage)
+        cost += call_cost(game_state.model, loser_usage)
+    game_state.hedge_waste_estimate += metrics["hedge_waste_estimate"]
+    record_call_metrics(game_state, player, action_type, metrics, exchange["usage"], cost, time.time() - start_time)
+    enforce_budgets(game_state, cost)
+    return exchange
+
+
+async def send_to_assistants_api(game_state, content, player, action_type, metrics, window, max_retries=100):
+    
+    context_params = build_run_context_params(player, game_state, window)
+    estimated_tokens = window.prompt_tokens + RESPONSE_TOKEN_ALLOWANCE
+    
+    async def start_new_run(player, game_state):
+        return await client.beta.threads.runs.create(
+            thread_id=player.thread_id,
+            assistant_id=player.assistant_id,
+            response_format=build_response_format(player, game_state, action_type),
+            **context_params
+        )
+
+    rate_limiter = get_rate_limiter()
+    retry_policy = get_retry_policy()
+    message_added = False
+
+    retry_count = 0
+    while retry_count < max_retries:
+        try:
+            if not message_added:
+                # A previous hedged decision may still be bringing the thread in line
+                await wait_for_thread_syncs([player])
+                # Create a message in the thread
+                await client.beta.threads.messages.create(
+                    thread_id=player.thread_id,
+                    content=content,
+                    role="user"
+                )
+                message_added = True
+            
+            while True:
+                try:
+                    if rate_limiter is not None:
+                        metrics["queue_wait"] += await rate_limiter.acquire(estimated_tokens)
+                    # Start a run with the assistant
+                    metrics["requests_sent"] += 1
+                    if game_state.run_mode == 'stream':
+                        start_time = time.time()
+                        run_status = await stream_run(player, build_response_format(player, game_state, action_type), context_params, metrics)
+                    else:
+                        await asyncio.sleep(1)
+                        creation_start_time = time.time()
+                        run = await start_new_run(player, game_state)
+                        metrics["run_creation"] += time.time() - creation_start_time
+                    break
+                except Exception as e:
+                    # Rate limits are waited out here, other errors count as a failed attempt below
+                    if retry_policy.classify(e) == "rate_limit":
+                        await retry_policy.wait(e, retry_count, metrics)
+                        continue
+                    raise
+            
+            #region Streamed run
+            if game_state.run_mode == 'stream':
+                
+                if run_status.status == "completed":
+                    metrics["model_latency"] = time.time() - start_time
+                    metrics["retries"] = retry_count
+                    if rate_limiter is not None:
+                        rate_limiter.reconcile(estimated_tokens, run_status.usage.total_tokens)
+                    return build_exchange(content, await fetch_run_reply(player, run_status.id), run_status.usage)
+                
+                elif run_status.status == "failed":
+                    await handle_failed_run(run_status, retry_count, metrics)
+                
+                elif run_status.status in ("expired", "queued", "in_progress"):
+                    print(f"Run {run_status.id} {'expired' if run_status.status == 'expired' else 'stalled'}. Attempt {retry_count + 1} of {max_retries}")
+                    # Cancel the current run before starting a new one
+                    if run_status.status != "expired":
+                        await cancel_run(player, run_status.id)
+                
+                else:
+                    print(f"Run {run_status.id} ended with status: {run_status.status}")
+                
+                retry_count += 1
+                continue
+            #endregion
+            
+            # Wait for the run to complete
+            counter = 0
+            await asyncio.sleep(2)
+            start_time = time.time()
+            while True:
+                counter += 1
+                metrics["polls"] += 1
+                run_status = await client.beta.threads.runs.retrieve(thread_id=player.thread_id, run_id=run.id)
+                
+                if run_status.status == "completed":
+                    
+                    end_time = time.time()
+                    time_taken = end_time - start_time
+                    metrics["model_latency"] = time_taken
+                    metrics["retries"] = retry_count
+                    if rate_limiter is not None:
+                        rate_limiter.reconcile(estimated_tokens, run_status.usage.total_tokens)
+                    
+                    return build_exchange(content, await fetch_run_reply(player, run.id), run_status.usage)
+                
+                elif run_status.status == "expired" or (counter > 100 and run_status.status == "in_progress"):
+                    
+                    print(f"Run {run.id} {'expired' if run_status.status == 'expired' else 'stalled'}. Attempt {retry_count + 1} of {max_retries}")
+                    # Cancel the current run before starting a new one
+                    await cancel_run(player, run.id)
+                    break  # Break the inner while loop to start a new run
+                
+                elif run_status.status == "expired" or (counter > 50 and run_status.status == "in_progress"):
+                    print(f"Run {run.id} stuck.")
+                    print(f"Run {run.id} status: {run_status.status}")
+                
+                elif run_status.status == "expired" or (counter > 10 and run_status.status == "in_progress"):
+                    print(f"Run {run.id} probably stuck.")
+                    print(f"Run {run.id} status: {run_status.status}")
+                
+                elif run_status.status == "failed":
+                    await handle_failed_run(run_status, retry_count, metrics)
+                    break
+                
+                await asyncio.sleep(1)  # Wait before checking again
+            
+            
+            retry_count += 1
+            
+        except Exception as e:
+            print(f"Error during run for {player.name}. Attempt {retry_count + 1} of {max_retries}")
+            if is_active_run_error(e):
+                await cancel_active_runs(player)
+            await retry_policy.wait(e, retry_count, metrics)
+            retry_count += 1
+    
+    raise Exception(f"Assistant run failed after {max_retries} attempts")
+
+
+# Phase names shown to the agents, by action type
+PHASE_NAMES = {
+    "nominate": "Nomination Phase",
+    "discussion_post_nomination": "Discussion Post-Nomination Phase",
+    "vote": "Voting Phase",
+    "reflection_post_voting_phase_passed": "Reflection After Voting Phase (Passed)",
+    "reflection_post_voting_phase_failed": "Reflection After Voting Phase (Failed)",
+    "policy": "Policy Enactment",
+    "policy_with_veto": "Policy Enactment with Veto",
+    "chancellor_veto": "Chancellor Vetod Policies",
+    "discussion_post_veto_successful": "Discussion Post-Veto Success",
+    "reflection_post_veto_successful": "Reflection Post-Veto Success",
+    "chancellor_forced_policy": "Chancellor Forced Policy Enactment",
+    "discussion_post_policy_enactment_with_veto": "Discussion Post-Policy Enactment with Veto",
+    "reflection_post_policy_enactment_with_veto": "Reflection Post-Policy Enactment with Veto",
+    "discussion_post_policy_enactment": "Discussion Post-Policy Enactment",
+    "reflection_post_policy_enactment": "Reflection Post-Policy Enactment",
+    "peek_top_3_policies": "Peek at Top 3 Policies",
+    "reflection_post_peek_top_3_policies": "Reflection Post-Peek at Top 3 Policies",
+    "discuss_remove_a_player_one": "Discussion for Player Removal",
+    "remove_a_player_one": "Player Removal",
+    "discuss_remove_a_player_two": "Discussion for Player Removal",
+    "remove_a_player_two": "Player Removal",
+    "reflection_post_remove_a_player": "Reflection Post Player Removal",
+    "discussion_post_game": "Discussion Post-Game",
+    "reflection_post_game": "Reflection Post-Game"
+}
+
+
+def build_game_state_content(player, game_state, action_type):
+    """
+    Builds the start of a decision prompt: who the player is (and their teammate) and the
+    current game state, with the phase of the action type.
+    """
+    # Default phase name if action_type is not in the map
+    phase_name = PHASE_NAMES.get(action_type, "")
+    
+    fascist_policies_needed_for_win = 6 - game_state.fascist_policies
+    liberal_policies_needed_for_win = 5 - game_state.liberal_policies
+    
+    # The reminder of who the player is never changes, so it goes before the game state,
+    # which changes with every message (see build_instructions for the cached prefix)
+    content = f"You are {player.name}. Remember, this name is unique to you. When others player use this name in discussions, they are referring to you."
+    
+    
+    if player.role == 'Hitler':
+        for p in game_state.players:
+            if p.role == 'Fascist':
+                teammate = p.name
+        content += f"\nYou are Hitler. You are the leader of the Fascist party. Your teammate is {teammate}.\n\n" 
+        
+    if player.role == 'Fascist':
+        for p in game_state.players:
+            if p.role == 'Hitler':
+                teammate = p.name
+        content += f"\nYou are a Fascist. Your teammate, {teammate}, is Hitler.\n\n"
+    
+    if player.role == 'Liberal':
+        content += f"\nYou are a Liberal.\n\n"
+    
+    
+    content += f"Secret Hitler Game State:\n"
+    content += f"- Round: {game_state.round_number}\n"
+    content += f" - Phase: {phase_name}"
+    content += f"- Liberal Policies Enacted: {game_state.liberal_policies}\n"
+    content += f"- Fascist Policies Enacted: {game_state.fascist_policies}\n"
+    content += f"- Number of Fascist Policies Needed for Fascist Win: {fascist_policies_needed_for_win}\n"
+    content += f"- Number of Liberal Policies Needed for Liberal Win: {liberal_policies_needed_for_win}\n"
+    content += f"- Number of Failed Elections in a Row: {game_state.election_tracker}\n  - Note that after 3 failed elections, a random policy will be enacted. You do not know if it will be fascist or liberal."
+    if game_state.fascist_policies == 5:
+        content += f"If one more Fascist policy is enacted, the Fascists will win the game.\n"
+    if game_state.liberal_policies == 5:
+        content += f"If one more Liberal policy is enacted, the Liberals will win the game.\n"
+    content += f"\n- Players Alive: {[p.name for p in game_state.players if p.is_alive]}\n"
+    content += f"\n"
+    
+    if game_state.fascist_policies >= 3:
+        content += f"NOTE: Three or more Fascist policies have been enacted. This means if Hitler is elected chancellor, the Fascists will win the game.\n\n"
+    
+    return content
+
+
+async def agent_decision(player, game_state, action_type, discussion_pool = None):
+
+    # This player's reflections from batch jobs that have ended go into its context first
+    await merge_reflection_batches(game_state, player)
+
+    # Only the statements this player has not been sent yet, see DiscussionPool
+    if isinstance(discussion_pool, DiscussionPool):
+        discussion_pool = discussion_pool.for_player(player)
+
+    #region Build the content for the user message
+    
+    content = build_game_state_content(player, game_state, action_type)
+    
+    #endregion
+
+    # Reflections deferred to this decision (--fused_reflection), see parallel_reflection
+    pending_reflections = game_state.pending_reflections.get(player.name, [])
+    if pending_reflections:
+        content += ("Before this decision, reflect on what happened since your last decision and write your reflection in the reflection field. "
+                    "Where the following asks for your internal dialogue, write it in the reflection field. "
+                    "What it says about external dialogue and decision does not apply, those are for the decision that comes after it.\n\n")
+        for reflection in pending_reflections:
+            content += f"{PHASE_NAMES.get(reflection['action_type'], '')}:\n{reflection['content']}\n\n"
+        content += "Now the decision you have to make:\n\n"
+    
+    # Action-specific content
+    content += build_action_content(player, game_state, action_type, discussion_pool)
+
+    exchange = await send_to_api(
+        game_state=game_state,
+        content=content,
+        player=player,
+        action_type=action_type
+    )
+
+    #region storing the messages in the log_messages_by_player dictionary
+    game_state.log_messages_by_player[player.name].extend(
+        format_log_messages(player.name, player.role, exchange["user_message"], exchange["response"])
+    )
+    log_event(game_state, "exchange", player=player.name, role=player.role, action_type=action_type,
+              user_message=exchange["user_message"], response=exchange["response"])
+    
+    #endregion
+    
+
+    #region return the parsed decision and update memory 
+    decision = parse_decision(player, game_state, action_type, exchange["assistant_message"].strip())
+    
+    response_dict = exchange["response"]
+    
+    # The reflections go first, so the phase log of this decision still finds its own memory entries last
+    if pending_reflections:
+        apply_fused_reflections(player, game_state, pending_reflections, response_dict)
+        del game_state.pending_reflections[player.name]
+    
+    update_memory(player, game_state, action_type, response_dict, decision.choice)
+
+    return decision
+    #endregion
+
+
+def build_action_content(player, game_state, action_type, discussion_pool = None):
+    """
+    Builds the action specific part of a decision prompt (what happened and what the player decides),
+    which agent_decision adds after the player's identity and the game state.
+    """
+    content = ""
+
+    if action_type == 'nominate':
+        eligible = [p.name for p in game_state.players if p != player and p.is_alive and not p.last_chancellor]
+        
+        if game_state.round_number == 1:
+            content += f"\nIt is the first round. You are the president. Nominate a chancellor. Players you can nominate: {eligible}\n"
+        else:
+            content += f"\nIt is a new round and you are president. Nominate a Chancellor from eligible players. The last elected chancellor is not eligible.\n\nEligible players: {eligible}\n"
+        content += f"For internal dialogue, write what you are thinking about doing. "
+        content += f"For external dialogue, write who you would like to nominate as chancellor along with your reasoning for why you would like to nominate them. "
+        content += f"For decision, write the name of the player you nominate as chancellor with no additional text. "
+        
+        election_tracker = game_state.election_tracker
+        if election_tracker == 2:
+            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
+            
+    elif action_type == 'discussion_post_nomination' and player.name != game_state.current_chancellor.name:
+        content += f"{game_state.current_chancellor.name} has been nominated as chancellor by {game_state.current_president.name}. Before voting, you will discuss with other players about whether you should accept this nomination. You will be given the context of what other players are saying. For internal dialogue, write what you are thinking about doing. For external dialogue, write what you want to say to everyone. You can lie and manipulate. For decision, write either 'Reject' or 'Accept' with no additional text.\n\n"
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+        
+        election_tracker = game_state.election_tracker
+        if election_tracker == 2:
+            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
+        
+        if game_state.round_number == 1: 
+            content += f"This is the first round, and no policies have been enacted yet. Rejecting the Chancellor at this stage doesn't provide any new information about the players. It's advisable to accept the Chancellor and vote 'Ja' to start gathering insights based on the actions and decisions of others.\n"
+        
+    elif action_type == 'discussion_post_nomination' and player.name == game_state.current_chancellor.name:
+        content += f"You are in a round of discussions about your nomination as chancellor. For internal dialogue, write your thoughts about being nominated. For external dialogue, justify why (or why not) you should be chancellor. You can lie and manipulate. For decision, write either 'Reject' or 'Accept' with no additional text.\n\n"
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+        
+        if game_state.round_number == 1: 
+            content += f"\nThis is the first round, and no policies have been enacted yet. Rejecting the Chancellor at this stage doesn't provide any new information about the players. It's advisable to accept the Chancellor and vote 'Ja' to start gathering insights based on the actions and decisions of others.\n\n"
+        
+        election_tracker = game_state.election_tracker
+        if election_tracker == 2:
+            content += f"\n\nNOTE: The election tracker is at two. If this election fails, the top policy in the policy deck will be enacted automatically and we will move on to the next round with a new president."
+    
+    elif action_type == 'vote':
+        
+        president = game_state.current_president.name
+        chancellor = game_state.current_chancellor.name
+        content += f"We are in the voting phase. President {president} has nominated {chancellor} to be Chancellor. "
+        content += f"You must decide if you would like to vote Ja (Yes) or Nein (No) for {chancellor} as chancellor. "
+        content += f"You will be given what was discussed before voting. Based on your roll and previous discussions, decide what to do.\n"    
+        content += f"\nDiscussions: \n\n{discussion_pool}\n\n"    
+        content += f"For internal dialogue, write what you are thinking about doing."
+        content += f"For external dialogue, write what you want to say to everyone."
+        content += f"For decision, write either 'Ja' (Yes) or 'Nein' (No) with no additional text. Again, for decision, write 'Ja' or 'Nein' with no additional text." 
+        
+        election_tracker = game_state.election_tracker
+        if election_tracker == 2:
+            content += f"\n\nNOTE: The election tracker is at two. If this election fails, a random policy from the policy deck will be enacted automatically and we will move on to the next round with a new president."
+    
+    elif action_type == 'reflection_post_voting_phase_passed':
+        
+        votes = game_state.votes
+        formatted_votes = "\n".join([f"- {player}: {vote}" for player, vote in votes.items()])
+
+        content += f"The vote passed. The new government is {game_state.current_president.name} as president and {game_state.current_chancellor.name} as chancellor. You will be given who each player voted for and what they said, and will reflect on what happened during the voting phase. For internal dialogue, write what you think happened during the voting phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+        content += f"\n\nThe votes are:\n{formatted_votes}"
+        content += f"\n\nThe discussion pool is:\n\n{discussion_pool}"
+        
+    elif action_type == 'reflection_post_voting_phase_failed':
+        
+        votes = game_state.votes
+        formatted_votes = "\n".join([f"- {player}: {vote}" for player, vote in votes.items()])
+        
+        content += f"The vote failed. The presidency will pass to the next player and a new chancellor will be nominated. You are reflecting on the recent voting phase. You will be given what other players said, as well as there votes, and will reflect on what happened during the voting phase. For internal dialogue, write what you think happened during the voting phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+        content += f"\n\nThe votes are: {formatted_votes}"
+        content += f"\n\nThe discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'policy':
+        
+        # if the player is the president: 
+        if player.name == game_state.current_president.name:
+            policies = game_state.current_policies
+            policy_one = policies[0]
+            policy_two = policies[1]
+            policy_three = policies[2]
+            content += f"You have randomly drawn 3 policies: {policy_one}, {policy_two}, and {policy_three}. You will discard one and hand the other two to Chancellor {game_state.current_chancellor.name}. The chancellor will discard one and enact the other. The other player will not be able to see the policies you have drawn."
+            content += f" For internal dialogue, write what you are thinking about doing. "
+            content += f"During the policy phase, speaking is not allowed. Write 'na' for your external dialogue."
+            content += f"For decision, write the policy you choose to discard with no additional text. The choices are {policy_one}, {policy_two}, and {policy_three}. Again, the choices are {policy_one}, {policy_two}, and {policy_three}. Choose one to discard with no additional text."
+        # if the player is the chancellor: 
+        elif player.name == game_state.current_chancellor.name:
+            policies = game_state.current_policies
+            policy_one = policies[0]
+            policy_two = policies[1]
+            content += f"President {game_state.current_president.name} has discarded one policy and handed you two policies: {policy_one} and {policy_two}.\nWhich policy do you choose to discard? The other policy will be enacted. "
+            content += f"For internal dialogue, write what you are thinking about doing. "
             content += f"During the policy phase, speaking is not allowed. Write 'na' for your external dialogue."
             content += f"For decision, write the policy you choose to discard (either {policy_one} or {policy_two}). The other policy will be enacted."
 
@@ -1130,7 +3380,7 @@ def agent_decision(player, game_state, action_type, discussion_pool = None):
     elif action_type == 'discussion_post_policy_enactment':
         
         if player.name == game_state.current_president.name:
-            content += f"You are the president. A {game_state.enacted_policies[-1]} policy has just been enacted. Discuss with the other players what happened during the policy phase while you were president and {game_state.current_chancellor} was chancellor. "
+            content += f"You are the president. A {game_state.enacted_policies[-1]} policy has just been enacted. Discuss with the other players what happened during the policy phase while you were president and {game_state.current_chancellor.name} was chancellor. "
             content += f"For internal dialogue, write what you are thinking about doing. "
             content += f"For external dialogue, tell the other players about what happened during the policy phase (lying and manipulation are allowed)."
             content += f"\n\n{discussion_pool}\n\n"
@@ -1148,940 +3398,754 @@ def agent_decision(player, game_state, action_type, discussion_pool = None):
             content += f"For external dialogue, tell the other players about what you think happened during the policy phase (lying and manipulation are allowed). "
         content += f"No decision is needed. Write 'na' for your decision." 
         
-    elif action_type == 'reflection_post_policy_enactment':
-        content += f"You are reflecting on the recent policy enactment and the subsequent discussions. You will be given the discussion pool and will reflect on what happened during the policy phase. For internal dialogue, write what you think happened during the policy phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'peek_top_3_policies' and player.name == game_state.current_president.name:
+    elif action_type == 'reflection_post_policy_enactment':
+        content += f"You are reflecting on the recent policy enactment and the subsequent discussions. You will be given the discussion pool and will reflect on what happened during the policy phase. For internal dialogue, write what you think happened during the policy phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'peek_top_3_policies' and player.name == game_state.current_president.name:
+        
+        top_3_policies = game_state.policy_deck[-3:]
+        
+        content += f"You are the president. The third Fascist policy has been enacted, meaning you have unlocked the ability to peek at the top 3 policies in the policy deck. These are the policies the next government will receive. Use this information wisely. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision."
+        content += f"\n\nThe top 3 policies are: {top_3_policies}"
+    
+    elif action_type == 'peek_top_3_policies' and player.name != game_state.current_president.name:
+        content += f"The third Fascist policy has been enacted, meaning the current president, president {game_state.current_president.name}, got to peek at the top 3 policies in the policy deck. You are discussing with the other players about what the president saw. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision."
+        
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+              
+    elif action_type == 'reflection_post_peek_top_3_policies':
+        content += f"You are reflecting on the recent peeking at the top 3 policies. You will be given the discussion pool and will reflect on what happened during the peeking phase. For internal dialogue, write what you think happened during the peeking phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'discuss_remove_a_player_one' and player.name == game_state.current_president.name:
+        content += f"The fourth Fascist policy has been enacted, meaning you, the current president, have unlocked the ability to remove a player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can take other players points into account, but it is your decision to make. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone and who you believe should be removed. You can lie and manipulate. \nFor decision, write the name of the player you currently believe should be removed from the game with no additional text. This can change as you discuss with the other players. The final decision will be made in the next action."
+        
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'discuss_remove_a_player_one' and player.name != game_state.current_president.name:
+        content += f"The fourth Fascist policy has been enacted, meaning the current president ({game_state.current_president.name}) has the ability to remove a player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can try to influence other players choices (including the president), however, it is the president who makes the final decision. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone and who you believe should be removed. You can lie and manipulate. \nFor decision, write the name of the player you currently believe should be removed from the game with no additional text."
+        
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'remove_a_player_one':
+        
+        content += f"You are the president. The fourth Fascist policy has been enacted, meaning you have unlocked the ability to remove a player from the game. You have had a discussion about who should be removed, but now it is time to make the final decision. Pick one player to remove from the game. Choose wisely.\n\nThe players you can remove are:\n"
+        for play in decision_choices(player, game_state, action_type):
+            content += f"- {play}\n"
+        content += f"\nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nFor decision, write the name of the player you choose to remove from the game with no additional text. Only choose a player listed. Your choices are: \n"
+        for play in decision_choices(player, game_state, action_type):
+            content += f"- {play}\n"
+    
+    elif action_type == 'discuss_remove_a_player_two' and player.name == game_state.current_president.name:
+        content += f"You are the president. The fifth Fascist policy has been enacted, meaning you have unlocked the ability to remove another player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can take other players points into account, but it is your decision to make. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nYou will not make a decision until the discussion is over. Write 'na' for your decision."
+        
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'discuss_remove_a_player_two' and player.name != game_state.current_president.name:
+        content += f"The fifth Fascist policy has been enacted, meaning the current president ({game_state.current_president.name}) has the ability to remove another player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. However, it is the president who makes the final decision. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision. "
+        
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'remove_a_player_two':
+        
+        content += f"You are the president. The fifth Fascist policy has been enacted, meaning you have unlocked the ability to remove a player from the game. You have had a discussion about who should be removed, but now it is time to make the final decision. Pick one player to remove from the game. Choose wisely.\n\nThe players you can remove are:\n"
+        for play in decision_choices(player, game_state, action_type):
+            content += f"- {play}\n"
+        content += f"\nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nFor decision, write the name of the player you choose to remove from the game with no additional text. Only choose a player listed. Your choices are: \n"
+        for play in decision_choices(player, game_state, action_type):
+            content += f"- {play}\n"
+    
+    elif action_type == 'reflection_post_remove_player':
+        if game_state.removed_player_two == None:
+            
+            content += f"You are reflecting on the recent removal of {game_state.removed_player_one}. You will be given the discussion pool and will reflect on what happened during the removal phase. For internal dialogue, write what you think happened during the removal phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+            content += f"The discussion pool is:\n\n{discussion_pool}"
+        else:
+            content += f"You are reflecting on the recent removal of {game_state.removed_player_one} and {game_state.removed_player_two}. You will be given the discussion pool and will reflect on what happened during the removal phase. For internal dialogue, write what you think happened during the removal phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+            content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'discussion_post_game':
+        content += f"The game is over and the {game_state.winning_team} team has won. Tell the other players what team you were on and if you were hitler. Discuss with other players the strategies you tried, the exciting parts of the game, who you though did a good job, and what you would have done differently. For internal dialogue, write your thoughts on the game. For external dialogue, write what you want to say to everyone. There are no decisions in this case. Write 'na' for your decision."
+        content += f"The discussion pool is:\n\n{discussion_pool}"
+    
+    elif action_type == 'reflection_post_game':
+        content += f"You are reflecting on the recent game. You will be given the discussion pool and will reflect on what happened during the game. For internal dialogue, reflect on what happened during the game and what other players said during the post game discussion. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
+        content += f"Post Game Discussion: \n\n{discussion_pool}"
+
+    return content
+
+
+def update_memory(player, game_state, action_type, response_dict, choice=None):
+    """
+    Adds the player's dialogues, decision and (for Liberals) trust scores from one decision
+    to the memory of the current round, worded for the action type. choice is the decision
+    parsed from the reply (see parse_decision), for actions with legal choices.
+    """
+    if action_type == 'nominate':
+        
+        chancellor_nomination = response_dict.get('decision', '')
+        
+        # Append dialogues and decision
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(
+            f"Your internal dialogue when you nominated {chancellor_nomination} as chancellor: {response_dict.get('internal_dialogue', '')}"
+        )
+
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(
+            f"Your external dialogue when you nominated {chancellor_nomination} as chancellor: {response_dict.get('external_dialogue', '')}"
+        )
+
+        player.memory['rounds'][game_state.round_number]['decisions'].append(
+            f"Your decision when you nominated {chancellor_nomination} as chancellor: {response_dict.get('decision', '')}"
+        )
+
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+                               
+    elif action_type == 'discussion_post_nomination' and player.name == game_state.current_chancellor.name:
+            
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about your nomination as chancellor: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about your nomination as chancellor: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about your nomination as chancellor: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'discussion_post_nomination' and player.name != game_state.current_chancellor.name:
+        
+        
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'vote':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'reflection_post_voting_phase_passed':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'reflection_post_voting_phase_failed':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'policy' and player.name == game_state.current_president.name:
+        
+        # The parsed decision, "Liberal" or "Fascist"
+        discarded_pol = choice
+
+
+        # Create a copy of current policies and remove the first occurrence of discarded policy
+        two_kept_policies = game_state.current_policies.copy()
+        
+        if discarded_pol in two_kept_policies:
+            two_kept_policies.remove(discarded_pol)
+            
+        first_enacted_pol = two_kept_policies[0]
+        second_enacted_pol = two_kept_policies[1]
+
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'policy' and player.name == game_state.current_chancellor.name:
+        
+        # The parsed decision, "Liberal" or "Fascist"
+        discarded_pol = choice
         
-        top_3_policies = game_state.policy_deck[-3:]
+        kept_policy = game_state.current_policies.copy()
         
-        content += f"You are the president. The third Fascist policy has been enacted, meaning you have unlocked the ability to peek at the top 3 policies in the policy deck. These are the policies the next government will receive. Use this information wisely. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision."
-        content += f"\n\nThe top 3 policies are: {top_3_policies}"
-    
-    elif action_type == 'peek_top_3_policies' and player.name != game_state.current_president.name:
-        content += f"The third Fascist policy has been enacted, meaning the current president, president {game_state.current_president.name}, got to peek at the top 3 policies in the policy deck. You are discussing with the other players about what the president saw. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision."
+        first_pol = kept_policy[0]
+        second_pol = kept_policy[1]
         
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-              
-    elif action_type == 'reflection_post_peek_top_3_policies':
-        content += f"You are reflecting on the recent peeking at the top 3 policies. You will be given the discussion pool and will reflect on what happened during the peeking phase. For internal dialogue, write what you think happened during the peeking phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'discuss_remove_a_player_one' and player.name == game_state.current_president.name:
-        content += f"The fourth Fascist policy has been enacted, meaning you, the current president, have unlocked the ability to remove a player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can take other players points into account, but it is your decision to make. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone and who you believe should be removed. You can lie and manipulate. \nFor decision, write the name of the player you currently believe should be removed from the game with no additional text. This can change as you discuss with the other players. The final decision will be made in the next action."
+        if discarded_pol in kept_policy:
+            kept_policy.remove(discarded_pol)
         
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'discuss_remove_a_player_one' and player.name != game_state.current_president.name:
-        content += f"The fourth Fascist policy has been enacted, meaning the current president ({game_state.current_president.name}) has the ability to remove a player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can try to influence other players choices (including the president), however, it is the president who makes the final decision. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone and who you believe should be removed. You can lie and manipulate. \nFor decision, write the name of the player you currently believe should be removed from the game with no additional text."
+        current_enacted_policy = kept_policy[0]
         
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'remove_a_player_one':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('internal_dialogue', '')}")
         
-        content += f"You are the president. The fourth Fascist policy has been enacted, meaning you have unlocked the ability to remove a player from the game. You have had a discussion about who should be removed, but now it is time to make the final decision. Pick one player to remove from the game. Choose wisely.\n\nThe players you can remove are:\n"
-        for play in alive:
-            content += f"- {play}\n"
-        content += f"\nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nFor decision, write the name of the player you choose to remove from the game with no additional text. Only choose a player listed. Your choices are: \n"
-        for play in alive:
-            content += f"- {play}\n"
-    
-    elif action_type == 'discuss_remove_a_player_two' and player.name == game_state.current_president.name:
-        content += f"You are the president. The fifth Fascist policy has been enacted, meaning you have unlocked the ability to remove another player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. You can take other players points into account, but it is your decision to make. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nYou will not make a decision until the discussion is over. Write 'na' for your decision."
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('external_dialogue', '')}")
         
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'discuss_remove_a_player_two' and player.name != game_state.current_president.name:
-        content += f"The fifth Fascist policy has been enacted, meaning the current president ({game_state.current_president.name}) has the ability to remove another player from the game. You will be given the current discussion pool and will discuss with the other players who you believe should be removed. However, it is the president who makes the final decision. \nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nNo decision is needed. Write 'na' for your decision. "
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('decision', '')}")   
         
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'remove_a_player_two':
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
         
-        content += f"You are the president. The fifth Fascist policy has been enacted, meaning you have unlocked the ability to remove a player from the game. You have had a discussion about who should be removed, but now it is time to make the final decision. Pick one player to remove from the game. Choose wisely.\n\nThe players you can remove are:\n"
-        for play in alive:
-            content += f"- {play}\n"
-        content += f"\nFor internal dialogue, write what you are thinking about doing. \nFor external dialogue, write what you want to say to everyone. You can lie and manipulate. \nFor decision, write the name of the player you choose to remove from the game with no additional text. Only choose a player listed. Your choices are: \n"
-        for play in alive:
-            content += f"- {play}\n"
-    
-    elif action_type == 'reflection_post_remove_player':
-        if game_state.removed_player_two == None:
-            
-            content += f"You are reflecting on the recent removal of {game_state.removed_player_one}. You will be given the discussion pool and will reflect on what happened during the removal phase. For internal dialogue, write what you think happened during the removal phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-            content += f"The discussion pool is:\n\n{discussion_pool}"
-        else:
-            content += f"You are reflecting on the recent removal of {game_state.removed_player_one} and {game_state.removed_player_two}. You will be given the discussion pool and will reflect on what happened during the removal phase. For internal dialogue, write what you think happened during the removal phase. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-            content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'discussion_post_game':
-        content += f"The game is over and the {game_state.winning_team} team has won. Tell the other players what team you were on and if you were hitler. Discuss with other players the strategies you tried, the exciting parts of the game, who you though did a good job, and what you would have done differently. For internal dialogue, write your thoughts on the game. For external dialogue, write what you want to say to everyone. There are no decisions in this case. Write 'na' for your decision."
-        content += f"The discussion pool is:\n\n{discussion_pool}"
-    
-    elif action_type == 'reflection_post_game':
-        content += f"You are reflecting on the recent game. You will be given the discussion pool and will reflect on what happened during the game. For internal dialogue, reflect on what happened during the game and what other players said during the post game discussion. There are no external dialogues in this case. Write 'na' for your external dialogue. There are no decisions in this case. Write 'na' for your decision."
-        content += f"Post Game Discussion: \n\n{discussion_pool}"
-    
-    
-    
-    messages = send_to_api(
-        game_state=game_state,
-        content=content,
-        player=player, 
-    )
-
-    print("TOTAL INPUT TOKENS USED SO FAR:")
-    print(game_state.total_input_tokens_used)
-    print("TOTAL OUTPUT TOKENS USED SO FAR:")
-    print(game_state.total_output_tokens_used)
-    print("TOTAL TOKENS USED SO FAR:")
-    print(game_state.total_tokens_used)
-
-    #region storing the messages in the log_messages_by_player dictionary
-    found_user = False
-    found_assistant = False
-    
-    
-    for message in messages.data:
         
-        if message.role == 'assistant' and not found_assistant:
-            for content_block in message.content:
-                if content_block.type == 'text':
-                    text_value = content_block.text.value
-                    
-                    discussion_dict = json.loads(text_value)
-                    
-                    
-                    if player.role == 'Liberal':
-                        assistant_message = [
-                        50 * '=',
-                        f'Assistant thread content from player {player.name}:\n',
-                        f"{player.name}'s internal dialogue:\n{discussion_dict.get('internal_dialogue', '')}\n",
-                        f"{player.name}'s external dialogue:\n{discussion_dict.get('external_dialogue', '')}\n",
-                        f"{player.name}'s decision:\n{discussion_dict.get('decision', '')}\n",
-                        "Trust Levels:\n"
-                        ]
-                        
-                        # Add trust levels
-                        trust_dict = discussion_dict.get('trust', {})
-                        if trust_dict:
-                            for trust_player, trust_details in trust_dict.items():
-                                trust_reasoning = trust_details.get('trust_reasoning', 'No reasoning provided.')
-                                trust_score = trust_details.get('trust_score', 'No score provided.')
-                                assistant_message.append(
-                                    f" - {trust_player}:\n"
-                                    f"   Trust Reasoning: {trust_reasoning}\n"
-                                    f"   Trust Score: {trust_score}\n"
-                            )
-                        else:
-                            assistant_message.append("No trust levels provided.\n")
-                        
-                    else:
-                        assistant_message = [
-                        50 * '=',
-                        f'Assistant thread content from player {player.name}:\n',
-                        f"{player.name}'s internal dialogue:\n{discussion_dict.get('internal_dialogue', '')}\n",
-                        f"{player.name}'s external dialogue:\n{discussion_dict.get('external_dialogue', '')}\n",
-                        f"{player.name}'s decision:\n{discussion_dict.get('decision', '')}\n",
-                        ]
+    elif action_type == 'policy_with_veto' and player.name == game_state.current_president.name:
+        
+        # The parsed decision, "Liberal" or "Fascist"
+        discarded_pol = choice
 
-                    
-                        
-                    found_assistant = True  # Mark that we've found our assistant message
-                    
-                    break  # Exit the content_block loop
+        # Create a copy of current policies and remove the first occurrence of discarded policy
+        two_kept_policies = game_state.current_policies.copy()
         
-          
-        elif message.role == 'user' and not found_user:  # Check if it's a user message and we haven't found one yet
-            for content_block in message.content:
-                if content_block.type == 'text':
-                    text_value = content_block.text.value
-                    
-                    user_message = [
-                        50*'=',
-                        f'User thread content to player {player.name}:\n',
-                        text_value
-                    ]
-                    
-                    found_user = True  # Mark that we've found our user message
-                    break  # Exit the content_block loop
+        if discarded_pol in two_kept_policies:
+            two_kept_policies.remove(discarded_pol)
+            
+        first_enacted_pol = two_kept_policies[0]
+        second_enacted_pol = two_kept_policies[1]
 
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
         
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
         
 
-        if found_user and found_assistant:  # If we've found both messages
-            game_state.log_messages_by_player[player.name].extend(user_message)
-            game_state.log_messages_by_player[player.name].extend(assistant_message)
-            break  # Exit the main message loop        
-    
-    #endregion
-    
-
-    #region return the response and update memory 
-    message = messages.data[0]
-    if message.role == 'assistant':
-        # Assuming content is a list of message parts
-        for content_part in message.content:
-                if content_part.type == 'text':
-                    response = content_part.text.value.strip()
-                    
-                    response_dict = json.loads(response)
-                    
-                    #region update the memory based on the action type 
-                    
-                    if action_type == 'nominate':
-                        
-                        chancellor_nomination = response_dict.get('decision', '')
-                        
-                        # Append dialogues and decision
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(
-                            f"Your internal dialogue when you nominated {chancellor_nomination} as chancellor: {response_dict.get('internal_dialogue', '')}"
-                        )
-
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(
-                            f"Your external dialogue when you nominated {chancellor_nomination} as chancellor: {response_dict.get('external_dialogue', '')}"
-                        )
-
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(
-                            f"Your decision when you nominated {chancellor_nomination} as chancellor: {response_dict.get('decision', '')}"
-                        )
-
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                                               
-                    elif action_type == 'discussion_post_nomination' and player.name == game_state.current_chancellor.name:
-                            
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about your nomination as chancellor: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about your nomination as chancellor: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about your nomination as chancellor: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'discussion_post_nomination' and player.name != game_state.current_chancellor.name:
-                        
-                        
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the nomination of {game_state.current_chancellor.name} as chancellor: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'vote':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you voted {response_dict.get('decision', '')} for {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'reflection_post_voting_phase_passed':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and successfully voted in: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'reflection_post_voting_phase_failed':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent voting phase where chancellor {game_state.current_chancellor.name} was nominated by {game_state.current_president.name} and failed to be voted in: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'policy' and player.name == game_state.current_president.name:
-                        
-                        # extract "Liberal" or "Fascist" from the response_dict.get('decision', '')
-                        discarded_pol = response_dict.get('decision', '')
-                        
-                        if 'Liberal' in discarded_pol:
-                            discarded_pol = 'Liberal'
-                        elif 'Fascist' in discarded_pol:
-                            discarded_pol = 'Fascist'
-                            
-
-
-                        # Create a copy of current policies and remove the first occurrence of discarded policy
-                        two_kept_policies = game_state.current_policies.copy()
-                        
-                        if discarded_pol in two_kept_policies:
-                            two_kept_policies.remove(discarded_pol)
-                            
-                        first_enacted_pol = two_kept_policies[0]
-                        second_enacted_pol = two_kept_policies[1]
-
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'policy' and player.name == game_state.current_chancellor.name:
-                        
-                        discarded_pol = response_dict.get('decision', '')
-                        
-                        if 'Liberal' in discarded_pol:
-                            discarded_pol = 'Liberal'
-                        elif 'Fascist' in discarded_pol:
-                            discarded_pol = 'Fascist'
-                            
-                        kept_policy = game_state.current_policies.copy()
-                        
-                        first_pol = kept_policy[0]
-                        second_pol = kept_policy[1]
-                        
-                        if discarded_pol in kept_policy:
-                            kept_policy.remove(discarded_pol)
-                        
-                        current_enacted_policy = kept_policy[0]
-                        
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you were handed a {first_pol} and {second_pol} policy from {game_state.current_president.name}, discarded {discarded_pol} and enacted {current_enacted_policy}: {response_dict.get('decision', '')}")   
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'policy_with_veto' and player.name == game_state.current_president.name:
-                        
-                        # extract "Liberal" or "Fascist" from the response_dict.get('decision', '')
-                        discarded_pol = response_dict.get('decision', '')
-                        
-                        if 'Liberal' in discarded_pol:
-                            discarded_pol = 'Liberal'
-                        elif 'Fascist' in discarded_pol:
-                            discarded_pol = 'Fascist'
-                            
-
-                        # Create a copy of current policies and remove the first occurrence of discarded policy
-                        two_kept_policies = game_state.current_policies.copy()
-                        
-                        if discarded_pol in two_kept_policies:
-                            two_kept_policies.remove(discarded_pol)
-                            
-                        first_enacted_pol = two_kept_policies[0]
-                        second_enacted_pol = two_kept_policies[1]
-
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discarded a {discarded_pol} policy and handed a {first_enacted_pol} and {second_enacted_pol} policy to {game_state.current_chancellor.name}: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'policy_with_veto' and player.name == game_state.current_chancellor.name:
+        
+        # The parsed decision, "Liberal", "Fascist" or "Veto"
+        discarded_pol = choice
+        
+        kept_policy = game_state.current_policies.copy()
+        
+        first_pol = kept_policy[0]
+        second_pol = kept_policy[1]
+        
+        if discarded_pol in kept_policy:
+            kept_policy.remove(discarded_pol)
+        
+        chancellor_decision = kept_policy[0]
+        if choice == 'Veto':
+            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you vetoed the policies: {game_state.current_policies}")
+            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you vetoed the policies: {game_state.current_policies}")
+            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you vetoed the policies: {game_state.current_policies}")
+            
+            if player.role == 'Liberal':
+                trust_dict = response_dict.get('trust', {})
+                for trust_player, trust_details in trust_dict.items():
+                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                        "trust_score": trust_details.get('trust_score', 'No score provided.')
+                    }
+            
+        else:
+            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you chose not to veto and enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('internal_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you chose not to veto and enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('external_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('decision', '')}")
+            
+            if player.role == 'Liberal':
+                trust_dict = response_dict.get('trust', {})
+                for trust_player, trust_details in trust_dict.items():
+                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                        "trust_score": trust_details.get('trust_score', 'No score provided.')
+                    }
+            
 
-                    elif action_type == 'policy_with_veto' and player.name == game_state.current_chancellor.name:
-                        
-                        discarded_pol = response_dict.get('decision', '')
-                        
-                        if 'Liberal' in discarded_pol:
-                            discarded_pol = 'Liberal'
-                        elif 'Fascist' in discarded_pol:
-                            discarded_pol = 'Fascist'
-                        elif 'Veto' in discarded_pol:
-                            discarded_pol = 'Veto'
-                            
-                        kept_policy = game_state.current_policies.copy()
-                        
-                        first_pol = kept_policy[0]
-                        second_pol = kept_policy[1]
-                        
-                        if discarded_pol in kept_policy:
-                            kept_policy.remove(discarded_pol)
-                        
-                        chancellor_decision = kept_policy[0]
-                        if chancellor_decision == 'Veto':
-                            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you vetoed the policies: {game_state.current_policies}")
-                            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you vetoed the policies: {game_state.current_policies}")
-                            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you vetoed the policies: {game_state.current_policies}")
-                            
-                            if player.role == 'Liberal':
-                                trust_dict = response_dict.get('trust', {})
-                                for trust_player, trust_details in trust_dict.items():
-                                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                        "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                    }
-                            
-                        else:
-                            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you chose not to veto and enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('internal_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you chose not to veto and enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('external_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you enacted a {chancellor_decision} and discarded a {discarded_pol}: {response_dict.get('decision', '')}")
-                            
-                            if player.role == 'Liberal':
-                                trust_dict = response_dict.get('trust', {})
-                                for trust_player, trust_details in trust_dict.items():
-                                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                        "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                    }
-                            
-
-                    elif action_type == 'chancellor_veto':
-                        
-                        if 'agree' in response_dict.get('decision', ''):
-                            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue you accepted the veto: {response_dict.get('internal_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue you accepted the veto: {response_dict.get('external_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you accepted the veto: {response_dict.get('decision', '')}")
-                            
-                            if player.role == 'Liberal':
-                                trust_dict = response_dict.get('trust', {})
-                                for trust_player, trust_details in trust_dict.items():
-                                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                        "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                    }
-                            
-                        else:
-                            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue you did not accept the veto: {response_dict.get('internal_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue you did not accept the veto: {response_dict.get('external_dialogue', '')}")
-                            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you did not accept the veto: {response_dict.get('decision', '')}")
-                            
-                            if player.role == 'Liberal':
-                                trust_dict = response_dict.get('trust', {})
-                                for trust_player, trust_details in trust_dict.items():
-                                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                        "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                    }
-                            
-
-                    elif action_type == 'discussion_post_veto_successful':
-                        
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the recent successful veto of policies: {response_dict.get('internal_dialogue', '')}")
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the recent successful veto of policies: {response_dict.get('external_dialogue', '')}")
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the recent veto: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'chancellor_veto':
+        
+        if choice == 'Agree':
+            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue you accepted the veto: {response_dict.get('internal_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue you accepted the veto: {response_dict.get('external_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you accepted the veto: {response_dict.get('decision', '')}")
+            
+            if player.role == 'Liberal':
+                trust_dict = response_dict.get('trust', {})
+                for trust_player, trust_details in trust_dict.items():
+                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                        "trust_score": trust_details.get('trust_score', 'No score provided.')
+                    }
+            
+        else:
+            player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue you did not accept the veto: {response_dict.get('internal_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue you did not accept the veto: {response_dict.get('external_dialogue', '')}")
+            player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you did not accept the veto: {response_dict.get('decision', '')}")
+            
+            if player.role == 'Liberal':
+                trust_dict = response_dict.get('trust', {})
+                for trust_player, trust_details in trust_dict.items():
+                    player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                        "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                        "trust_score": trust_details.get('trust_score', 'No score provided.')
+                    }
+            
 
-                    elif action_type == 'reflection_post_veto_successful':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent successful veto: {response_dict.get('internal_dialogue', '')}")
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent successful veto: {response_dict.get('external_dialogue', '')}")
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent successful veto: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'discussion_post_veto_successful':
+        
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the recent successful veto of policies: {response_dict.get('internal_dialogue', '')}")
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the recent successful veto of policies: {response_dict.get('external_dialogue', '')}")
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the recent veto: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'discussion_post_policy_enactment_with_veto':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'reflection_post_policy_enactment_with_veto':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'discussion_post_policy_enactment' and player.name == game_state.current_president.name:
-                        
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'discussion_post_policy_enactment' and player.name == game_state.current_chancellor.name:
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor and {game_state.current_president.name} was president: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
-                        
-                    elif action_type == 'discussion_post_policy_enactment' and player.name != game_state.current_president.name and player.name != game_state.current_chancellor.name:
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'reflection_post_veto_successful':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent successful veto: {response_dict.get('internal_dialogue', '')}")
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent successful veto: {response_dict.get('external_dialogue', '')}")
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent successful veto: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'reflection_post_policy_enactment':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'discussion_post_policy_enactment_with_veto':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when chancellor {game_state.current_chancellor.name} vetoed the policies but president {game_state.current_president.name} rejected the veto: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'reflection_post_policy_enactment_with_veto':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'discussion_post_policy_enactment' and player.name == game_state.current_president.name:
+        
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were president: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'discussion_post_policy_enactment' and player.name == game_state.current_chancellor.name:
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor and {game_state.current_president.name} was president: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when you were chancellor: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
+        
+    elif action_type == 'discussion_post_policy_enactment' and player.name != game_state.current_president.name and player.name != game_state.current_chancellor.name:
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the {game_state.enacted_policies[-1]} policy that was enacted when {game_state.current_president.name} was president and {game_state.current_chancellor.name} was chancellor: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'peek_top_3_policies' and player.name == game_state.current_president.name:
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you peeked at the top 3 policies: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you peeked at the top 3 policies: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you peeked at the top 3 policies: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'reflection_post_policy_enactment':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent policy enactment and the subsequent discussions: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'peek_top_3_policies' and player.name != game_state.current_president.name:
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('decision', '')}")  
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'peek_top_3_policies' and player.name == game_state.current_president.name:
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you peeked at the top 3 policies: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you peeked at the top 3 policies: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you peeked at the top 3 policies: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'reflection_post_peek_top_3_policies':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'peek_top_3_policies' and player.name != game_state.current_president.name:
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the top 3 policies president {game_state.current_president.name} saw: {response_dict.get('decision', '')}")  
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'discuss_remove_a_player_one':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'reflection_post_peek_top_3_policies':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent peek at the top 3 policies by president {game_state.current_president.name}: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'remove_a_player_one':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'discuss_remove_a_player_one':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'discuss_remove_a_player_two':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'remove_a_player_one':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'remove_a_player_two':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'discuss_remove_a_player_two':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'reflection_post_remove_player':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'remove_a_player_two':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about who should be removed: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about who should be removed: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about who should be removed: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'discussion_post_game':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the recent game: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the recent game: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the recent game: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'reflection_post_remove_player':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent removal of a player by president {game_state.current_president.name}: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    elif action_type == 'reflection_post_game':
-                        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent game: {response_dict.get('internal_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent game: {response_dict.get('external_dialogue', '')}")
-                        
-                        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent game: {response_dict.get('decision', '')}")
-                        
-                        if player.role == 'Liberal':
-                            trust_dict = response_dict.get('trust', {})
-                            for trust_player, trust_details in trust_dict.items():
-                                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
-                                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
-                                    "trust_score": trust_details.get('trust_score', 'No score provided.')
-                                }
-                        
+    elif action_type == 'discussion_post_game':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you discussed with other players about the recent game: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you discussed with other players about the recent game: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you discussed with other players about the recent game: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
+        
 
-                    #endregion
+    elif action_type == 'reflection_post_game':
+        player.memory['rounds'][game_state.round_number]['internal_dialogues'].append(f"Your internal dialogue when you reflected on the recent game: {response_dict.get('internal_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['external_dialogues'].append(f"Your external dialogue when you reflected on the recent game: {response_dict.get('external_dialogue', '')}")
+        
+        player.memory['rounds'][game_state.round_number]['decisions'].append(f"Your decision when you reflected on the recent game: {response_dict.get('decision', '')}")
+        
+        if player.role == 'Liberal':
+            trust_dict = response_dict.get('trust', {})
+            for trust_player, trust_details in trust_dict.items():
+                player.memory['rounds'][game_state.round_number]['trust'][trust_player] = {
+                    "trust_reasoning": trust_details.get('trust_reasoning', 'No reasoning provided.'),
+                    "trust_score": trust_details.get('trust_score', 'No score provided.')
+                }
 
-                    return response
-          
-    # If no assistant message is found
-    raise Exception("No assistant reply found.")
-    #endregion
+
+def rules_state(game_state):
+    """
+    Returns the game's rules as a rules_engine.RulesState, so play_game can apply the engine's transitions
+    (see apply_rules_state).
+    """
+    president = getattr(game_state, 'current_president', None)
+    chancellor = getattr(game_state, 'current_chancellor', None)
+    return rules_engine.RulesState(
+        players=tuple(rules_engine.PlayerState(player.name, player.role, player.is_alive, player.last_president, player.last_chancellor)
+                      for player in game_state.players),
+        policy_deck=tuple(game_state.policy_deck),
+        discard_pile=tuple(game_state.discard_pile),
+        enacted_policies=tuple(game_state.enacted_policies),
+        liberal_policies=game_state.liberal_policies,
+        fascist_policies=game_state.fascist_policies,
+        election_tracker=game_state.election_tracker,
+        round_number=game_state.round_number,
+        president=president.name if president else None,
+        chancellor=chancellor.name if chancellor else None,
+        peek_power_used=game_state.peek_power_used,
+        remove_power_one_used=game_state.remove_power_one_used,
+        remove_power_two_used=game_state.remove_power_two_used
+    )
 
 
-def enact_policy(game_state):
+def apply_rules_state(game_state, state):
+    """
+    Writes a rules engine state back to the game state: the players' lives and term limits, the deck,
+    the policies, the election tracker, the round, the powers used and the government. A state without
+    a chancellor (a new round) keeps the last one until the next nomination.
+    """
+    for player, player_state in zip(game_state.players, state.players):
+        player.is_alive = player_state.is_alive
+        player.last_president = player_state.last_president
+        player.last_chancellor = player_state.last_chancellor
+    game_state.policy_deck = list(state.policy_deck)
+    game_state.discard_pile = list(state.discard_pile)
+    game_state.enacted_policies = list(state.enacted_policies)
+    game_state.liberal_policies = state.liberal_policies
+    game_state.fascist_policies = state.fascist_policies
+    game_state.election_tracker = state.election_tracker
+    game_state.round_number = state.round_number
+    game_state.peek_power_used = state.peek_power_used
+    game_state.remove_power_one_used = state.remove_power_one_used
+    game_state.remove_power_two_used = state.remove_power_two_used
+    if state.president is not None:
+        game_state.current_president = next(p for p in game_state.players if p.name == state.president)
+    if state.chancellor is not None:
+        game_state.current_chancellor = next(p for p in game_state.players if p.name == state.chancellor)
+
+
+async def enact_policy(game_state):
     # Draw three policies
-    if len(game_state.policy_deck) < 3:
-        game_state.reshuffle_policies()
-        
-    
-    policies = [game_state.policy_deck.pop() for _ in range(3)]
+    state, policies = rules_engine.draw_policies(rules_state(game_state), game_state.rng)
+    apply_rules_state(game_state, state)
 
     # President discards one
-    game_state.current_policies = policies.copy()
-    discarded_policy = agent_decision(game_state.current_president, game_state, 'policy')
-    
-    discarded_policy_dict = json.loads(discarded_policy)
-    
-    discarded_policy = discarded_policy_dict.get('decision', '')
-    
-    if 'Fascist' in discarded_policy:
-        discarded_policy = 'Fascist'
-    elif 'Liberal' in discarded_policy:
-        discarded_policy = 'Liberal'
-    else: 
-        print(f'Invalid response: {discarded_policy} Defaulting to random policy')
-        discarded_policy = random.choice(policies)
-    
-    try:
-        policies.remove(discarded_policy)
-    except:
-        print(f"DEBUG: Policy not found in list 1. Discarded Policy: {discarded_policy} \nPolicies: {policies}")
-        raise Exception(f"Policy not found in list: {discarded_policy}")
+    game_state.current_policies = list(policies)
+    discarded_policy = (await agent_decision(game_state.current_president, game_state, 'policy')).choice
     
-    game_state.discard_pile.append(discarded_policy)
+    state, policies = rules_engine.discard(rules_state(game_state), policies, discarded_policy)
+    apply_rules_state(game_state, state)
     game_state.president_discarded_policy = discarded_policy
 
     # Chancellor discards one and enacts the other
-    game_state.current_policies = policies.copy()
-    discarded_policy = agent_decision(game_state.current_chancellor, game_state, 'policy')
-    discarded_policy_dict = json.loads(discarded_policy)
-    
-    discarded_policy = discarded_policy_dict.get('decision', '')
-    
-    if 'Fascist' in discarded_policy:
-        discarded_policy = 'Fascist'
-    elif 'Liberal' in discarded_policy:
-        discarded_policy = 'Liberal'
-    else: 
-        print(f'Invalid response: {discarded_policy} Defaulting to random policy')
-        discarded_policy = random.choice(policies)
+    game_state.current_policies = list(policies)
+    discarded_policy = (await agent_decision(game_state.current_chancellor, game_state, 'policy')).choice
     
-    try:
-        policies.remove(discarded_policy)
-    except:
-        print(f"DEBUG: Policy not found in list 2. Discarded Policy: {discarded_policy} \nPolicies: {policies}")
-        raise Exception(f"Policy not found in list: {discarded_policy}")
-    
-    game_state.discard_pile.append(discarded_policy)
+    state, policies = rules_engine.discard(rules_state(game_state), policies, discarded_policy)
     game_state.chancellor_discarded_policy = discarded_policy
-    enacted_policy = policies[0]
-    
-    game_state.enacted_policies.append(enacted_policy)
-    if enacted_policy == 'Liberal':
-        game_state.liberal_policies += 1
-    else:
-        game_state.fascist_policies += 1
-
-
-def enact_top_policy(game_state):
-    if len(game_state.policy_deck) < 3:
-        game_state.reshuffle_policies()
-         
-    policy = game_state.policy_deck.pop()
-    game_state.enacted_policies.append(policy)
-    
-    if policy == 'Liberal':
-        game_state.liberal_policies += 1
-    else:
-        game_state.fascist_policies += 1
-    logging.info(f"Top policy enacted: {policy}.")
+    apply_rules_state(game_state, rules_engine.enact(state, policies[0]))
   
     
-def enact_policy_with_veto(game_state):
+async def enact_policy_with_veto(game_state):
     
     # Draw three policies
-    if len(game_state.policy_deck) < 3:
-        game_state.reshuffle_policies()
-    
-    try: 
-        policies = [game_state.policy_deck.pop() for _ in range(3)]
-    except IndexError:
-        print("No policies left in the deck. Reshuffling...")
-        game_state.reshuffle_policies()
-        policies = [game_state.policy_deck.pop() for _ in range(3)]
+    state, policies = rules_engine.draw_policies(rules_state(game_state), game_state.rng)
+    apply_rules_state(game_state, state)
 
     # President discards one
-    game_state.current_policies = policies.copy()
-    discarded_policy = agent_decision(game_state.current_president, game_state, 'policy_with_veto')
-    
-    discarded_policy_dict = json.loads(discarded_policy)
-    
-    discarded_policy = discarded_policy_dict.get('decision', '')
-    
-    if 'Fascist' in discarded_policy:
-        discarded_policy = 'Fascist'
-    elif 'Liberal' in discarded_policy:
-        discarded_policy = 'Liberal'
-    else: 
-        print(f'Invalid response: {discarded_policy} Defaulting to random policy')
-        discarded_policy = random.choice(policies)
-    
-    try:
-        policies.remove(discarded_policy)
-    except:
-        print(f"DEBUG: Policy not found in list 3. Discarded Policy: {discarded_policy} \nPolicies: {policies}")
-        raise Exception(f"Policy not found in list: {discarded_policy}")
+    game_state.current_policies = list(policies)
+    discarded_policy = (await agent_decision(game_state.current_president, game_state, 'policy_with_veto')).choice
     
-    game_state.discard_pile.append(discarded_policy)
+    state, policies = rules_engine.discard(rules_state(game_state), policies, discarded_policy)
+    apply_rules_state(game_state, state)
     game_state.president_discarded_policy = discarded_policy
 
     # Chancellor discards one and enacts the other
-    game_state.current_policies = policies.copy()
-    chancellor_policy_w_veto = agent_decision(game_state.current_chancellor, game_state, 'policy_with_veto')
-    chancellor_dict = json.loads(chancellor_policy_w_veto)
-    chancellor_decision = chancellor_dict.get('decision', '')
+    game_state.current_policies = list(policies)
+    chancellor_decision = (await agent_decision(game_state.current_chancellor, game_state, 'policy_with_veto')).choice
     
     add_phase_log(game_state, game_state.current_president, 'post_veto')
     add_phase_log(game_state, game_state.current_chancellor, 'post_veto')
     print_game_log(game_state, game_state.round_number, 'post_veto')
     
-    if "veto" in chancellor_decision:
-        chancellor_decision = "Veto"
-    elif "Veto" in chancellor_decision:
-        chancellor_decision = "Veto"
-    elif "liberal" in chancellor_decision.lower():
-        chancellor_decision = "Liberal"
-    elif "fascist" in chancellor_decision.lower():
-        chancellor_decision = "Fascist"
-    else:
-        print(f"Invalid Response: {chancellor_decision}\nRandomly selecting a choice")
-
-        possible_choices = policies + ["Veto"]
-        chancellor_decision = random.choice(possible_choices)
-    
-    if "Veto" in chancellor_decision or "veto" in chancellor_decision:
+    if chancellor_decision == "Veto":
         
-        president_veto = agent_decision(game_state.current_president, game_state, 'chancellor_veto')
-        president_veto_dict = json.loads(president_veto)
-        president_veto = president_veto_dict.get('decision', '')
+        president_veto = (await agent_decision(game_state.current_president, game_state, 'chancellor_veto')).choice
         
         add_phase_log(game_state, game_state.current_president, 'chancellor_veto')
         
         print_game_log(game_state, game_state.round_number, 'chancellor_veto')
-       
-        if "agree" in president_veto:
-           president_veto = "agree"
-        elif "Agree" in president_veto:
-            president_veto = "agree"
-        elif "disagree" in president_veto:
-            president_veto = "disagree"
-        elif "Disagree" in president_veto:
-            president_veto = "disagree"
-        else:
-            print(f"Invalid Response: {president_veto}\nRandomly selecting a response")
-            president_veto = random.choice(["agree", "disagree"])
         
-        if "agree" in president_veto:
+        if president_veto == "Agree":
     
             #region Successful Veto
             
-            discussion_pool = f""
+            # Both policies are discarded and the election tracker moves on
+            apply_rules_state(game_state, rules_engine.apply_veto(rules_state(game_state), policies))
+            
+            discussion_pool = DiscussionPool()
             
             discussion_order = [game_state.current_president.name, game_state.current_chancellor.name] + [player.name for player in game_state.players if player.is_alive and player.name != game_state.current_president.name and player.name != game_state.current_chancellor.name]
             
@@ -2089,19 +4153,13 @@ def enact_policy_with_veto(game_state):
                 player = next(p for p in game_state.players if p.name == player)
                 if player.is_alive:
                     if player.name == game_state.current_president.name:
-                        discussion = agent_decision(player, game_state, 'discussion_post_veto_successful')
-                        discussion_dict = json.loads(discussion)
-                        discussion_external = discussion_dict.get('external_dialogue', '')
+                        discussion_external = (await agent_decision(player, game_state, 'discussion_post_veto_successful')).external_dialogue
                         discussion_pool += f"After agreeing to veto the policies, President {player.name} said:\n{discussion_external}\n\n"
                     elif player.name == game_state.current_chancellor.name:
-                        discussion = agent_decision(player, game_state, 'discussion_post_veto_successful')
-                        discussion_dict = json.loads(discussion)
-                        discussion_external = discussion_dict.get('external_dialogue', '')
+                        discussion_external = (await agent_decision(player, game_state, 'discussion_post_veto_successful')).external_dialogue
                         discussion_pool += f"Then Chancellor {player.name} said:\n{discussion_external}\n\n"
                     else:
-                        discussion = agent_decision(player, game_state, 'discussion_post_veto_successful')
-                        discussion_dict = json.loads(discussion)
-                        discussion_external = discussion_dict.get('external_dialogue', '')
+                        discussion_external = (await agent_decision(player, game_state, 'discussion_post_veto_successful')).external_dialogue
                         discussion_pool += f"Then {player.name} said:\n{discussion_external}\n\n"
                     
                     add_phase_log(game_state, player, 'discussion_post_veto_successful')
@@ -2109,12 +4167,7 @@ def enact_policy_with_veto(game_state):
             print_game_log(game_state, game_state.round_number, 'discussion_post_veto_successful')
             
             # adding reflection phase after veto successful
-            for player in game_state.players:
-                if player.is_alive:
-                    reflection = agent_decision(player, game_state, 'reflection_post_veto_successful', discussion_pool)
-                    add_phase_log(game_state, player, 'reflection_post_veto_successful')
-                    
-            print_game_log(game_state, game_state.round_number, 'reflection_post_veto_successful')
+            await parallel_reflection(game_state, 'reflection_post_veto_successful', discussion_pool)
             
             policy_passed = False
             
@@ -2122,40 +4175,18 @@ def enact_policy_with_veto(game_state):
         
             #endregion
         
-        elif "disagree" in president_veto:
+        else:
             
             #region Failed Veto
             
-            chancellor_forced_policy = agent_decision(game_state.current_chancellor, game_state, 'chancellor_forced_policy')
-            chancellor_forced_policy_dict = json.loads(chancellor_forced_policy)
-            chancellor_forced_policy = chancellor_forced_policy_dict.get('decision', '')
+            chancellor_forced_policy = (await agent_decision(game_state.current_chancellor, game_state, 'chancellor_forced_policy')).choice
             
             add_phase_log(game_state, game_state.current_chancellor, 'chancellor_forced_policy')
             
             print_game_log(game_state, game_state.round_number, 'chancellor_forced_policy')
             
-            if 'fascist' in chancellor_forced_policy.lower():
-                chancellor_forced_policy = 'Fascist'
-            elif 'liberal' in chancellor_forced_policy.lower():
-                chancellor_forced_policy = 'Liberal'
-            else:
-                print(f"Invalid Response: {chancellor_forced_policy}\nRandomly selecting a policy")
-                chancellor_forced_policy = random.choice(policies)
-               
-            try:  
-                policies.remove(chancellor_forced_policy)
-            except:
-                print(f"Policy not found in list 4. Discarded Policy: {chancellor_forced_policy} \nPolicies: {policies}")
-                raise Exception(f"Policy not found in list: {chancellor_forced_policy}")
-            
-            game_state.discard_pile.append(chancellor_forced_policy)
-            
-            enacted_policy = policies[0]
-            game_state.enacted_policies.append(enacted_policy)
-            if enacted_policy == 'Liberal':
-                game_state.liberal_policies += 1
-            else:
-                game_state.fascist_policies += 1            
+            state, policies = rules_engine.discard(rules_state(game_state), policies, chancellor_forced_policy)
+            apply_rules_state(game_state, rules_engine.enact(state, policies[0]))
             
             policy_passed = True
             
@@ -2164,137 +4195,581 @@ def enact_policy_with_veto(game_state):
             #endregion
         
         #endregion
+    
+    # The chancellor discarded one of the two policies
+    state, policies = rules_engine.discard(rules_state(game_state), policies, chancellor_decision)
+    game_state.chancellor_discarded_policy = chancellor_decision
+    apply_rules_state(game_state, rules_engine.enact(state, policies[0]))
+    
+    policy_passed = True
+    
+    return policy_passed
+
+
+def check_win_conditions(game_state, state=None):
+    """
+    Records the winner of a rules engine state on the game state and returns its win reason, or None.
+    Without a state, the game's enacted policies are checked (see rules_engine.with_winner).
+    """
+    if state is None:
+        state = rules_engine.with_winner(rules_state(game_state))
+    if state.winner:
+        game_state.winning_team = state.winner
+    return state.win_reason
+
+
+async def execute_vote(player, game_state, discussion_pool):
+    """
+    Executes the vote for a single player.
+    """
+    vote = (await agent_decision(player, game_state, 'vote', discussion_pool)).choice
+    
+    # Add the vote to the logs
+    add_phase_log(game_state, player, 'voting_phase')
+    
+    return player.name, vote
+
+
+async def execute_reflection(player, game_state, reflection_type, discussion_pool):
+    """
+    Executes the reflection phase for a single player.
+    """
+    reflection = await agent_decision(player, game_state, reflection_type, discussion_pool)
+    add_phase_log(game_state, player, reflection_type)
+    return player.name, reflection
+
+
+class DiscussionPool:
+    """
+    What has been said in one discussion, as a list of statements. Adding a statement returns a new
+    pool (pool + text), so a pool handed to a speaker stays as it was, like the plain string it replaces.
+
+    Every pool of a discussion shares which statements each player was already sent. for_player
+    returns only the statements the player has not been sent yet and refers back to the earlier
+    ones, which stay in the player's conversation, so the same statements are not billed again
+    with every later prompt of the round (the vote, the reflections, ...). When a context trim has
+    since moved past the prompt that first showed them (compacted by --context_rounds or to fit the token
+    limit, see check_context_size), the whole pool is sent again.
+    """
+    def __init__(self, statements=(), sent=None):
+        self.statements = tuple(statements)
+        # player name -> (number of statements sent to the player, index in the player's conversation of the prompt that first showed them)
+        self.sent = {} if sent is None else sent
+
+    def __add__(self, text):
+        return DiscussionPool(self.statements + (text,), self.sent)
+
+    def __str__(self):
+        return "".join(self.statements)
+
+    def for_player(self, player):
+        """
+        Returns the pool text for the player's next prompt and remembers that it was sent.
+        """
+        sent, shown_at = self.sent.get(player.name, (0, 0))
+        sent = min(sent, len(self.statements))
+        if sent and shown_at < getattr(player, "context_trim_index", 0):
+            # The earlier statements are only in the summary of compacted rounds now
+            sent = 0
+        if not sent:
+            # This prompt becomes the player's next conversation message
+            shown_at = len(player.conversation)
+        self.sent[player.name] = (max(sent, len(self.statements)), shown_at)
+        if not sent:
+            return str(self)
+        if sent == len(self.statements):
+            return "(Nothing new was said in this discussion since it was last shown to you earlier in this conversation.)\n\n"
+        return ("(Everything said in this discussion before this point was already shown to you earlier in this conversation. "
+                "Only what was said since then follows.)\n\n" + "".join(self.statements[sent:]))
+
+
+def format_removal_statement(game_state, i, player, text):
+    """
+    Discussion pool text of the removal discussions, where the president speaks in seat order too.
+    """
+    if player.name == game_state.current_president.name:
+        return f"President {player.name}'s external dialogue:\n{text}\n\n" if i == 0 else f"Then President {player.name} said:\n{text}\n\n"
+    return f"{player.name} said:\n{text}\n\n" if i == 0 else f"Then {player.name} said:\n{text}\n\n"
+
+
+async def run_discussion(game_state, action_type, speakers, discussion_pool, phase_key, format_statement):
+    """
+    Runs a discussion among the speakers (in speaking order) and returns the discussion pool
+    with their statements added. format_statement(i, player, external_dialogue) gives the
+    text speaker i adds to the pool.
+    
+    In sequential mode (the default) each speaker sees everything said before them. In concurrent
+    mode (--discussion_mode concurrent) all speakers answer at once in --discussion_rounds rounds
+    of opening statements, each round seeing the pool as it was after the previous round.
+    """
+    if game_state.discussion_mode != 'concurrent':
+        for i, player in enumerate(speakers):
+            discussion_external = (await agent_decision(player, game_state, action_type, discussion_pool)).external_dialogue
+            discussion_pool += format_statement(i, player, discussion_external)
+            add_phase_log(game_state, player, phase_key)
+        return discussion_pool
+    
+    for discussion_round in range(1, game_state.discussion_rounds + 1):
+        round_pool = discussion_pool
+        discussions = await asyncio.gather(
+            *(agent_decision(player, game_state, action_type, round_pool) for player in speakers)
+        )
         
-    if 'Fascist' in discarded_policy:
-        discarded_policy = 'Fascist'
-    elif 'Liberal' in discarded_policy:
-        discarded_policy = 'Liberal'
+        discussion_pool += f"Statements made at the same time (round {discussion_round} of {game_state.discussion_rounds}):\n\n"
+        for i, (player, discussion) in enumerate(zip(speakers, discussions)):
+            discussion_pool += format_statement(i, player, discussion.external_dialogue)
+            add_phase_log(game_state, player, phase_key)
+    
+    return discussion_pool
+
+
+def snapshot_game_state(game_state):
+    """
+    Returns a shallow copy of the game state, keeping who was president, chancellor or removed
+    and the round number when a reflection was deferred (see parallel_reflection).
+    """
+    snapshot = GameState.__new__(GameState)
+    snapshot.__dict__.update(game_state.__dict__)
+    return snapshot
+
+
+def apply_fused_reflections(player, game_state, reflections, response_dict):
+    """
+    Stores the reflection field of a decision that had reflections folded into it in the player's
+    memory and the game log, under each reflection's own round and phase key, as a separate
+    reflection call would have.
+    """
+    reflection_dict = {
+        "internal_dialogue": response_dict.get("reflection", ""),
+        "external_dialogue": "na",
+        "decision": "na",
+        "trust": response_dict.get("trust", {}),
+    }
+    for reflection in reflections:
+        reflection_state = reflection["game_state"]
+        reflection_state.event_log = game_state.event_log  # a resumed game writes to a new event log
+        update_memory(player, reflection_state, reflection["action_type"], reflection_dict)
+        add_phase_log(reflection_state, player, reflection["action_type"])
+
+
+#region Reflection Batches
+
+# Batch API requests cost half the price of the same synchronous requests (local batches pay the full price)
+BATCH_PRICE_FACTOR = 0.5
+BATCH_POLL_SECONDS = 30
+
+def build_batch_request(custom_id, player, game_state, content, action_type):
+    """
+    Returns one line of a Batch API input file: the chat completion the chat backend would send for the decision.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": game_state.model,
+            "messages": build_chat_messages(player, game_state, content),
+            "response_format": build_response_format(player, game_state, action_type),
+            "temperature": 0.7,
+            "top_p": 1,
+        },
+    }
+
+
+async def run_openai_batch(reflection_batch, batch_folder_path):
+    """
+    Submits the requests of the reflection batch as one Batch API job, waits for it to end and returns
+    its output lines by custom id. A job submitted before the game was resumed is waited for again.
+    """
+    requests = reflection_batch.requests
+    if reflection_batch.batch_id is None:
+        input_file = await client.files.create(
+            file=("reflections.jsonl", "".join(json.dumps(request) + "\n" for request in requests).encode()),
+            purpose="batch"
+        )
+        batch = await client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions", completion_window="24h")
+        reflection_batch.batch_id = batch.id
+        print(f"Submitted batch {batch.id} with {len(requests)} requests.")
     else:
-        print(f'Invalid response: {discarded_policy} Defaulting to random policy')
-        discarded_policy = random.choice(policies)
+        batch = await client.batches.retrieve(reflection_batch.batch_id)
     
-    try:
-        policies.remove(discarded_policy)
-    except:
-        print(f"DEBUG: Policy not found in list 4. Discarded Policy: {discarded_policy} \nPolicies: {policies}")
-        raise Exception(f"Policy not found in list: {discarded_policy}")
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(BATCH_POLL_SECONDS)
+        batch = await client.batches.retrieve(batch.id)
+    
+    # An expired batch still returns the requests it finished
+    if not batch.output_file_id:
+        raise Exception(f"Batch {batch.id} ended with status {batch.status} and no output")
+    output = await client.files.content(batch.output_file_id)
+    results = [json.loads(line) for line in output.text.splitlines() if line.strip()]
+    return {result["custom_id"]: result for result in results}
+
+
+async def run_local_batch(reflection_batch, batch_folder_path):
+    """
+    File based stand-in for the Batch API (--batch_reflections local, and always with --mock). The input
+    file is written to batch_folder_path, every request is answered with a chat completion through
+    the regular client and the output file is written next to it in the Batch API's format.
+    """
+    requests = reflection_batch.requests
+    os.makedirs(batch_folder_path, exist_ok=True)
+    batch_id = f"batch_local_{hash_text(requests[0]['custom_id'] + str(time.time()))}"
+    with open(f"{batch_folder_path}/{batch_id}.input.jsonl", "w") as f:
+        f.writelines(json.dumps(request) + "\n" for request in requests)
+    
+    rate_limiter = get_rate_limiter()
+    
+    async def answer(request):
+        body = request["body"]
+        try:
+            if rate_limiter is not None:
+                await rate_limiter.acquire(estimate_messages_tokens(body["messages"]) + RESPONSE_TOKEN_ALLOWANCE)
+            completion = await client.chat.completions.create(**body)
+        except Exception as e:
+            return {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+        usage = completion.usage
+        return {
+            "custom_id": request["custom_id"],
+            "response": {"status_code": 200, "body": {
+                "choices": [{"finish_reason": choice.finish_reason, "message": {"role": "assistant", "content": choice.message.content}}
+                            for choice in completion.choices],
+                "usage": {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens,
+                          "total_tokens": usage.total_tokens, "prompt_tokens_details": {"cached_tokens": get_cached_tokens(usage)}},
+            }},
+            "error": None,
+        }
+    
+    results = await asyncio.gather(*(answer(request) for request in requests))
+    with open(f"{batch_folder_path}/{batch_id}.output.jsonl", "w") as f:
+        f.writelines(json.dumps(result) + "\n" for result in results)
+    return {result["custom_id"]: result for result in results}
+
+
+def parse_batch_result(result, content):
+    """
+    Returns the exchange of a batch output line (see build_exchange), or None if the request failed.
+    """
+    response = (result or {}).get("response") or {}
+    if response.get("status_code") != 200:
+        return None
+    choice = response["body"]["choices"][0]
+    if choice["finish_reason"] != "stop" or not choice["message"]["content"]:
+        return None
+    return build_exchange(content, choice["message"]["content"], SimpleNamespace(**response["body"]["usage"]))
+
+
+class ReflectionBatch:
+    """
+    The reflections of one reflection phase, sent as a batch job that runs while the game goes on.
+    prompts maps each request's custom id to its player and prompt, unmerged holds the custom ids
+    whose reflection is not merged yet (see merge_reflection_batch).
+    
+    With --replay nothing is sent (task is None): the reflections are read from the response cache
+    when the batch is merged, like the replies of direct calls. Batches still running are kept in
+    the game's checkpoints without their task, a resumed game waits for them again (see start).
+    """
+    def __init__(self, game_state, reflection_type, prompts):
+        self.reflection_type = reflection_type
+        self.mode = game_state.reflection_batch_mode
+        self.game_state = snapshot_game_state(game_state)
+        self.prompts = prompts
+        self.unmerged = set(prompts)
+        self.batch_id = None  # Batch API job, once submitted
+        self.results = None  # output lines by custom id, once the job has ended
+        self.start_time = time.time()
+        self.wall_time = 0.0
         
-    game_state.discard_pile.append(discarded_policy)
+        self.requests = [build_batch_request(custom_id, player, game_state, content, reflection_type) for custom_id, (player, content) in prompts.items()]
+        # The schema each reflection was asked with, which keys its entry in the response cache
+        self.response_formats = {request["custom_id"]: request["body"]["response_format"] for request in self.requests}
+        self.start(game_state)
+    
+    def start(self, game_state):
+        """
+        Starts (or, for a resumed game, restarts) the task that runs the job.
+        """
+        response_cache = game_state.response_cache
+        if self.results is not None or (response_cache is not None and response_cache.mode == "replay"):
+            self.task = None
+        else:
+            self.task = asyncio.ensure_future(self.run(game_state.batch_folder_path))
+    
+    async def run(self, batch_folder_path):
+        runner = run_local_batch if self.mode == 'local' else run_openai_batch
+        results = await runner(self, batch_folder_path)
+        self.wall_time = time.time() - self.start_time
+        return results
+    
+    def finished(self):
+        return self.task is None or self.task.done()
+    
+    def __getstate__(self):
+        # The task belongs to the running process, a resumed game restarts it
+        state = self.__dict__.copy()
+        state["task"] = None
+        return state
+
+
+def submit_reflection_batch(game_state, reflection_type, players, discussion_pool):
+    """
+    Builds the reflection prompts of the players and queues them as one batch job.
+    """
+    prompts = {}
+    for player in players:
+        player_pool = discussion_pool.for_player(player) if isinstance(discussion_pool, DiscussionPool) else discussion_pool
+        content = build_game_state_content(player, game_state, reflection_type)
+        content += build_action_content(player, game_state, reflection_type, player_pool)
+        prompts[f"{game_state.game_id}-{game_state.round_number}-{reflection_type}-{player.name}"] = (player, content)
+    
+    game_state.reflection_batches.append(ReflectionBatch(game_state, reflection_type, prompts))
+    print(f"The {reflection_type} reflections were queued as a batch job. The game goes on and each player gets theirs once the job has ended.")
+
+
+async def add_exchange_to_thread(player, exchange):
+    """
+    Adds an exchange answered outside the player's thread to the thread (assistants backend).
+    """
+    await wait_for_thread_syncs([player])
+    await add_thread_message(player, exchange["user_message"], "user")
+    message = await add_thread_message(player, exchange["assistant_message"], "assistant")
+    player.last_message_id = message.id
+
 
-    enacted_policy = policies[0]
+async def merge_reflection_batch(game_state, batch, player=None):
+    """
+    Merges the reflections of a finished batch into the players' conversations (and threads), their
+    memory and the game log, under the round and phase the reflections belong to. With a player only
+    that player's reflection is merged. Reflections the batch could not answer are sent directly instead.
+    Calls of the Batch API are charged at BATCH_PRICE_FACTOR of the price, local batches answer
+    through the regular API and are charged the full price.
+    """
+    response_cache = game_state.response_cache
+    if batch.results is None:
+        batch.results = {}
+        if batch.task is not None:
+            try:
+                batch.results = await batch.task
+            except Exception as e:
+                print(f"Batch of the {batch.reflection_type} reflections failed: {e}. Sending them directly.")
+            batch.task = None
+    price_factor = BATCH_PRICE_FACTOR if batch.mode == 'openai' else 1.0
     
-    game_state.enacted_policies.append(enacted_policy)
-    if enacted_policy == 'Liberal':
-        game_state.liberal_policies += 1
-    else:
-        game_state.fascist_policies += 1
+    reflection_state = batch.game_state
+    reflection_state.event_log = game_state.event_log
+    reflection_round = reflection_state.round_number
     
-    policy_passed = True
+    for custom_id, (reflection_player, content) in batch.prompts.items():
+        if custom_id not in batch.unmerged or (player is not None and reflection_player is not player):
+            continue
+        batch.unmerged.discard(custom_id)
+        
+        response_format = batch.response_formats[custom_id]
+        if response_cache is not None and response_cache.mode == "replay":
+            exchange = response_cache.replay(reflection_player, content, response_format)
+        else:
+            exchange = parse_batch_result(batch.results.get(custom_id), content)
+        if exchange is None:
+            print(f"No batch result for the {batch.reflection_type} reflection of {reflection_player.name}. Sending it directly.")
+            exchange = await send_to_api(game_state, content, reflection_player, batch.reflection_type, round_number=reflection_round)
+        else:
+            usage = exchange["usage"]
+            record_run_usage(game_state, usage, batch.wall_time)
+            if response_cache is not None and response_cache.mode == "record":
+                response_cache.record(reflection_player, content, response_format, exchange)
+            if game_state.backend != 'chat':
+                await add_exchange_to_thread(reflection_player, exchange)
+            record_exchange(reflection_player, game_state, exchange, reflection_round)
+            
+            full_cost = call_cost(game_state.model, usage)
+            cost = full_cost * price_factor
+            game_state.batch_savings += full_cost - cost
+            record_call_metrics(game_state, reflection_player, batch.reflection_type, new_call_metrics(), usage, cost, batch.wall_time)
+            enforce_budgets(game_state, cost)
+        
+        game_state.log_messages_by_player[reflection_player.name].extend(
+            format_log_messages(reflection_player.name, reflection_player.role, exchange["user_message"], exchange["response"])
+        )
+        log_event(reflection_state, "exchange", player=reflection_player.name, role=reflection_player.role, action_type=batch.reflection_type,
+                  user_message=exchange["user_message"], response=exchange["response"])
+        update_memory(reflection_player, reflection_state, batch.reflection_type, exchange["response"])
+        add_phase_log(reflection_state, reflection_player, batch.reflection_type)
     
-    return policy_passed
+    if not batch.unmerged:
+        print_game_log(reflection_state, reflection_round, batch.reflection_type)
+
+
+async def merge_reflection_batches(game_state, player=None, wait=False):
+    """
+    Merges the game's reflection batches in the order they were sent, up to the first batch whose job
+    is still running. With wait the running jobs are waited for, which the game only does at its end.
+    With a player only that player's reflections are merged, right before its next decision, so the
+    threads of other players are not touched while their runs may be active.
+    """
+    batches = game_state.reflection_batches
+    for batch in list(batches):
+        if not (wait or batch.finished()):
+            break
+        await merge_reflection_batch(game_state, batch, player)
+        if not batch.unmerged:
+            batches.remove(batch)
+
+
+def resume_reflection_batches(game_state):
+    """
+    Restarts the reflection batches a resumed game's checkpoint still holds.
+    """
+    if not hasattr(game_state, "reflection_batches"):
+        # Checkpoint written before running batches were kept in it
+        game_state.reflection_batches = []
+    for batch in game_state.reflection_batches:
+        batch.start(game_state)
+
+
+def discard_reflection_batches(game_state):
+    """
+    Stops waiting for the reflection batches of a stopped game. Batches taken into its last
+    checkpoint are restarted by a resumed game, later ones are replayed with their round.
+    """
+    for batch in getattr(game_state, "reflection_batches", []):
+        if batch.task is not None:
+            batch.task.cancel()
+
+#endregion
 
 
-def check_win_conditions(game_state, election_passed=False, hitler_removed=False, hitler_elected=False):
+async def parallel_reflection(game_state, reflection_type, discussion_pool):
+    """
+    Runs the reflection phase concurrently for all alive players.
     
-    #Check if 5 liberal policies have been enacted
-    if game_state.liberal_policies >= 5:
-        game_state.winning_team = "Liberals"
-        return "Liberals"
+    With --fused_reflection the reflection is not sent on its own: each player's reflection prompt
+    is kept in game_state.pending_reflections and folded into the player's next decision
+    (see agent_decision). The post game reflection has no next decision and is always sent.
+    With --batch_reflections the reflections are sent as a batch job instead (see ReflectionBatch).
+    """
+    alive_players = [player for player in game_state.players if player.is_alive]
     
-    #Check if 6 fascist policies have been enacted
-    if game_state.fascist_policies >= 6:
-        game_state.winning_team = "Fascists"
-        return "Fascists"
+    if game_state.fused_reflection and reflection_type != 'reflection_post_game':
+        reflection_state = snapshot_game_state(game_state)
+        for player in alive_players:
+            player_pool = discussion_pool.for_player(player) if isinstance(discussion_pool, DiscussionPool) else discussion_pool
+            game_state.pending_reflections.setdefault(player.name, []).append({
+                "action_type": reflection_type,
+                "content": build_action_content(player, game_state, reflection_type, player_pool),
+                "game_state": reflection_state,
+            })
+        print(f"The {reflection_type} reflections will be answered with each player's next decision.")
+        return
     
-    # Check if Hitler has been elected Chancellor after 3 or more Fascist policies
-    if (game_state.fascist_policies >= 3 
-        and election_passed == True
-        and hitler_elected == True):
-        game_state.winning_team = "Fascists"
-        return "Fascists (Hitler elected Chancellor)"
+    if game_state.reflection_batch_mode != 'off' and not game_state.fused_reflection:
+        submit_reflection_batch(game_state, reflection_type, alive_players, discussion_pool)
+        return
     
-    # Check if Hitler has been removed
-    if hitler_removed == True:
-        game_state.winning_team = "Liberals"
-        return "Liberals (Hitler removed)"
+    results = await asyncio.gather(
+        *(execute_reflection(player, game_state, reflection_type, discussion_pool) for player in alive_players),
+        return_exceptions=True
+    )
+
+    # A budget stops the game, it is not an error of one player
+    for result in results:
+        if isinstance(result, BudgetExceeded):
+            raise result
+
+    # Collect results to ensure all tasks complete
+    reflections = {}
+    for player, result in zip(alive_players, results):
+        if isinstance(result, Exception):
+            print(f"Error processing reflection for player: {player.name}. Error: {result}")
+        else:
+            player_name, reflection = result
+            reflections[player_name] = reflection
     
-    return None
+    # Print the game log after all reflections are completed
+    print_game_log(game_state, game_state.round_number, reflection_type)
 
 
-def execute_vote(player, game_state, discussion_pool):
-    """
-    Executes the vote for a single player.
+#region Checkpoints
+
+def save_checkpoint(game_state, phase):
     """
-    vote = agent_decision(player, game_state, 'vote', discussion_pool)
-    vote_dict = json.loads(vote)
-    vote_decision = vote_dict.get('decision', '')
-    vote = vote_decision
+    Pickles the game state, including every player (memory, term limits, conversation,
+    assistant and thread IDs), the policy deck, the discard pile, the game log and the
+    token counts, so the game can continue from this point with --resume.
     
-    if 'Nein' in vote:
-        vote = 'Nein'
-    elif 'Ja' in vote:
-        vote = 'Ja'
-    else:
-        print(f'Invalid response: {vote} Defaulting to random vote')
-        vote = random.choice(['Nein', 'Ja'])
+    Checkpoints are taken at the start of each round and before the post game phases.
+    A game resumed from a round checkpoint replays the interrupted round from its start.
+    """
+    game_state.checkpoint_phase = phase
     
-    # Add the vote to the logs
-    add_phase_log(game_state, player, 'voting_phase')
+    temp_path = f"{game_state.checkpoint_path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(game_state, f)
+    os.replace(temp_path, game_state.checkpoint_path)
     
-    return player.name, vote
+    log_event(game_state, "checkpoint", phase=phase)
 
 
-def execute_reflection(player, game_state, reflection_type, discussion_pool):
+def load_checkpoint(checkpoint_path):
     """
-    Executes the reflection phase for a single player.
+    Loads a game state saved by save_checkpoint.
     """
-    reflection = agent_decision(player, game_state, reflection_type, discussion_pool)
-    add_phase_log(game_state, player, reflection_type)
-    return player.name, reflection
+    with open(checkpoint_path, "rb") as f:
+        game_state = pickle.load(f)
+    
+    # The checkpoint may have been moved since it was written
+    game_state.checkpoint_path = checkpoint_path
+    return game_state
 
 
-def parallel_reflection(game_state, reflection_type, discussion_pool):
+async def rollback_to_checkpoint(game_state):
     """
-    Runs the reflection phase in parallel for all alive players.
+    Brings each player's Assistants thread back to the checkpoint: active runs are cancelled
+    and messages added after the checkpoint (the interrupted round) are deleted, so the
+    thread matches the restored memory. The chat backend keeps the conversation in the
+    checkpoint itself, so there is nothing to do.
     """
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        alive_players = [player for player in game_state.players if player.is_alive]
+    if game_state.backend == 'chat':
+        return
+    
+    for player in game_state.players:
+        await cancel_active_runs(player)
         
-        futures = {
-            executor.submit(execute_reflection, player, game_state, reflection_type, discussion_pool): player.name
-            for player in alive_players
-        }
+        list_params = {"after": player.last_message_id} if player.last_message_id else {}
+        stale_messages = [message async for message in client.beta.threads.messages.list(thread_id=player.thread_id, order="asc", **list_params)]
+        for message in stale_messages:
+            await client.beta.threads.messages.delete(message.id, thread_id=player.thread_id)
+        
+        if stale_messages:
+            print(f"Removed {len(stale_messages)} messages added to {player.name}'s thread after the checkpoint.")
 
-        # Collect results to ensure all tasks complete
-        reflections = {}
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                player_name, reflection = future.result()
-                reflections[player_name] = reflection
-            except Exception as e:
-                print(f"Error processing reflection for player: {futures[future]}. Error: {e}")
-    
-    # Print the game log after all reflections are completed
-    print_game_log(game_state, game_state.round_number, reflection_type)
+#endregion
 
 
-def play_game(game_state):
+async def play_game(game_state):
 
     
     while True:
+        
+        # A game resumed after its last round goes straight to the post game phases
+        if game_state.checkpoint_phase == "post_game":
+            break
+        await wait_for_thread_syncs(game_state.players)
+        await merge_reflection_batches(game_state)
+        save_checkpoint(game_state, "round")
                
         
         #region Presidential Powers
         
+        # The last president's power, see rules_engine.pending_power
+        power = rules_engine.pending_power(rules_state(game_state))
+        
         # if there are 3 fascist policies, call agent_decision with the peek_top_3_policies action
-        if game_state.fascist_policies == 3 and game_state.peek_power_used == False:
+        if power == 'peek':
             
-            game_state.peek_power_used = True
+            state, _ = rules_engine.peek(rules_state(game_state), game_state.rng)
+            apply_rules_state(game_state, state)
             
-            discussion_pool = f""
-            discussion = agent_decision(game_state.current_president, game_state, 'peek_top_3_policies')
-            discussion_dict = json.loads(discussion)
-            discussion_external = discussion_dict.get('external_dialogue', '')
+            discussion_pool = DiscussionPool()
+            discussion_external = (await agent_decision(game_state.current_president, game_state, 'peek_top_3_policies')).external_dialogue
             
             add_phase_log(game_state, game_state.current_president, 'peek_top_3_policies')
             print_game_log(game_state, game_state.round_number, 'peek_top_3_policies')
@@ -2303,92 +4778,37 @@ def play_game(game_state):
             
             
             
-            for player in game_state.players:
-                if player.is_alive:
-                    if player.name != game_state.current_president.name:
-                        discussion = agent_decision(player, game_state, 'peek_top_3_policies', discussion_pool)
-                        discussion_dict = json.loads(discussion)
-                        discussion_external = discussion_dict.get('external_dialogue', '')
-                        discussion_pool += f"Then {player.name} said:\n{discussion_external}\n\n"
-                        
-                        add_phase_log(game_state, player, 'peek_top_3_policies')
+            speakers = [player for player in game_state.players if player.is_alive and player.name != game_state.current_president.name]
+            discussion_pool = await run_discussion(
+                game_state, 'peek_top_3_policies', speakers, discussion_pool, 'peek_top_3_policies',
+                lambda i, player, text: f"Then {player.name} said:\n{text}\n\n"
+            )
                         
             print_game_log(game_state, game_state.round_number, 'peek_top_3_policies')
             
             # adding a reflection phase after peeking at the top 3 policies
-            for player in game_state.players:
-                if player.is_alive:
-                    reflection = agent_decision(player, game_state, 'reflection_post_peek_top_3_policies', discussion_pool)
-                    add_phase_log(game_state, player, 'reflection_post_peek_top_3_policies')
-                    
-            print_game_log(game_state, game_state.round_number, 'reflection_post_peek_top_3_policies')
+            await parallel_reflection(game_state, 'reflection_post_peek_top_3_policies', discussion_pool)
             
         # if there are 4 fascist policies, call agent_decision with the remove_a_player action
-        if game_state.fascist_policies == 4 and game_state.remove_power_one_used == False:
+        if power == 'remove_one':
             
-            game_state.remove_power_one_used = True
+            discussion_pool = DiscussionPool()
             
-            discussion_pool = f""
-            first_speaker = True
-            
-            for player in game_state.players:
-                
-                if player.is_alive:
-                    if player.name != game_state.current_president.name:
-                        if first_speaker:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_one', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"{player.name} said:\n{discussion_external}\n\n"
-                            first_speaker = False
-                        else:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_one', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"Then {player.name} said:\n{discussion_external}\n\n"
-                    else:
-                        if first_speaker:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_one', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"President {player.name}'s external dialogue:\n{discussion_external}\n\n"
-                            first_speaker = False
-                        else:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_one', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"Then President {player.name} said:\n{discussion_external}\n\n"
-            
-                    add_phase_log(game_state, player, 'remove_player_discussion')
+            speakers = [player for player in game_state.players if player.is_alive]
+            discussion_pool = await run_discussion(
+                game_state, 'discuss_remove_a_player_one', speakers, discussion_pool, 'remove_player_discussion',
+                partial(format_removal_statement, game_state)
+            )
             
             print_game_log(game_state, game_state.round_number, 'remove_player_discussion')
             
             #region remove player
-            remove_player = agent_decision(game_state.current_president, game_state, 'remove_a_player_one')
-            remove_player_dict = json.loads(remove_player)
-            remove_player_reasoning = remove_player_dict.get('external_dialogue', '')   
-            remove_player = remove_player_dict.get('decision', '')
-            
-            game_state.removed_player_one = remove_player
-            
-            remove_player_clean = None
-            
-            for player in game_state.players:
-                if player.is_alive:
-                    if player.name in remove_player:
-                        player.is_alive = False
-                        remove_player_clean = player.name
-                        break
-                    
-            if remove_player_clean == None:
-                print(f"Invalid Response: {remove_player}\nRandomly selecting a player")
-                alive_players = [p for p in game_state.players if p.is_alive]
-                
-                # remove current president from alive_players
-                alive_players = [p for p in alive_players if p.name != game_state.current_president.name]
-                
-                remove_player_clean = random.choice(alive_players).name
+            decision = await agent_decision(game_state.current_president, game_state, 'remove_a_player_one')
+            remove_player_reasoning = decision.external_dialogue
+            remove_player_clean = decision.choice
             
+            state = rules_engine.remove_player(rules_state(game_state), remove_player_clean, power)
+            apply_rules_state(game_state, state)
             game_state.removed_player_one = remove_player_clean
             
             #endregion
@@ -2404,13 +4824,7 @@ def play_game(game_state):
             
             #region seeing if player removed was Hitler
             
-            hitler_removed = False
-            for player in game_state.players:
-                if player.name == remove_player_clean:
-                    if player.role == 'Hitler':
-                        hitler_removed = True
-            
-            winner = check_win_conditions(game_state, hitler_removed=hitler_removed)
+            winner = check_win_conditions(game_state, state)
             if winner:
                 print(50*'#')
                 print(50*'#')
@@ -2424,78 +4838,29 @@ def play_game(game_state):
             #region adding a reflection phase after removing a player
             discussion_pool += f"After removing a player, President {game_state.current_president.name} said:\n{remove_player_reasoning}\n\n" 
             
-            for player in game_state.players:
-                if player.is_alive:
-                    reflection = agent_decision(player, game_state, 'reflection_post_remove_player', discussion_pool)
-                    add_phase_log(game_state, player, 'reflection_post_remove_player')
-                    
-            print_game_log(game_state, game_state.round_number, 'reflection_post_remove_player')
+            await parallel_reflection(game_state, 'reflection_post_remove_player', discussion_pool)
             #endregion
             
         # if there are 5 fascist policies, call agent_decision with the remove_a_player_two action
-        if game_state.fascist_policies == 5 and game_state.remove_power_two_used == False:
+        if power == 'remove_two':
             
-            game_state.remove_power_two_used = True
+            discussion_pool = DiscussionPool()
             
-            discussion_pool = f""
-            first_speaker = True
-            for player in game_state.players:
-                
-                if player.is_alive:
-                    if player.name != game_state.current_president.name:
-                        if first_speaker:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_two', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"{player.name} said:\n{discussion_external}\n\n"
-                            first_speaker = False
-                        else:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_two', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"Then {player.name} said:\n{discussion_external}\n\n"
-                    else:
-                        if first_speaker:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_two', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"President {player.name}'s external dialogue:\n{discussion_external}\n\n"
-                            first_speaker = False
-                        else:
-                            discussion = agent_decision(player, game_state, 'discuss_remove_a_player_two', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                            discussion_pool += f"Then President {player.name} said:\n{discussion_external}\n\n"
-            
-                    add_phase_log(game_state, player, 'remove_player_discussion')
+            speakers = [player for player in game_state.players if player.is_alive]
+            discussion_pool = await run_discussion(
+                game_state, 'discuss_remove_a_player_two', speakers, discussion_pool, 'remove_player_discussion',
+                partial(format_removal_statement, game_state)
+            )
             
             print_game_log(game_state, game_state.round_number, 'remove_player_discussion')
             
             #region Remove Player
-            remove_player = agent_decision(game_state.current_president, game_state, 'remove_a_player_two')
-            remove_player_dict = json.loads(remove_player)
-            remove_player_reasoning = remove_player_dict.get('external_dialogue', '')
-            remove_player = remove_player_dict.get('decision', '')
-            
-            
-            remove_player_clean = None
-            
-            for player in game_state.players:
-                if player.is_alive:
-                    if player.name in remove_player:
-                        player.is_alive = False
-                        remove_player_clean = player.name
-                        break
-                    
-            if remove_player_clean == None:
-                print(f"Invalid Response: {remove_player}\nRandomly selecting a player")
-                alive_players = [p for p in game_state.players if p.is_alive]
-                
-                # remove current president from alive_players
-                alive_players = [p for p in alive_players if p.name != game_state.current_president.name]
-                
-                remove_player_clean = random.choice(alive_players).name
+            decision = await agent_decision(game_state.current_president, game_state, 'remove_a_player_two')
+            remove_player_reasoning = decision.external_dialogue
+            remove_player_clean = decision.choice
             
+            state = rules_engine.remove_player(rules_state(game_state), remove_player_clean, power)
+            apply_rules_state(game_state, state)
             game_state.removed_player_two = remove_player_clean
             #endregion          
                     
@@ -2511,13 +4876,7 @@ def play_game(game_state):
             
             #region seeing if player removed was Hitler
             
-            hitler_removed = False
-            for player in game_state.players:
-                if player.name == remove_player_clean:
-                    if player.role == 'Hitler':
-                        hitler_removed = True
-            
-            winner = check_win_conditions(game_state, hitler_removed=hitler_removed)
+            winner = check_win_conditions(game_state, state)
             if winner:
                 print(50*'#')
                 print(50*'#')
@@ -2534,12 +4893,7 @@ def play_game(game_state):
             
             discussion_pool += f"After removing a player, President {game_state.current_president.name} said:\n{remove_player_reasoning}\n\n" 
             
-            for player in game_state.players:
-                if player.is_alive:
-                    reflection = agent_decision(player, game_state, 'reflection_post_remove_player', discussion_pool)
-                    add_phase_log(game_state, player, 'reflection_post_remove_player')
-                    
-            print_game_log(game_state, game_state.round_number, 'reflection_post_remove_player')
+            await parallel_reflection(game_state, 'reflection_post_remove_player', discussion_pool)
             
             #endregion
        
@@ -2547,7 +4901,8 @@ def play_game(game_state):
         
         #region Round Initialization
         
-        game_state.round_number += 1
+        # Moves to the next round and seats its president
+        apply_rules_state(game_state, rules_engine.start_round(rules_state(game_state)))
         
         for player in game_state.players:
             initialize_round_memory(player, game_state.round_number)
@@ -2565,39 +4920,15 @@ def play_game(game_state):
         
         #region Nomination Phase
         
-        alive_players = [p for p in game_state.players if p.is_alive] 
-        
-        president = alive_players[game_state.round_number % len(alive_players)]
-        
-        
-        game_state.current_president = president
+        president = game_state.current_president
         
         # President nominates Chancellor
-        response = agent_decision(president, game_state, 'nominate')
-                
-        # Extract the chancellor name from the response
-        chancellor_dict = json.loads(response)
-        chancellor_reasoning = chancellor_dict.get('external_dialogue', '')
-        chancellor_decision = chancellor_dict.get('decision', '')
-                
-        chancellor_name = None 
-        
-        for player in game_state.players:
-            if player.name in chancellor_decision:
-                chancellor_name = player.name
-                break
-            
-        chancellor = next((p for p in game_state.players if p.name == chancellor_name and p.is_alive), None)
-
-        if not chancellor or chancellor == president or chancellor.last_chancellor:
-            # Handle invalid nomination
-            eligible_players = [p for p in game_state.players if p != president and p.is_alive and not p.last_chancellor]
-            chancellor = random.choice(eligible_players)
-            logging.info(f"{president.name} made an invalid nomination. Randomly selecting {chancellor.name} as Chancellor.")
-        else:
-            logging.info(f"{president.name} nominates {chancellor.name} as Chancellor.")
-
-        game_state.current_chancellor = chancellor
+        # The chancellor is one of the eligible players, see decision_choices
+        decision = await agent_decision(president, game_state, 'nominate')
+        chancellor_reasoning = decision.external_dialogue
+        apply_rules_state(game_state, rules_engine.nominate(rules_state(game_state), decision.choice))
+        chancellor = game_state.current_chancellor
+        logging.info(f"{president.name} nominates {chancellor.name} as Chancellor.")
         
         add_phase_log(game_state, president, 'nomination_phase')
         
@@ -2607,7 +4938,7 @@ def play_game(game_state):
     
         #region Post Nomination Discussion Phase
         
-        discussion_pool = f""
+        discussion_pool = DiscussionPool()
         
         discussion_pool += f"President {president.name} nominated {chancellor.name} as chancellor and said: \n{chancellor_reasoning}\n\n"
                  
@@ -2618,25 +4949,18 @@ def play_game(game_state):
         discussion_order.remove(president)
         
         # shuffle the discussion order
-        random.shuffle(discussion_order)
+        game_state.rng.shuffle(discussion_order)
         
         # save the order of discussion 
         game_state.discussion_order = discussion_order
         #endregion
         
         # sending to agent_decision
-        for i, player in enumerate(discussion_order): 
-            if player.is_alive:  
-                discussion = agent_decision(player, game_state, 'discussion_post_nomination', discussion_pool)
-                discussion_dict = json.loads(discussion)
-                discussion_external = discussion_dict.get('external_dialogue', '')
-                
-                #region add to discussion pool
-                prefix = f"{'Then'}{' Chancellor' if player.name == game_state.current_chancellor.name else ''}"    
-                discussion_pool += f"{prefix} {player.name} said:\n{discussion_external}\n\n"
-                #endregion
-                
-                add_phase_log(game_state, player, 'discussion_post_nomination')
+        speakers = [player for player in discussion_order if player.is_alive]
+        discussion_pool = await run_discussion(
+            game_state, 'discussion_post_nomination', speakers, discussion_pool, 'discussion_post_nomination',
+            lambda i, player, text: f"{'Then'}{' Chancellor' if player.name == game_state.current_chancellor.name else ''} {player.name} said:\n{text}\n\n"
+        )
         
         print_game_log(game_state, game_state.round_number, 'discussion_post_nomination')
         
@@ -2645,22 +4969,25 @@ def play_game(game_state):
         #region Voting Phase
         
         # sending to agent_decision
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Prepare tasks for alive players
-            alive_players = [player for player in game_state.players if player.is_alive]
-            futures = {
-                executor.submit(execute_vote, player, game_state, discussion_pool): player.name
-                for player in alive_players
-            }
+        alive_players = [player for player in game_state.players if player.is_alive]
+        results = await asyncio.gather(
+            *(execute_vote(player, game_state, discussion_pool) for player in alive_players),
+            return_exceptions=True
+        )
 
-            # Collect results as threads complete
-            votes = {}
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    player_name, vote = future.result()
-                    votes[player_name] = vote
-                except Exception as e:
-                    print(f"Error processing vote for player: {futures[future]}. Error: {e}")
+        # A budget stops the game, it is not an error of one player
+        for result in results:
+            if isinstance(result, BudgetExceeded):
+                raise result
+
+        # Collect results
+        votes = {}
+        for player, result in zip(alive_players, results):
+            if isinstance(result, Exception):
+                print(f"Error processing vote for player: {player.name}. Error: {result}")
+            else:
+                player_name, vote = result
+                votes[player_name] = vote
 
         # Assign the collected votes to game_state
         game_state.votes = votes
@@ -2673,42 +5000,31 @@ def play_game(game_state):
         ja_votes = sum(1 for vote in votes.values() if vote.lower() == 'ja')
         alive_players = [player for player in game_state.players if player.is_alive]
         nein_votes = len(alive_players) - ja_votes
-        election_passed = False
-        majority_vote = (len(alive_players) // 2) + 1
         #endregion
         
+        # A passed election sets the term limits and resets the election tracker, a failed one moves
+        # it on and enacts the top policy after 3 failures, see rules_engine.resolve_election
+        enacted_before = len(game_state.enacted_policies)
+        state, election_passed = rules_engine.resolve_election(
+            rules_state(game_state), {name: vote.lower() == 'ja' for name, vote in votes.items()}, game_state.rng
+        )
+        apply_rules_state(game_state, state)
+        add_final_voting_tally_log(game_state, election_passed, ja_votes, nein_votes)
+        
         # if election passes
-        if ja_votes >= majority_vote:
-            election_passed = True
-            add_final_voting_tally_log(game_state, election_passed, ja_votes, nein_votes)
-            president.last_president = True
-            chancellor.last_chancellor = True
-            game_state.election_tracker = 0  # Reset election tracker
-            # Reset term limits
-            for player in game_state.players:
-                if player != president:
-                    player.last_president = False
-                if player != chancellor:
-                    player.last_chancellor = False
-
-            if game_state.fascist_policies >= 3 and game_state.current_chancellor.role == 'Hitler':
-                winner = check_win_conditions(game_state, election_passed=True, hitler_elected=True)
-                if winner:
-                    print(50*'#')
-                    print(50*'#')
-                    print(f"{winner} win the game!!!!!")
-                    print(50*'#')
-                    print(50*'#')
-                    break
+        if election_passed:
+            winner = check_win_conditions(game_state, state)
+            if winner:
+                print(50*'#')
+                print(50*'#')
+                print(f"{winner} win the game!!!!!")
+                print(50*'#')
+                print(50*'#')
+                break
             
         # if election fails
-        else:
-            game_state.election_tracker += 1
-            add_final_voting_tally_log(game_state, election_passed, ja_votes, nein_votes)
-            if game_state.election_tracker >= 3:
-                logging.info("Election tracker reached 3. Top policy is enacted automatically.")
-                enact_top_policy(game_state)
-                game_state.election_tracker = 0
+        elif len(game_state.enacted_policies) > enacted_before:
+            logging.info(f"Election tracker reached 3. Top policy is enacted automatically: {game_state.enacted_policies[-1]}.")
                 
         print_game_log(game_state, game_state.round_number, 'final_voting_tally')
 
@@ -2722,9 +5038,9 @@ def play_game(game_state):
         """
         
         if election_passed:
-            parallel_reflection(game_state, 'reflection_post_voting_phase_passed', discussion_pool)
+            await parallel_reflection(game_state, 'reflection_post_voting_phase_passed', discussion_pool)
         else:
-            parallel_reflection(game_state, 'reflection_post_voting_phase_failed', discussion_pool)
+            await parallel_reflection(game_state, 'reflection_post_voting_phase_failed', discussion_pool)
         
         #endregion
         
@@ -2733,38 +5049,28 @@ def play_game(game_state):
         if election_passed:
             
             #region special case with 5 fascist policies
-            if game_state.fascist_policies == 5: 
+            if rules_engine.veto_allowed(rules_state(game_state)): 
                 
                 policy_passed = False
                 
-                policy_passed = enact_policy_with_veto(game_state)
+                policy_passed = await enact_policy_with_veto(game_state)
                 
                 if policy_passed:
                     
-                    # set election tracker to 0
-                    game_state.election_tracker = 0
-                    
                     #region Post Policy Enactment with Veto Discussion Phase
                 
-                    discussion_pool = f""
+                    discussion_pool = DiscussionPool()
 
                     #region Discussion Order
                     discussion_order = [game_state.current_president.name, game_state.current_chancellor.name] + [player.name for player in game_state.players if player.name != game_state.current_president.name and player.name != game_state.current_chancellor.name]
                     #endregion
                     
                     #region Sending to agent_decision
-                    for i, player_name in enumerate(discussion_order):
-                        player = next(p for p in game_state.players if p.name == player_name)
-                        if player.is_alive:
-                            discussion = agent_decision(player, game_state, 'discussion_post_policy_enactment_with_veto', discussion_pool)
-                            discussion_dict = json.loads(discussion)
-                            discussion_external = discussion_dict.get('external_dialogue', '')
-                        
-                            # building the discussion pool
-                            prefix = "President" if i==0 else "Then Chancellor" if i==1 else "Then"
-                            discussion_pool += f"{prefix} {player.name} said: \n{discussion_external}\n\n"
-                            
-                            add_phase_log(game_state, player, 'discussion_post_policy_enactment_with_veto')
+                    speakers = [player for player_name in discussion_order for player in game_state.players if player.name == player_name and player.is_alive]
+                    discussion_pool = await run_discussion(
+                        game_state, 'discussion_post_policy_enactment_with_veto', speakers, discussion_pool, 'discussion_post_policy_enactment_with_veto',
+                        lambda i, player, text: f"{'President' if i == 0 else 'Then Chancellor' if i == 1 else 'Then'} {player.name} said: \n{text}\n\n"
+                    )
                         
                     #endregion
 
@@ -2777,18 +5083,17 @@ def play_game(game_state):
                     We Need this because not all the players have seen what everyone else said after the first post policy enactment discussion. So we need to send every player what was said and have them reflect. 
                     """
                     
-                    parallel_reflection(game_state, 'reflection_post_policy_enactment_with_veto', discussion_pool)
+                    await parallel_reflection(game_state, 'reflection_post_policy_enactment_with_veto', discussion_pool)
 
                     #endregion              
                 
                 else:
-                    game_state.election_tracker += 1
                     election_passed = False
                 #endregion
             
             #region normal policy phase
             else:
-                enact_policy(game_state)
+                await enact_policy(game_state)
 
                 for player in game_state.players:
                     if player.is_alive:
@@ -2804,25 +5109,18 @@ def play_game(game_state):
         
             #region Post Policy Enactment Discussion Phase
             
-            discussion_pool = f""
+            discussion_pool = DiscussionPool()
 
             #region Discussion Order
             discussion_order = [game_state.current_president.name, game_state.current_chancellor.name] + [player.name for player in game_state.players if player.name != game_state.current_president.name and player.name != game_state.current_chancellor.name]
             #endregion
             
             #region Sending to agent_decision
-            for i, player_name in enumerate(discussion_order):
-                player = next(p for p in game_state.players if p.name == player_name)
-                if player.is_alive:
-                    discussion = agent_decision(player, game_state, 'discussion_post_policy_enactment', discussion_pool)
-                    discussion_dict = json.loads(discussion)
-                    discussion_external = discussion_dict.get('external_dialogue', '')
-                
-                    # building the discussion pool
-                    prefix = "President" if i==0 else "Then Chancellor" if i==1 else "Then"
-                    discussion_pool += f"{prefix} {player.name} said: \n{discussion_external} \n\n"
-                    
-                    add_phase_log(game_state, player, 'post_policy_enactment')
+            speakers = [player for player_name in discussion_order for player in game_state.players if player.name == player_name and player.is_alive]
+            discussion_pool = await run_discussion(
+                game_state, 'discussion_post_policy_enactment', speakers, discussion_pool, 'post_policy_enactment',
+                lambda i, player, text: f"{'President' if i == 0 else 'Then Chancellor' if i == 1 else 'Then'} {player.name} said: \n{text} \n\n"
+            )
                 
             #endregion
 
@@ -2836,12 +5134,12 @@ def play_game(game_state):
             We Need this because not all the players have seen what everyone else said after the first post policy enactment discussion. So we need to send every player what was said and have them reflect. 
             """
             
-            parallel_reflection(game_state, 'reflection_post_policy_enactment', discussion_pool)
+            await parallel_reflection(game_state, 'reflection_post_policy_enactment', discussion_pool)
             #endregion              
             
         #region Check Win Conditions
         
-        winner = check_win_conditions(game_state, election_passed=election_passed)
+        winner = check_win_conditions(game_state)
         if winner:
             print(50*'#')
             print(50*'#')
@@ -2859,26 +5157,28 @@ def play_game(game_state):
             
             #endregion
     
+    await wait_for_thread_syncs(game_state.players)
+    await merge_reflection_batches(game_state)
+    save_checkpoint(game_state, "post_game")
+    
     #region Post Game Discussion
     
-    discussion_pool = f""
+    discussion_pool = DiscussionPool()
     
-    for player in game_state.players:
-        discussion = agent_decision(player, game_state, 'discussion_post_game', discussion_pool)
-        discussion_dict = json.loads(discussion)
-        discussion_external = discussion_dict.get('external_dialogue', '')
-        
-        discussion_pool += f"{player.name} said: \n{discussion_external}\n\n"
-        
-        add_phase_log(game_state, player, 'discussion_post_game')
+    discussion_pool = await run_discussion(
+        game_state, 'discussion_post_game', game_state.players, discussion_pool, 'discussion_post_game',
+        lambda i, player, text: f"{player.name} said: \n{text}\n\n"
+    )
     
     print_game_log(game_state, game_state.round_number, 'discussion_post_game')
     #endregion
     
     #region Post Game Reflection
     
-    parallel_reflection(game_state, 'reflection_post_game', discussion_pool)
+    await parallel_reflection(game_state, 'reflection_post_game', discussion_pool)
         
+    # The game's log is only complete once every batch job has ended
+    await merge_reflection_batches(game_state, wait=True)
     print_game_log(game_state, game_state.round_number, 'reflection_post_game')
     
     #endregion
@@ -2886,120 +5186,205 @@ def play_game(game_state):
     print_log_messages(game_state.log_messages_by_player, game_state)
     
 
-def run_game_instance(game_id, game_log_run_number, player_type):
+async def new_game(game_id, game_log_run_number, player_type, model, response_cache=None, assistant_registry=None):
+    """
+    Sets up the players (roles, personalities, assistants) and the game state of a new game.
+    The game's random generator is seeded from --seed (or the replayed recording) and the game id.
+    """
+    
+    args = parse_args()
+    
+    seed = response_cache.seed if response_cache is not None else args.seed
+    rng = random.Random(f"{seed}:{game_id}") if seed is not None else random.Random()
+    
+    # --- Define players ---
+    if player_type == 1:
+        players = [
+            Player('Alice', 'Liberal', 'A Liberal'),
+            Player('Bob', 'Fascist', 'A Fascist'),
+            Player('Carol', 'Liberal', 'A Liberal'),
+            Player('Dave', 'Hitler', 'A Hitler'),
+            Player('Eve',  'Liberal', 'A Liberal'),
+        ]
+    elif player_type == 2:
+        players = [
+            Player('Alice', 'Liberal', 'An overly cautious Liberal, skeptical to trust anyone and ready to blame others if they seem at all against the liberal team, even if the evidence is weak. You are not easily swayed by others.'),
+            Player('Bob', 'Fascist', 'A cunning Fascist, who likes to stir the pot, cause chaos, and pin liberals against each other to secure victory for the Fascist team.'),
+            Player('Carol', 'Liberal', 'A level headed Liberal who likes to take the lead. You look at both sides of the argument, examine the evidence, and make what you see as the most logical decision.'),
+            Player('Dave', 'Hitler', 'A charismatic Hitler, who can blend in with the Liberals, use very persuasive arguments, and can sway the votes of the liberals to vote for him when the time is right.'),
+            Player('Eve',  'Liberal', 'An empathetic Liberal who tends to trust players and give the benefit of the doubt. You are reluctant to accuse anyone without clear evidence. You tend to follow what others are doing and are easily swayed.'),
+        ]
+    elif player_type == 3:
+        players = [
+            Player('Alice', 'Liberal', 
+       'A Liberal. You know Bob and Eve well and tend to think you can read them well. You like to joke around with Bob. You are confident and outspoken, often taking the lead in discussions. You value fairness and are quick to challenge anything you see as suspicious.'),
+            Player('Bob', 'Fascist', 
+       'A Fascist. You know Alice and think you can use the inherent trust you share to win the game. You suspect Eve does not like you, but you are not certain. You aim to win her over by being kind and agreeable. You are strategic and persuasive, preferring to subtly guide the group rather than dominate the conversation.'),
+            Player('Carol', 'Liberal', 
+       'A Liberal. You do not know any of the other players, which makes it difficult to tell if someone is lying. You are reserved and observant, preferring to listen and gather information before speaking. You often analyze the group dynamics and try to piece together the truth silently.'),
+            Player('Dave', 'Hitler', 
+       'Hitler. You are friends with Eve, and you use your close relationship to gain her trust. You also know that Eve is friends with Alice, so you plan to have Eve advocate for you to Alice. You are charismatic and calculated, rarely speaking out of turn but carefully choosing your words to build trust. You also tend to be overly competitive and look down on players if you think they are not making the best choice, especially players on your team.'),
+            Player('Eve', 'Liberal', 
+       'A Liberal. You know Alice and Dave well and tend to trust them more. You inherently distrust Bob because you find him arrogant, but you’re willing to change your mind if he is nicer. You are empathetic and collaborative, often trying to mediate conflicts and keep the group focused. You prefer harmony over confrontation but are not afraid to voice your opinions when necessary.')
+]
+    else: 
+        players = [
+            Player('Alice', 'Liberal', 'A Liberal'),
+            Player('Bob', 'Fascist', 'A Fascist'),
+            Player('Carol', 'Liberal', 'A Liberal'),
+            Player('Dave', 'Hitler', 'A Hitler'),
+            Player('Eve',  'Liberal', 'A Liberal'),
+        ]
+        
+    rng.shuffle(players)
+
+    # Identify roles
+    for player in players:
+        if player.role == 'Hitler':
+            hitler = player
+        elif player.role == 'Fascist':
+            fascist = player
+        elif player.role == 'Liberal':
+            if 'liberal1' not in locals():
+                liberal1 = player.name
+            elif 'liberal2' not in locals():
+                liberal2 = player
+            else:
+                liberal3 = player
+
+    # Create (or reuse) the assistants and create the threads of all players at once
+    teams = {'Hitler': fascist, 'Fascist': hitler, 'Liberal': None}
+    await asyncio.gather(*(
+        create_assistant_for_player(player, teams[player.role], model, game_id, assistant_registry)
+        for player in players
+    ))
+
+    # Initialize Game State
+    game_state = GameState(players, rng)
+    game_state.response_cache = response_cache
+    game_state.run_mode = args.run_mode
+    game_state.backend = args.backend
+    game_state.model = model
+    game_state.context_rounds = args.context_rounds
+    game_state.context_token_budget = args.context_token_budget
+    game_state.context_limit = args.context_limit
+    game_state.discussion_mode = args.discussion_mode
+    game_state.discussion_rounds = max(1, args.discussion_rounds)
+    game_state.fused_reflection = args.fused_reflection
+    game_state.reflection_batch_mode = "local" if args.batch_reflections != "off" and args.mock else args.batch_reflections
+    apply_budget_args(game_state, args)
+    game_state.game_id = game_id
+    game_state.game_log_run_number = game_log_run_number
+    game_state.player_type = player_type
+    # Store instruction in log_messages_by_player
+    for player in game_state.players:
+        game_state.log_messages_by_player[player.name].append(player.instructions)
+    
+    return game_state
+
+
+async def run_game(game_id, game_log_run_number, player_type, model = None, resumed_game_state = None):
     """
     Runs a single instance of the game with a unique log file path.
     If an exception occurs, it logs the traceback to the same file.
-    """
     
-    print(f"Running game instance {game_id} with player type {player_type}")
+    With resumed_game_state (see load_checkpoint) the game continues from its checkpoint
+    and appends to its existing log instead of starting over.
+    
+    Returns the final game state, or None if the game failed.
+    """
     
     args = parse_args()
+    model = model or args.model
+    
+    if resumed_game_state is None:
+        print(f"Running game instance {game_id} with player type {player_type} and model {model}")
+    else:
+        print(f"Resuming game instance {game_id} from round {resumed_game_state.round_number + 1}")
+    
     
+    setup_client(args)
     
     # start a game clock
     start_time = time.time()
 
     # Construct a unique log file path
     
-    if args.logdir == "logs":
+    if resumed_game_state is not None:
+        # Resumed games keep logging next to their checkpoint
+        log_folder_path = os.path.dirname(resumed_game_state.checkpoint_path) or "."
+    elif args.logdir == "logs":
         log_folder_path = f"logs/game_logs_{game_log_run_number}"
     else:
         log_folder_path = f"{args.logdir}/game_logs_{game_log_run_number}"
+    
+    # A resumed game appends to its log
+    log_file_mode = "w" if resumed_game_state is None else "a"
         
-    # create a blank txt file for the log
-    log_file_path = f"{log_folder_path}/{game_id}.txt"
-    if not os.path.exists(log_file_path):
-        with open(log_file_path, "w") as f:
-            pass
-
-    # Open the log file in write mode
-    log_file = open(log_file_path, "w", buffering=1)
+    if args.log_format == "jsonl":
+        # Buffered JSON events, printed output included (see EventLog)
+        log_file_path = f"{log_folder_path}/{game_id}.jsonl"
+        log_file = EventLog(log_file_path, mode=log_file_mode)
+    else:
+        # create a blank txt file for the log
+        log_file_path = f"{log_folder_path}/{game_id}.txt"
+        if not os.path.exists(log_file_path):
+            with open(log_file_path, "w") as f:
+                pass
+
+        # Open the log file in write mode
+        log_file = open(log_file_path, log_file_mode, buffering=1)
     
-    # Redirect stdout so that any print statements go to this file
-    original_stdout = sys.stdout
-    sys.stdout = log_file
+    # Redirect stdout so that any print statements made by this game go to this file
+    if not isinstance(sys.stdout, GameOutputRouter):
+        sys.stdout = GameOutputRouter(sys.stdout)
+    log_file_token = current_game_log.set(log_file)
+    response_cache = None
+    game_state = resumed_game_state
+    assistant_registry = get_assistant_registry(log_folder_path)
+    get_rate_limiter(log_folder_path)
 
     try:
-        # --- Define players ---
-        if player_type == 1:
-            players = [
-                Player('Alice', 'Liberal', 'A Liberal'),
-                Player('Bob', 'Fascist', 'A Fascist'),
-                Player('Carol', 'Liberal', 'A Liberal'),
-                Player('Dave', 'Hitler', 'A Hitler'),
-                Player('Eve',  'Liberal', 'A Liberal'),
-            ]
-        elif player_type == 2:
-            players = [
-                Player('Alice', 'Liberal', 'An overly cautious Liberal, skeptical to trust anyone and ready to blame others if they seem at all against the liberal team, even if the evidence is weak. You are not easily swayed by others.'),
-                Player('Bob', 'Fascist', 'A cunning Fascist, who likes to stir the pot, cause chaos, and pin liberals against each other to secure victory for the Fascist team.'),
-                Player('Carol', 'Liberal', 'A level headed Liberal who likes to take the lead. You look at both sides of the argument, examine the evidence, and make what you see as the most logical decision.'),
-                Player('Dave', 'Hitler', 'A charismatic Hitler, who can blend in with the Liberals, use very persuasive arguments, and can sway the votes of the liberals to vote for him when the time is right.'),
-                Player('Eve',  'Liberal', 'An empathetic Liberal who tends to trust players and give the benefit of the doubt. You are reluctant to accuse anyone without clear evidence. You tend to follow what others are doing and are easily swayed.'),
-            ]
-        elif player_type == 3:
-            players = [
-                Player('Alice', 'Liberal', 
-           'A Liberal. You know Bob and Eve well and tend to think you can read them well. You like to joke around with Bob. You are confident and outspoken, often taking the lead in discussions. You value fairness and are quick to challenge anything you see as suspicious.'),
-                Player('Bob', 'Fascist', 
-           'A Fascist. You know Alice and think you can use the inherent trust you share to win the game. You suspect Eve does not like you, but you are not certain. You aim to win her over by being kind and agreeable. You are strategic and persuasive, preferring to subtly guide the group rather than dominate the conversation.'),
-                Player('Carol', 'Liberal', 
-           'A Liberal. You do not know any of the other players, which makes it difficult to tell if someone is lying. You are reserved and observant, preferring to listen and gather information before speaking. You often analyze the group dynamics and try to piece together the truth silently.'),
-                Player('Dave', 'Hitler', 
-           'Hitler. You are friends with Eve, and you use your close relationship to gain her trust. You also know that Eve is friends with Alice, so you plan to have Eve advocate for you to Alice. You are charismatic and calculated, rarely speaking out of turn but carefully choosing your words to build trust. You also tend to be overly competitive and look down on players if you think they are not making the best choice, especially players on your team.'),
-                Player('Eve', 'Liberal', 
-           'A Liberal. You know Alice and Dave well and tend to trust them more. You inherently distrust Bob because you find him arrogant, but you’re willing to change your mind if he is nicer. You are empathetic and collaborative, often trying to mediate conflicts and keep the group focused. You prefer harmony over confrontation but are not afraid to voice your opinions when necessary.')
-]
-        else: 
-            players = [
-                Player('Alice', 'Liberal', 'A Liberal'),
-                Player('Bob', 'Fascist', 'A Fascist'),
-                Player('Carol', 'Liberal', 'A Liberal'),
-                Player('Dave', 'Hitler', 'A Hitler'),
-                Player('Eve',  'Liberal', 'A Liberal'),
-            ]
-            
-        random.shuffle(players)
-
-        # Identify roles
-        for player in players:
-            if player.role == 'Hitler':
-                hitler = player
-            elif player.role == 'Fascist':
-                fascist = player
-            elif player.role == 'Liberal':
-                if 'liberal1' not in locals():
-                    liberal1 = player.name
-                elif 'liberal2' not in locals():
-                    liberal2 = player
-                else:
-                    liberal3 = player
-
-        # Create assistants for each role
-        for player in players:
-            if player.role == 'Hitler':
-                create_assistant_for_player(player, fascist)
-            elif player.role == 'Fascist':
-                create_assistant_for_player(player, hitler)
-            elif player.role == 'Liberal':
-                create_assistant_for_player(player)
-
-        # Initialize Game State
-        game_state = GameState(players)
-
-        # Store instruction in log_messages_by_player
-        for player in game_state.players:
-            game_state.log_messages_by_player[player.name].append(player.instructions)
+        response_cache = open_response_cache(args, game_id)
+        if resumed_game_state is None:
+            game_state = await new_game(game_id, game_log_run_number, player_type, model, response_cache, assistant_registry)
+            game_state.checkpoint_path = f"{log_folder_path}/{game_id}.checkpoint.pkl"
+        else:
+            game_state = resumed_game_state
+            game_state.response_cache = response_cache
+            apply_budget_args(game_state, args)
+            assistant_registry.claim_threads([player.thread_id for player in game_state.players if player.thread_id])
+            await rollback_to_checkpoint(game_state)
+        game_state.cost_ledger_path = f"{log_folder_path}/costs.json"
+        game_state.batch_folder_path = f"{log_folder_path}/batches"
+        if resumed_game_state is not None:
+            resume_reflection_batches(game_state)
+        
+        if isinstance(log_file, EventLog):
+            game_state.event_log = log_file
+            if resumed_game_state is None:
+                log_event(game_state, "game_start", game_id=game_id, player_type=player_type, model=model,
+                          roles={player.name: player.role for player in game_state.players})
+                for player in game_state.players:
+                    log_event(game_state, "instructions", player=player.name, text=player.instructions)
+            else:
+                log_event(game_state, "resume", checkpoint_phase=game_state.checkpoint_phase)
 
 
         # --- Start the game ---
-        play_game(game_state)
+        await play_game(game_state)
 
         # Print token usage stats to this run's log
         print(f"Total input tokens used: {game_state.total_input_tokens_used}")
+        print(f"  - Cached input tokens: {game_state.total_cached_input_tokens_used}")
+        print(f"  - Uncached input tokens: {game_state.total_input_tokens_used - game_state.total_cached_input_tokens_used}")
         print(f"Total output tokens used: {game_state.total_output_tokens_used}")
         print(f"Total tokens used: {game_state.total_tokens_used}")
+        print(f"Total cost: ${game_state.total_cost:.4f}")
+        if game_state.batch_savings:
+            print(f"Saved by sending reflections as batch jobs: ${game_state.batch_savings:.4f}")
+        if game_state.hedge_waste_estimate:
+            print(f"Estimated cost of hedged requests cancelled in flight (not in the total): ${game_state.hedge_waste_estimate:.4f}")
         
         # end game clock
         end_time = time.time()
@@ -3011,48 +5396,197 @@ def run_game_instance(game_id, game_log_run_number, player_type):
         # get average time per run
         average_time_per_run = sum(game_state.time_per_run) / len(game_state.time_per_run)
         print(f"Average time per run: {average_time_per_run:.2f} seconds")
+        
+        write_call_metrics(game_state, log_folder_path)
+        
+        # The game finished, so there is nothing left to resume
+        if os.path.exists(game_state.checkpoint_path):
+            os.remove(game_state.checkpoint_path)
+        
+        log_event(game_state, "game_end", winning_team=game_state.winning_team,
+                  liberal_policies=game_state.liberal_policies, fascist_policies=game_state.fascist_policies,
+                  input_tokens=game_state.total_input_tokens_used, cached_input_tokens=game_state.total_cached_input_tokens_used,
+                  output_tokens=game_state.total_output_tokens_used, total_tokens=game_state.total_tokens_used,
+                  cost=round(game_state.total_cost, 6), batch_savings=round(game_state.batch_savings, 6),
+                  hedge_waste_estimate=round(game_state.hedge_waste_estimate, 6), time_taken=time_taken, average_time_per_run=average_time_per_run)
+        
+        return game_state
 
+    except BudgetExceeded as e:
+        # Stop cleanly, the game can continue from its last checkpoint with a larger budget
+        print(f"\n--- Budget Exceeded ---\n{e}. Stopping {game_id} after ${game_state.total_cost:.4f} and {game_state.total_tokens_used} tokens.")
+        log_event(game_state, "budget_stop", reason=str(e), cost=round(game_state.total_cost, 6), total_tokens=game_state.total_tokens_used)
+        print(f"Continue the game from its last checkpoint ({game_state.checkpoint_phase}) with a larger budget: python secret_hitler.py --resume {game_state.checkpoint_path}")
+    
     except Exception as e:
         # If an exception occurs, log the traceback
         print("\n--- Exception Occurred ---")
-        print_log_messages(game_state.log_messages_by_player, game_state)
+        # The game state does not exist when the game failed while being set up
+        if game_state is not None:
+            print_log_messages(game_state.log_messages_by_player, game_state)
         traceback.print_exc(file=log_file)  # Print full traceback into the log file
         print(f"An error occurred in {game_id}. See the log file for traceback.")
+        if game_state is not None and game_state.checkpoint_path and os.path.exists(game_state.checkpoint_path):
+            print(f"Continue the game from its last checkpoint with: python secret_hitler.py --resume {game_state.checkpoint_path}")
         
     finally:
-        # Restore stdout so future prints go to the console
-        sys.stdout = original_stdout
+        if game_state is not None:
+            discard_reflection_batches(game_state)
+        # Delete the game's threads, unless it can be resumed
+        if game_state is not None:
+            await release_game_threads(game_state, assistant_registry)
+        
+        # Restore stdout so future prints from this task go to the console
+        current_game_log.reset(log_file_token)
         # Close the log file
         log_file.close()
+        if response_cache is not None:
+            response_cache.close()
+        
+        if isinstance(log_file, EventLog) and args.text_log:
+            render_text_log(log_file_path)
 
 
-def main():
+async def resume_games(checkpoint_paths):
+    """
+    Continues every given game from its checkpoint concurrently on one event loop.
+    Returns the final game states, None for the games that failed (see run_game).
+    """
+    resumed_games = [load_checkpoint(checkpoint_path) for checkpoint_path in checkpoint_paths]
+    return await asyncio.gather(*(
+        run_game(game_state.game_id, game_state.game_log_run_number, game_state.player_type, game_state.model, game_state)
+        for game_state in resumed_games
+    ))
+
+
+def run_game_instance(game_id, game_log_run_number, player_type, model = None):
+    """
+    Runs a single instance of the game on its own event loop (see run_game).
+    """
+    asyncio.run(run_game(game_id, game_log_run_number, player_type, model))
+
+
+async def run_queued_games(game_queue, done_queue, game_log_run_number, games_per_process):
     """
-    Main function that spawns multiple runs in parallel.
-    Adjust game_ids and max_workers to your needs.
+    Runs games_per_process tasks on one event loop. Each task takes the next game from the
+    shared queue, plays it and reports it as done, until the queue is empty.
     """
+    async def worker_task():
+        while True:
+            try:
+                game = game_queue.get_nowait()
+            except queue.Empty:
+                return
+            await run_game(game["game_id"], game_log_run_number, game["player_type"], game["model"])
+            done_queue.put(game["game_id"])
     
-    print("Starting game...")
+    await asyncio.gather(*(worker_task() for _ in range(games_per_process)))
+
+
+def run_worker(game_queue, done_queue, game_log_run_number, games_per_process):
+    """
+    Entry point of a worker process (see run_queued_games).
+    """
+    asyncio.run(run_queued_games(game_queue, done_queue, game_log_run_number, games_per_process))
+
+
+def build_game_list(args):
+    """
+    Lists the games to run as dictionaries with game_id, player_type and model,
+    either from the --campaign file or as --games games with the command line settings.
+    """
+    if args.campaign:
+        with open(args.campaign) as f:
+            groups = json.load(f)
+    else:
+        groups = [{"games": args.games}]
+    
+    games = []
+    for group in groups:
+        for _ in range(group.get("games", 1)):
+            games.append({
+                "game_id": f"game_{len(games) + 1}",
+                "player_type": group.get("player_type", args.player_type),
+                "model": group.get("model", args.model)
+            })
+    return games
+
+
+def run_scheduler(games, game_log_run_number, num_workers, games_per_process, status_interval):
+    """
+    Runs the games over a fixed pool of worker processes, each running games_per_process
+    games at a time, and prints the queue depth every status_interval seconds.
+    """
+    with multiprocessing.Manager() as manager:
+        game_queue = manager.Queue()
+        done_queue = manager.Queue()
+        for game in games:
+            game_queue.put(game)
+        
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(run_worker, game_queue, done_queue, game_log_run_number, games_per_process) for _ in range(num_workers)]
+            
+            completed = 0
+            last_status_time = time.time()
+            while completed < len(games) and not all(future.done() for future in futures):
+                try:
+                    done_queue.get(timeout=1)
+                    completed += 1
+                except queue.Empty:
+                    pass
+                
+                if time.time() - last_status_time >= status_interval:
+                    waiting = game_queue.qsize()
+                    print(f"Queue depth: {waiting} waiting, {len(games) - completed - waiting} running, {completed}/{len(games)} completed")
+                    last_status_time = time.time()
+            
+            # Surface errors from workers that crashed outside of a game
+            for future in futures:
+                future.result()
+
+
+def main():
+    """
+    Main function that runs all games over a pool of worker processes.
+    Adjust --games (or --campaign), --workers and --games_per_process to your needs.
+    """
     
     args = parse_args()
     
+    if args.render_log:
+        print(f"Text log written to {render_text_log(args.render_log)}")
+        return
     
-    # If you want to run a single game, keep num_games = 1
-    num_games = args.games 
-    game_log_run_number = args.run_number
-    game_log_run_number = f"run_{game_log_run_number}"
+    if args.sweep:
+        setup_client(args)
+        asyncio.run(sweep_assistants(args.sweep))
+        return
     
-
+    if args.resume:
+        print(f"Resuming {len(args.resume)} games...")
+        results = asyncio.run(resume_games(args.resume))
+        failed = [path for path, result in zip(args.resume, results) if result is None]
+        asyncio.run(sweep_assistants(sorted({os.path.dirname(path) or "." for path in args.resume})))
+        if failed:
+            print(f"{len(failed)} of {len(args.resume)} resumed games did not finish (see their logs):")
+            for path in failed:
+                print(f"- {path}")
+            sys.exit(1)
+        print("All games completed!")
+        return
+    
+    print("Starting game...")
     
-    player_type = args.player_type # 1 = default, 2 = personalities, 3 = relationships
     
-    run_game_with_folder = partial(run_game_instance, 
-                                 game_log_run_number=game_log_run_number,
-                                 player_type=player_type)
-
-    game_ids = [f"game_{i}" for i in range(1, num_games+1)]
+    game_log_run_number = args.run_number
+    game_log_run_number = f"run_{game_log_run_number}"
     
-    num_workers = num_games 
+    games = build_game_list(args)
+    num_games = len(games)
+    
+    games_per_process = max(1, args.games_per_process)
+    # More workers than it takes to start every game at once would sit idle
+    num_workers = min(args.workers if args.workers > 0 else os.cpu_count() or 1, -(-num_games // games_per_process))
     
     if args.logdir == "logs":
         log_folder_path = f"logs/game_logs_{game_log_run_number}"
@@ -3061,11 +5595,18 @@ def main():
         
     if not os.path.exists(log_folder_path):
         os.makedirs(log_folder_path)
+    
+    # Record which model and player type each game used
+    with open(f"{log_folder_path}/games.json", "w") as f:
+        json.dump(games, f, indent=2)
 
-    with ProcessPoolExecutor(max_workers=num_workers) as executor:
-        print(f"Running {num_games} games with {num_workers} workers")
-        results = list(executor.map(run_game_with_folder, game_ids))
-        print("All games completed!")
+    print(f"Running {num_games} games with {num_workers} workers, {games_per_process} games per worker at a time")
+    run_scheduler(games, game_log_run_number, num_workers, games_per_process, args.status_interval)
+    print("All games completed!")
+    
+    # The run's assistants are no longer needed (threads of games that can be resumed are kept)
+    setup_client(args)
+    asyncio.run(sweep_assistants([log_folder_path]))
 
 
 if __name__ == "__main__":
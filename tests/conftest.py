@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+import secret_hitler
+
+
+@pytest.fixture
+def mock_args(tmp_path, monkeypatch):
+    """
+    Returns a function that points secret_hitler's command line at an offline mock run logging to
+    tmp_path (plus any extra arguments) and resets the process's clients, so each call starts fresh.
+    Games run with run_game log to tmp_path/game_logs_test.
+    """
+    os.makedirs(tmp_path / "game_logs_test", exist_ok=True)
+    # run_game routes stdout to the game's log, pytest gets its own back afterwards
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+
+    def configure(*extra_args):
+        monkeypatch.setattr(sys, "argv", [
+            "secret_hitler.py", "--mock",
+            "--backend", "chat",
+            "--seed", "1",
+            "--logdir", str(tmp_path),
+            "--rate_limit_file", str(tmp_path / "rate_limit.json"),
+            *extra_args,
+        ])
+        monkeypatch.setattr(secret_hitler, "client", None)
+        monkeypatch.setattr(secret_hitler, "rate_limiter", None)
+        monkeypatch.setattr(secret_hitler, "retry_policy", None)
+        monkeypatch.setattr(secret_hitler, "latency_tracker", None)
+        monkeypatch.setattr(secret_hitler, "assistant_registries", {})
+
+    return configure
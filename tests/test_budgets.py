@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+import secret_hitler
+from secret_hitler import BudgetExceeded
+
+
+def make_game(**budgets):
+    players = [secret_hitler.Player(name, "Liberal", "") for name in ("Alice", "Bob", "Carol", "Dave", "Eve")]
+    game_state = secret_hitler.GameState(players, random.Random(0))
+    game_state.game_id = "game_1"
+    game_state.model = "gpt-4o"
+    for name, value in budgets.items():
+        setattr(game_state, name, value)
+    return game_state
+
+
+def test_enforce_budgets_degrades_then_stops():
+    game_state = make_game(max_cost_per_game=1.0)
+    secret_hitler.enforce_budgets(game_state, 0.5)
+    assert not game_state.budget_degraded
+
+    secret_hitler.enforce_budgets(game_state, 0.35)
+    assert game_state.budget_degraded
+    assert game_state.model == "gpt-4o-mini"
+
+    with pytest.raises(BudgetExceeded):
+        secret_hitler.enforce_budgets(game_state, 0.2)
+    assert game_state.total_cost == pytest.approx(1.05)
+
+
+def test_enforce_budgets_checks_tokens():
+    game_state = make_game(max_tokens_per_game=1000)
+    game_state.total_tokens_used = 999
+    secret_hitler.enforce_budgets(game_state, 0.0)
+    game_state.total_tokens_used = 1000
+    with pytest.raises(BudgetExceeded):
+        secret_hitler.enforce_budgets(game_state, 0.0)
+
+
+def test_run_budget_counts_every_game_of_the_run(tmp_path):
+    ledger_path = str(tmp_path / "costs.json")
+    first, second = make_game(max_cost_per_run=1.0), make_game(max_cost_per_run=1.0)
+    second.game_id = "game_2"
+    first.cost_ledger_path = second.cost_ledger_path = ledger_path
+
+    secret_hitler.enforce_budgets(first, 0.6)
+    with pytest.raises(BudgetExceeded):
+        secret_hitler.enforce_budgets(second, 0.5)
+    assert secret_hitler.read_run_cost(ledger_path) == pytest.approx(1.1)
+
+
+def test_reserve_budget_counts_the_calls_in_flight():
+    game_state = make_game(max_cost_per_game=0.1)
+    # $0.013 per call on gpt-4o with 4000 prompt tokens and the reply allowance
+    reservations = [secret_hitler.reserve_budget(game_state, 4000) for _ in range(7)]
+    with pytest.raises(BudgetExceeded):
+        secret_hitler.reserve_budget(game_state, 4000)
+    assert game_state.total_cost == 0
+
+    for reservation in reservations:
+        secret_hitler.release_budget(game_state, reservation)
+    assert game_state.reserved_cost == pytest.approx(0)
+    assert game_state.reserved_tokens == 0
+    secret_hitler.reserve_budget(game_state, 4000)
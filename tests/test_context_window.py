@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+import secret_hitler
+
+
+def make_game(rounds, message_length=2000):
+    player = secret_hitler.Player("Alice", "Liberal", "")
+    player.instructions = "You are playing a game of 5 player Secret Hitler."
+    game_state = secret_hitler.GameState([player], random.Random(0))
+    for round_number in range(1, rounds + 1):
+        game_state.round_number = round_number
+        for _ in range(3):
+            secret_hitler.record_exchange(player, game_state, {
+                "user_message": f"Round {round_number} prompt. " + "x" * message_length,
+                "assistant_message": '{"decision": "na"}',
+            })
+    return player, game_state
+
+
+def test_small_conversations_are_sent_whole():
+    player, game_state = make_game(2)
+    window = secret_hitler.build_context_window(player, game_state, "What do you do?")
+    assert (window.summary, window.first_index) == (None, 0)
+    assert window.prompt_tokens == window.full_tokens
+
+
+def test_window_fits_the_budget_and_predicts_the_request():
+    player, game_state = make_game(6)
+    game_state.context_token_budget = 3000
+    content = "What do you do?"
+
+    window = secret_hitler.build_context_window(player, game_state, content)
+    assert window.full_tokens > 3000
+    assert window.prompt_tokens <= 3000
+    assert window.summary is not None
+    assert window.first_index == player.round_start_index[6]
+
+    messages = secret_hitler.build_chat_messages(player, game_state, content, window)
+    assert secret_hitler.estimate_messages_tokens(messages) == window.prompt_tokens
+    assert messages[-1] == {"role": "user", "content": content}
+
+    params = secret_hitler.build_run_context_params(player, game_state, window)
+    assert params["truncation_strategy"]["last_messages"] == len(player.conversation) - window.first_index + 1
+    assert params["additional_instructions"] == window.summary
+
+
+def test_check_context_size_records_the_trim_once():
+    player, game_state = make_game(6)
+    game_state.context_token_budget = 3000
+    metrics = secret_hitler.new_call_metrics()
+
+    window = secret_hitler.check_context_size(player, game_state, "What do you do?", metrics)
+    assert metrics["predicted_prompt_tokens"] == window.prompt_tokens
+    assert metrics["context_trims"] == 1
+    assert player.context_trim_index == window.first_index
+
+    metrics = secret_hitler.new_call_metrics()
+    secret_hitler.check_context_size(player, game_state, "What do you do?", metrics)
+    assert metrics["context_trims"] == 0
+
+
+def test_oldest_exchanges_of_the_current_round_are_dropped_to_fit():
+    player, game_state = make_game(1, message_length=4000)
+    game_state.context_token_budget = 2000
+
+    window = secret_hitler.build_context_window(player, game_state, "What do you do?")
+    assert window.prompt_tokens <= 2000
+    assert window.first_index == 4
+    assert "earliest messages of this round were removed" in window.summary
+
+
+def test_prompt_over_the_model_context_window_is_not_sent():
+    player, game_state = make_game(1)
+    content = "x" * 4 * secret_hitler.MODEL_CONTEXT_WINDOWS[game_state.model]
+
+    with pytest.raises(secret_hitler.NonRetryableError, match="context window"):
+        secret_hitler.check_context_size(player, game_state, content, secret_hitler.new_call_metrics())
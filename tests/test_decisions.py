@@ -0,0 +1,97 @@
+import json
+import random
+
+import pytest
+
+import secret_hitler
+
+
+def make_game():
+    players = [secret_hitler.Player(name, role, "") for name, role in
+               (("Alice", "Liberal"), ("Bob", "Fascist"), ("Carol", "Liberal"), ("Dave", "Hitler"), ("Eve", "Liberal"))]
+    game_state = secret_hitler.GameState(players, random.Random(0))
+    game_state.current_president = players[0]
+    game_state.current_chancellor = players[1]
+    return game_state
+
+
+def player(game_state, name):
+    return next(p for p in game_state.players if p.name == name)
+
+
+def reply(decision):
+    return json.dumps({"internal_dialogue": "", "external_dialogue": "I decided.", "decision": decision})
+
+
+def test_fixed_choices():
+    game_state = make_game()
+    assert secret_hitler.decision_choices(player(game_state, "Carol"), game_state, 'vote') == ["Ja", "Nein"]
+    assert secret_hitler.decision_choices(player(game_state, "Alice"), game_state, 'chancellor_veto') == ["Agree", "Disagree"]
+    assert secret_hitler.decision_choices(player(game_state, "Carol"), game_state, 'discussion_post_game') == secret_hitler.NO_DECISION
+
+
+def test_nominees_exclude_the_president_the_last_chancellor_and_the_dead():
+    game_state = make_game()
+    player(game_state, "Carol").last_chancellor = True
+    player(game_state, "Eve").is_alive = False
+    player(game_state, "Bob").last_president = True
+    assert secret_hitler.decision_choices(player(game_state, "Alice"), game_state, 'nominate') == ["Bob", "Dave"]
+
+
+def test_removal_targets_are_the_living_players_but_the_president():
+    game_state = make_game()
+    player(game_state, "Eve").is_alive = False
+    assert secret_hitler.decision_choices(player(game_state, "Alice"), game_state, 'remove_a_player_one') == ["Bob", "Carol", "Dave"]
+
+
+def test_policy_choices_list_each_policy_once_and_veto_for_the_chancellor():
+    game_state = make_game()
+    game_state.current_policies = ['Fascist', 'Liberal', 'Fascist']
+    assert secret_hitler.decision_choices(player(game_state, "Alice"), game_state, 'policy') == ['Fascist', 'Liberal']
+
+    game_state.current_policies = ['Fascist', 'Fascist']
+    assert secret_hitler.decision_choices(player(game_state, "Alice"), game_state, 'policy_with_veto') == ['Fascist']
+    assert secret_hitler.decision_choices(player(game_state, "Bob"), game_state, 'policy_with_veto') == ['Fascist', 'Veto']
+
+
+@pytest.mark.parametrize("decision, expected", [
+    ("Ja", "Ja"),
+    ("ja", "Ja"),
+    (" 'NEIN'. ", "Nein"),
+])
+def test_parse_decision_matches_legal_choices(decision, expected):
+    game_state = make_game()
+    parsed = secret_hitler.parse_decision(player(game_state, "Carol"), game_state, 'vote', reply(decision))
+    assert parsed.choice == expected
+    assert parsed.valid
+    assert parsed.external_dialogue == "I decided."
+
+
+def test_parse_decision_replaces_an_illegal_choice():
+    game_state = make_game()
+    player(game_state, "Carol").last_chancellor = True
+    parsed = secret_hitler.parse_decision(player(game_state, "Alice"), game_state, 'nominate', reply("Carol"))
+    assert not parsed.valid
+    assert parsed.choice in ["Bob", "Dave", "Eve"]
+
+
+def test_talking_keeps_the_reply_decision():
+    game_state = make_game()
+    parsed = secret_hitler.parse_decision(player(game_state, "Carol"), game_state, 'discussion_post_game', reply("na"))
+    assert (parsed.choice, parsed.valid) == ("na", True)
+
+
+def test_memory_uses_the_parsed_choice():
+    game_state = make_game()
+    game_state.round_number = 1
+    alice, bob = player(game_state, "Alice"), player(game_state, "Bob")
+    for p in (alice, bob):
+        secret_hitler.initialize_round_memory(p, 1)
+
+    # "Disagree" contains "agree", but the president did not accept the veto
+    secret_hitler.update_memory(alice, game_state, 'chancellor_veto', json.loads(reply("Disagree")), "Disagree")
+    assert not any("accepted the veto" in d for d in alice.memory["rounds"][1]["decisions"])
+
+    game_state.current_policies = ['Fascist', 'Liberal']
+    secret_hitler.update_memory(bob, game_state, 'policy_with_veto', json.loads(reply("Veto")), "Veto")
+    assert bob.memory["rounds"][1]["decisions"][-1].startswith("Your decision when you vetoed")
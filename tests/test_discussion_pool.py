@@ -0,0 +1,72 @@
+import random
+
+import secret_hitler
+from secret_hitler import DiscussionPool
+
+
+def make_player():
+    player = secret_hitler.Player("Alice", "Liberal", "")
+    player.conversation = [{"role": "user", "content": "Earlier prompt"}, {"role": "assistant", "content": "{}"}]
+    return player
+
+
+def show(player, pool):
+    """
+    Sends the player's pool text as a prompt and records the exchange in the player's conversation.
+    """
+    text = pool.for_player(player)
+    player.conversation += [{"role": "user", "content": text}, {"role": "assistant", "content": "{}"}]
+    return text
+
+
+def test_only_new_statements_are_sent_again():
+    player = make_player()
+    pool = DiscussionPool() + "Bob said: Ja.\n\n"
+    assert show(player, pool) == "Bob said: Ja.\n\n"
+
+    assert "Nothing new was said" in show(player, pool)
+
+    pool = pool + "Carol said: Nein.\n\n"
+    text = show(player, pool)
+    assert "already shown to you" in text
+    assert text.endswith("Carol said: Nein.\n\n")
+    assert "Bob said" not in text
+
+
+def test_statements_compacted_by_a_trim_are_sent_again():
+    player = make_player()
+    pool = DiscussionPool() + "Bob said: Ja.\n\n"
+    show(player, pool)
+
+    # A trim compacted the prompt that showed Bob's statement into the summary
+    player.context_trim_index = len(player.conversation)
+    pool = pool + "Carol said: Nein.\n\n"
+    assert show(player, pool) == "Bob said: Ja.\n\nCarol said: Nein.\n\n"
+
+    # The pool was just shown in full after the trim, so it can be referred back to again
+    pool = pool + "Dave said: Ja.\n\n"
+    text = show(player, pool)
+    assert "already shown to you" in text
+    assert text.endswith("Dave said: Ja.\n\n")
+
+
+def test_statements_compacted_by_context_rounds_are_sent_again():
+    player = make_player()
+    player.instructions = "Play the game."
+    game_state = secret_hitler.GameState([player], random.Random(0))
+    game_state.context_rounds = 1
+    game_state.context_limit = 0
+    game_state.round_number = 2
+    player.round_start_index = {1: 0}
+
+    pool = DiscussionPool() + "Bob said: Ja.\n\n"
+    text = pool.for_player(player)
+    secret_hitler.record_exchange(player, game_state, {"user_message": text, "assistant_message": "{}"})
+
+    # The next round leaves round 2, which showed Bob's statement, to the summary
+    game_state.round_number = 3
+    secret_hitler.check_context_size(player, game_state, "Vote.", secret_hitler.new_call_metrics())
+    assert player.context_trim_index == len(player.conversation)
+
+    pool = pool + "Carol said: Nein.\n\n"
+    assert pool.for_player(player) == "Bob said: Ja.\n\nCarol said: Nein.\n\n"
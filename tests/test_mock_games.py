@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import shutil
+
+import mock_backend
+import secret_hitler
+
+
+def read_events(path, event_type):
+    with open(path) as f:
+        return [event for event in map(json.loads, f) if event["event"] == event_type]
+
+
+def game_summary(game_state):
+    return (game_state.winning_team, game_state.liberal_policies, game_state.fascist_policies,
+            game_state.enacted_policies, game_state.round_number)
+
+
+def test_replay_reproduces_the_recorded_game(mock_args, tmp_path):
+    log_path = tmp_path / "game_logs_test" / "game_1.jsonl"
+
+    mock_args("--record", str(tmp_path / "recording"))
+    recorded = asyncio.run(secret_hitler.run_game("game_1", "test", 1))
+    assert recorded is not None
+    recorded_exchanges = [(e["player"], e["action_type"], e["user_message"], e["response"]) for e in read_events(log_path, "exchange")]
+
+    mock_args("--replay", str(tmp_path / "recording"))
+    replayed = asyncio.run(secret_hitler.run_game("game_1", "test", 1))
+    assert replayed is not None
+    replayed_exchanges = [(e["player"], e["action_type"], e["user_message"], e["response"]) for e in read_events(log_path, "exchange")]
+
+    assert replayed_exchanges == recorded_exchanges
+    assert game_summary(replayed) == game_summary(recorded)
+    assert replayed.total_tokens_used == recorded.total_tokens_used
+    assert replayed.total_cost == recorded.total_cost
+
+
+def test_resumed_game_plays_out_like_the_uninterrupted_one(mock_args, tmp_path, monkeypatch):
+    # Keep a copy of the checkpoint taken at the start of round 4
+    resume_folder = tmp_path / "resume"
+    os.makedirs(resume_folder)
+    save_checkpoint = secret_hitler.save_checkpoint
+
+    def save_and_copy(game_state, phase):
+        save_checkpoint(game_state, phase)
+        if phase == "round" and game_state.round_number == 3:
+            shutil.copy(game_state.checkpoint_path, resume_folder / "game_1.checkpoint.pkl")
+
+    monkeypatch.setattr(secret_hitler, "save_checkpoint", save_and_copy)
+
+    mock_args()
+    finished = asyncio.run(secret_hitler.run_game("game_1", "test", 1))
+    assert finished is not None
+    assert not os.path.exists(finished.checkpoint_path)
+
+    monkeypatch.setattr(secret_hitler, "save_checkpoint", save_checkpoint)
+    mock_args("--resume", str(resume_folder / "game_1.checkpoint.pkl"))
+    game_state = secret_hitler.load_checkpoint(str(resume_folder / "game_1.checkpoint.pkl"))
+    assert (game_state.round_number, game_state.checkpoint_phase) == (3, "round")
+    resumed = asyncio.run(secret_hitler.run_game("game_1", "test", 1, resumed_game_state=game_state))
+
+    assert resumed is not None
+    assert game_summary(resumed) == game_summary(finished)
+    assert not os.path.exists(resume_folder / "game_1.checkpoint.pkl")
+    assert read_events(resume_folder / "game_1.jsonl", "resume")
+    assert read_events(resume_folder / "game_1.jsonl", "game_end")
+
+
+def test_lists_are_paginated_like_the_sdk():
+    client = mock_backend.MockAsyncOpenAI()
+
+    async def check():
+        thread = await client.beta.threads.create()
+        for i in range(25):
+            await client.beta.threads.messages.create(thread.id, f"message {i}")
+
+        page = await client.beta.threads.messages.list(thread_id=thread.id, order="asc")
+        assert len(page.data) == 20 and page.has_more
+        everything = [message async for message in client.beta.threads.messages.list(thread_id=thread.id, order="asc")]
+        assert len(everything) == 25
+
+        after = await client.beta.threads.messages.list(thread_id=thread.id, order="asc", after=everything[21].id)
+        assert [m.content[0].text.value for m in after.data] == ["message 22", "message 23", "message 24"]
+        assert not after.has_more
+
+        newest = await client.beta.threads.messages.list(thread_id=thread.id, limit=1)
+        assert newest.data[0].id == everything[-1].id
+
+    asyncio.run(check())
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import pickle
+import random
+
+import secret_hitler
+
+REFLECTION = "reflection_post_policy_enactment"
+
+
+def make_game():
+    players = [secret_hitler.Player(name, "Liberal", "") for name in ("Alice", "Bob")]
+    game_state = secret_hitler.GameState(players, random.Random(0))
+    game_state.game_id = "game_1"
+    game_state.backend = "chat"
+    game_state.reflection_batch_mode = "local"
+    game_state.round_number = 2
+    game_state.current_president, game_state.current_chancellor = players
+    for round_number in (2, 3):
+        secret_hitler.initialize_round_log(game_state, round_number)
+    for player in players:
+        player.instructions = "Play the game."
+        for round_number in (2, 3):
+            secret_hitler.initialize_round_memory(player, round_number)
+    return game_state
+
+
+def batch_result(custom_id):
+    reply = {"internal_dialogue": "Hm.", "external_dialogue": "na", "decision": "na", "trust": {}}
+    return {"custom_id": custom_id, "response": {"status_code": 200, "body": {
+        "choices": [{"finish_reason": "stop", "message": {"role": "assistant", "content": json.dumps(reply)}}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+    }}}
+
+
+def test_decisions_do_not_wait_for_a_running_batch(monkeypatch):
+    async def scenario():
+        job_ended = asyncio.Event()
+
+        async def run(batch, batch_folder_path):
+            await job_ended.wait()
+            return {custom_id: batch_result(custom_id) for custom_id in batch.prompts}
+
+        monkeypatch.setattr(secret_hitler.ReflectionBatch, "run", run)
+        game_state = make_game()
+        alice, bob = game_state.players
+        prompts = {f"game_1-2-{REFLECTION}-{player.name}": (player, "Reflect.") for player in game_state.players}
+        game_state.reflection_batches.append(secret_hitler.ReflectionBatch(game_state, REFLECTION, prompts))
+
+        # The game goes on into round 3 while the job runs
+        game_state.round_number = 3
+        secret_hitler.record_exchange(alice, game_state, {"user_message": "Vote.", "assistant_message": "{}"})
+        await asyncio.wait_for(secret_hitler.merge_reflection_batches(game_state, alice), timeout=1)
+        assert len(alice.conversation) == 2
+
+        # A running batch is kept in the checkpoint without its task
+        restored = pickle.loads(pickle.dumps(game_state))
+        assert restored.reflection_batches[0].task is None
+        assert restored.reflection_batches[0].unmerged == set(prompts)
+
+        job_ended.set()
+        await asyncio.sleep(0)
+        await secret_hitler.merge_reflection_batches(game_state, alice)
+        assert len(alice.conversation) == 4
+        assert alice.round_start_index == {3: 0}
+        assert bob.conversation == []
+        assert game_state.reflection_batches[0].unmerged == {f"game_1-2-{REFLECTION}-Bob"}
+
+        # Bob has no message in round 3 yet, so his reflection starts round 2
+        await secret_hitler.merge_reflection_batches(game_state, bob)
+        assert bob.round_start_index == {2: 0}
+        assert game_state.reflection_batches == []
+        assert alice.memory["rounds"][2]["internal_dialogues"]
+        assert alice.memory["rounds"][3]["internal_dialogues"] == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,51 @@
+import sys
+
+import httpx
+import pytest
+from openai import APIConnectionError, APIStatusError, APITimeoutError, BadRequestError, RateLimitError
+
+import secret_hitler
+from secret_hitler import RetryPolicy
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status_code, message="Error", error_class=APIStatusError):
+    return error_class(message, response=httpx.Response(status_code, request=REQUEST), body=None)
+
+
+@pytest.mark.parametrize("error, kind", [
+    (status_error(429, error_class=RateLimitError), "rate_limit"),
+    (status_error(429), "rate_limit"),
+    (APITimeoutError(request=REQUEST), "retryable"),
+    (APIConnectionError(request=REQUEST), "retryable"),
+    (status_error(408), "retryable"),
+    (status_error(409), "retryable"),
+    (status_error(500), "retryable"),
+    (status_error(503), "retryable"),
+    (status_error(400, "Thread thread_1 already has an active run run_1.", BadRequestError), "retryable"),
+    (status_error(400, "Invalid schema", BadRequestError), "fatal"),
+    (status_error(401), "fatal"),
+    (status_error(404), "fatal"),
+    (secret_hitler.NonRetryableError("Run failed: invalid prompt"), "fatal"),
+    (Exception("No reply in the thread"), "retryable"),
+])
+def test_classify(error, kind):
+    assert RetryPolicy(1, 30).classify(error) == kind
+
+
+def test_backoff_is_capped_and_honours_retry_after():
+    policy = RetryPolicy(1, 30)
+    assert all(0 <= policy.backoff_delay(attempt) <= 30 for attempt in range(12))
+    error = APIStatusError("Error", response=httpx.Response(503, request=REQUEST, headers={"retry-after": "4"}), body=None)
+    assert policy.backoff_delay(0, error) == 4
+
+
+def test_rate_limiter_only_with_a_limit(monkeypatch, tmp_path):
+    monkeypatch.setattr(sys, "argv", ["secret_hitler.py"])
+    monkeypatch.setattr(secret_hitler, "rate_limiter", None)
+    assert secret_hitler.get_rate_limiter(str(tmp_path)) is None
+
+    monkeypatch.setattr(sys, "argv", ["secret_hitler.py", "--rpm_limit", "60"])
+    monkeypatch.setattr(secret_hitler, "rate_limiter", None)
+    assert secret_hitler.get_rate_limiter(str(tmp_path)).state_file == f"{tmp_path}/rate_limit.json"
@@ -0,0 +1,167 @@
+import random
+
+import pytest
+
+import rules_engine
+import secret_hitler
+from rules_engine import PlayerState, RuleError, RulesState
+
+
+def make_state(**changes):
+    """
+    A game in its first round: Alice is president, nobody has been elected yet.
+    """
+    state = RulesState(
+        players=tuple(PlayerState(name, role) for name, role in rules_engine.DEFAULT_PLAYERS),
+        policy_deck=tuple(['Liberal'] * 6 + ['Fascist'] * 11),
+        president="Alice",
+    )
+    return state._replace(**changes)
+
+
+def test_start_round_seats_the_next_living_president():
+    state = make_state(round_number=0)
+    state = rules_engine.start_round(state)
+    assert (state.round_number, state.president, state.chancellor) == (1, "Bob", None)
+
+    state = state._replace(players=rules_engine.update_players(state, Carol={"is_alive": False}))
+    state = rules_engine.start_round(state)
+    # Alive: Alice, Bob, Dave, Eve
+    assert (state.round_number, state.president) == (2, "Dave")
+
+
+def test_only_the_last_chancellor_is_term_limited():
+    state = make_state(players=rules_engine.update_players(make_state(), Bob={"last_president": True}, Carol={"last_chancellor": True}))
+    assert rules_engine.eligible_chancellors(state) == ["Bob", "Dave", "Eve"]
+    with pytest.raises(RuleError):
+        rules_engine.nominate(state, "Carol")
+    assert rules_engine.nominate(state, "Dave").chancellor == "Dave"
+
+
+def test_passed_election_sets_term_limits_and_resets_the_tracker():
+    state = make_state(chancellor="Carol", election_tracker=2)
+    votes = {"Alice": True, "Bob": True, "Carol": True, "Dave": False, "Eve": False}
+    state, passed = rules_engine.resolve_election(state, votes, random.Random(0))
+    assert passed
+    assert state.election_tracker == 0
+    assert [p.name for p in state.players if p.last_president] == ["Alice"]
+    assert [p.name for p in state.players if p.last_chancellor] == ["Carol"]
+    assert state.winner is None
+
+
+def test_third_failed_election_enacts_the_top_policy():
+    state = make_state(chancellor="Carol", election_tracker=1)
+    votes = {"Alice": True, "Bob": True}
+    state, passed = rules_engine.resolve_election(state, votes, random.Random(0))
+    assert not passed and state.election_tracker == 2
+
+    state, passed = rules_engine.resolve_election(state, votes, random.Random(0))
+    assert not passed
+    assert state.election_tracker == 0
+    assert state.enacted_policies == ('Fascist',)
+    assert (state.liberal_policies, state.fascist_policies) == (0, 1)
+    assert len(state.policy_deck) == 16
+
+
+def test_electing_hitler_in_the_hitler_zone_wins_for_the_fascists():
+    votes = dict.fromkeys(["Alice", "Bob", "Carol", "Dave", "Eve"], True)
+    state, _ = rules_engine.resolve_election(make_state(chancellor="Dave", fascist_policies=2), votes, random.Random(0))
+    assert state.winner is None
+    state, _ = rules_engine.resolve_election(make_state(chancellor="Dave", fascist_policies=3), votes, random.Random(0))
+    assert state.win_reason == "Fascists (Hitler elected Chancellor)"
+    assert state.winner == "Fascists"
+
+
+def test_draw_refills_a_short_deck():
+    state = make_state(policy_deck=('Liberal', 'Fascist'), discard_pile=('Fascist',))
+    state, hand = rules_engine.draw_policies(state, random.Random(0))
+    assert len(hand) == 3
+    assert len(state.policy_deck) == 14
+    assert state.discard_pile == ()
+
+
+def test_draw_discard_and_enact():
+    state = make_state(policy_deck=('Fascist', 'Liberal', 'Fascist', 'Liberal'))
+    state, hand = rules_engine.draw_policies(state, random.Random(0))
+    assert hand == ('Liberal', 'Fascist', 'Liberal')
+    assert state.policy_deck == ('Fascist',)
+
+    state, hand = rules_engine.discard(state, hand, 'Fascist')
+    assert hand == ('Liberal', 'Liberal')
+    with pytest.raises(RuleError):
+        rules_engine.discard(state, hand, 'Fascist')
+
+    state, hand = rules_engine.discard(state, hand, 'Liberal')
+    state = rules_engine.enact(state, hand[0])
+    assert state.discard_pile == ('Fascist', 'Liberal')
+    assert (state.liberal_policies, state.enacted_policies) == (1, ('Liberal',))
+
+
+def test_veto_discards_the_hand_and_moves_the_tracker():
+    assert not rules_engine.veto_allowed(make_state(fascist_policies=4))
+    state = make_state(fascist_policies=5, election_tracker=1)
+    assert rules_engine.veto_allowed(state)
+    state = rules_engine.apply_veto(state, ('Fascist', 'Fascist'))
+    assert state.discard_pile == ('Fascist', 'Fascist')
+    assert state.election_tracker == 2
+    assert state.fascist_policies == 5
+
+
+def test_powers_come_up_once_each():
+    assert rules_engine.pending_power(make_state(fascist_policies=2)) is None
+    assert rules_engine.pending_power(make_state(fascist_policies=3)) == 'peek'
+    assert rules_engine.pending_power(make_state(fascist_policies=3, peek_power_used=True)) is None
+    assert rules_engine.pending_power(make_state(fascist_policies=4)) == 'remove_one'
+    assert rules_engine.pending_power(make_state(fascist_policies=5)) == 'remove_two'
+
+    state, top = rules_engine.peek(make_state(fascist_policies=3, policy_deck=('Liberal',)), random.Random(0))
+    assert len(top) == 3
+    assert state.peek_power_used
+
+
+def test_removing_hitler_wins_for_the_liberals():
+    state = make_state(fascist_policies=4)
+    assert "Alice" not in rules_engine.removable_players(state)
+    with pytest.raises(RuleError):
+        rules_engine.remove_player(state, "Alice", 'remove_one')
+
+    state = rules_engine.remove_player(state, "Bob", 'remove_one')
+    assert state.remove_power_one_used and state.winner is None
+    assert rules_engine.alive_players(state) == ["Alice", "Carol", "Dave", "Eve"]
+
+    state = rules_engine.remove_player(state, "Dave", 'remove_two')
+    assert state.win_reason == "Liberals (Hitler removed)"
+
+
+def test_policy_wins():
+    assert rules_engine.winner_for(5, 0) == "Liberals"
+    assert rules_engine.winner_for(0, 6) == "Fascists"
+    assert rules_engine.winner_for(4, 5) is None
+
+
+@pytest.mark.parametrize("policy", sorted(rules_engine.POLICIES))
+def test_simulated_games_end_with_a_winner(policy):
+    results = rules_engine.simulate(200, rules_engine.POLICIES[policy](), seed=1)
+    assert sum(results.values()) == 200
+    assert None not in results
+
+
+def test_game_state_round_trip():
+    players = [secret_hitler.Player(name, role, "") for name, role in rules_engine.DEFAULT_PLAYERS]
+    game_state = secret_hitler.GameState(players, random.Random(0))
+    game_state.current_president = players[0]
+    game_state.current_chancellor = players[2]
+
+    state = secret_hitler.rules_state(game_state)
+    assert (state.president, state.chancellor) == ("Alice", "Carol")
+    assert list(state.policy_deck) == game_state.policy_deck
+
+    votes = dict.fromkeys(["Alice", "Bob", "Carol"], True)
+    state, _ = rules_engine.resolve_election(state, votes, game_state.rng)
+    state = rules_engine.remove_player(state._replace(fascist_policies=4), "Bob", 'remove_one')
+    secret_hitler.apply_rules_state(game_state, state)
+
+    assert players[0].last_president and players[2].last_chancellor
+    assert not players[1].is_alive
+    assert game_state.fascist_policies == 4 and game_state.remove_power_one_used
+    assert secret_hitler.rules_state(game_state) == state